@@ -2,10 +2,17 @@
 
 # Register your models here.
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils import timezone
+from django.utils.functional import cached_property
 from .models import (
     Subscriber, WaterRate, MeterReading,
-    Bill, Ledger, OtherCharge, DisconnectionNotice
+    Bill, Ledger, OtherCharge, DisconnectionNotice, ReadingFlag,
+    Job, JobSchedule, ReceivableAgingSnapshot, MonthlyBillingSummary, CashierClosing,
+    Notification
 )
+from .jobs import cancel
  
 # ── Customize admin site headers ─────────────────────────────
 admin.site.site_header  = 'Macrohon Water Billing'
@@ -13,6 +20,42 @@ admin.site.site_title   = 'Water Billing Admin'
 admin.site.index_title  = 'Administration Dashboard'
  
  
+# ══════════════════════════════════════════════════════════
+#   Large-table changelists
+#
+#   Ledger, bills and readings grow by one row per subscriber
+#   per month, so an exact COUNT(*) on every page load gets
+#   slower every month. EstimatedCountPaginator counts at most
+#   COUNT_CAP + 1 rows; an unfiltered PostgreSQL changelist
+#   past the cap uses the planner's row estimate instead.
+#   Pages past the cap are reached by filtering or searching.
+# ══════════════════════════════════════════════════════════
+COUNT_CAP = 10000
+ 
+ 
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        qs      = self.object_list
+        counted = qs[:COUNT_CAP + 1].count()
+        if counted <= COUNT_CAP or qs.query.where or connection.vendor != 'postgresql':
+            return counted
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                           [qs.model._meta.db_table])
+            row = cursor.fetchone()
+        return max(counted, row[0] if row else 0)
+ 
+ 
+class LargeTableAdmin(admin.ModelAdmin):
+    """Subscriber-owned rows: one joined query per page, capped counts."""
+    paginator              = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related    = ['subscriber']
+    autocomplete_fields    = ['subscriber']
+    list_per_page          = 50
+ 
+ 
 @admin.register(Subscriber)
 class SubscriberAdmin(admin.ModelAdmin):
     list_display   = ['account_number', 'full_name', 'barangay',
@@ -20,6 +63,9 @@ class SubscriberAdmin(admin.ModelAdmin):
     list_filter    = ['classification', 'status', 'barangay', 'is_senior']
     search_fields  = ['account_number', 'last_name', 'first_name', 'meter_number']
     ordering       = ['last_name', 'first_name']
+    paginator      = EstimatedCountPaginator
+    show_full_result_count = False
+    raw_id_fields  = ['latest_reading', 'created_by']
     readonly_fields = ['created_at', 'updated_at', 'get_running_balance']
     fieldsets = (
         ('Account Information', {'fields': ('account_number', 'classification', 'status', 'is_senior')}),
@@ -42,43 +88,167 @@ class WaterRateAdmin(admin.ModelAdmin):
  
  
 @admin.register(MeterReading)
-class MeterReadingAdmin(admin.ModelAdmin):
+class MeterReadingAdmin(LargeTableAdmin):
     list_display  = ['subscriber', 'billing_month', 'reading_date',
                       'previous_reading', 'current_reading', 'volume_consumed']
-    list_filter   = ['billing_month']
+    list_filter   = ['is_estimated']
+    date_hierarchy = 'billing_month'
     search_fields = ['subscriber__account_number', 'subscriber__last_name']
     ordering      = ['-billing_month']
  
  
 @admin.register(Bill)
-class BillAdmin(admin.ModelAdmin):
+class BillAdmin(LargeTableAdmin):
     list_display  = ['subscriber', 'billing_month', 'volume_consumed',
                       'basic_charge', 'penalty_amount', 'arrears',
                       'total_amount_due', 'amount_paid', 'balance', 'status']
-    list_filter   = ['status', 'billing_month']
+    list_filter   = ['status']
+    date_hierarchy = 'billing_month'
+    raw_id_fields = ['meter_reading']
     search_fields = ['subscriber__account_number', 'subscriber__last_name']
     ordering      = ['-billing_month']
     readonly_fields = ['created_at', 'updated_at']
  
  
 @admin.register(Ledger)
-class LedgerAdmin(admin.ModelAdmin):
+class LedgerAdmin(LargeTableAdmin):
     list_display  = ['subscriber', 'entry_date', 'entry_type',
                       'description', 'debit', 'credit', 'running_balance', 'or_number']
-    list_filter   = ['entry_type', 'entry_date']
+    list_filter   = ['entry_type']
+    date_hierarchy = 'entry_date'
+    raw_id_fields = ['bill']
     search_fields = ['subscriber__account_number', 'or_number']
+    ordering      = ['-entry_date', '-created_at']      # newest first, read backwards off ledger_date_idx
+
+    def is_closed(self, obj):
+        return (obj is not None and obj.entry_type == 'PAYMENT' and CashierClosing.objects.filter(
+            business_date=obj.entry_date, cashier=obj.received_by).exists())
+
+#     a closed cashier day's payments stay as remitted
+    def has_change_permission(self, request, obj=None):
+        return super().has_change_permission(request, obj) and not self.is_closed(obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return super().has_delete_permission(request, obj) and not self.is_closed(obj)
  
  
 @admin.register(OtherCharge)
-class OtherChargeAdmin(admin.ModelAdmin):
+class OtherChargeAdmin(LargeTableAdmin):
     list_display  = ['subscriber', 'charge_type', 'description',
                       'amount', 'charge_date', 'applied_by', 'is_paid']
     list_filter   = ['charge_type', 'is_paid']
+    search_fields = ['subscriber__account_number', 'subscriber__last_name']
+    raw_id_fields = ['bill']
  
  
 @admin.register(DisconnectionNotice)
-class DisconnectionNoticeAdmin(admin.ModelAdmin):
+class DisconnectionNoticeAdmin(LargeTableAdmin):
     list_display  = ['subscriber', 'notice_date', 'cutoff_date',
                       'amount_overdue', 'status', 'issued_by']
     list_filter   = ['status']
     search_fields = ['subscriber__account_number', 'subscriber__last_name']
+    raw_id_fields = ['bill']
+
+ 
+ 
+@admin.register(ReadingFlag)
+class ReadingFlagAdmin(LargeTableAdmin):
+    list_display  = ['subscriber', 'billing_month', 'flag_type', 'score',
+                      'detail', 'status', 'reviewed_by']
+    list_filter   = ['status', 'flag_type']
+    search_fields = ['subscriber__account_number', 'subscriber__last_name']
+    ordering      = ['-billing_month']
+    date_hierarchy = 'billing_month'
+    raw_id_fields = ['meter_reading']
+    actions       = ['clear_flags']
+ 
+    @admin.action(description='Clear selected flags (release for billing)')
+    def clear_flags(self, request, queryset):
+        updated = queryset.filter(status='OPEN').update(
+            status='CLEARED',
+            reviewed_by=request.user.get_full_name() or request.user.username,
+        )
+        self.message_user(request, f'{updated} flags cleared.')
+ 
+ 
+@admin.register(ReceivableAgingSnapshot)
+class ReceivableAgingSnapshotAdmin(LargeTableAdmin):
+    list_display  = ['subscriber', 'as_of', 'barangay', 'classification', 'current',
+                      'days_1_30', 'days_31_60', 'days_61_90', 'days_91_120', 'over_120', 'total']
+    list_filter   = ['classification', 'barangay']
+    search_fields = ['subscriber__account_number', 'subscriber__last_name']
+    ordering      = ['-as_of', '-total']
+    date_hierarchy = 'as_of'
+ 
+ 
+@admin.register(MonthlyBillingSummary)
+class MonthlyBillingSummaryAdmin(admin.ModelAdmin):
+    list_display  = ['month', 'barangay', 'classification', 'bills', 'volume',
+                      'water_charges', 'penalties', 'collections', 'refreshed_at']
+    list_filter   = ['classification', 'barangay']
+    ordering      = ['-month', 'barangay']
+    date_hierarchy = 'month'
+ 
+ 
+@admin.register(CashierClosing)
+class CashierClosingAdmin(admin.ModelAdmin):
+    list_display  = ['business_date', 'cashier', 'payments', 'total', 'first_or', 'last_or',
+                      'gaps', 'duplicates', 'closed_by', 'closed_at']
+    search_fields = ['cashier']
+    date_hierarchy = 'business_date'
+    readonly_fields = ['payments', 'total', 'first_or', 'last_or', 'gaps', 'duplicates',
+                       'closed_by', 'closed_at']
+
+
+@admin.register(Notification)
+class NotificationAdmin(LargeTableAdmin):
+    list_display  = ['subscriber', 'kind', 'channel', 'recipient', 'status', 'attempts',
+                      'next_attempt_at', 'sent_at', 'last_error']
+    list_filter   = ['status', 'kind', 'channel']
+    search_fields = ['subscriber__account_number', 'recipient']
+    raw_id_fields = ['subscriber', 'bill', 'notice']
+    readonly_fields = ['dedupe_key', 'provider_ref', 'sent_at', 'created_at', 'updated_at']
+    actions       = ['send_again']
+
+    @admin.action(description='Send the selected messages again')
+    def send_again(self, request, queryset):
+        updated = queryset.filter(status__in=['FAILED', 'CANCELLED']).update(
+            status='QUEUED', attempts=0, next_attempt_at=timezone.now(), last_error='')
+        self.message_user(request, f'{updated} messages queued again.')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display  = ['id', 'command', 'status', 'progress', 'attempts',
+                      'created_at', 'started_at', 'finished_at', 'worker']
+    list_filter   = ['status', 'command']
+    readonly_fields = ['status', 'attempts', 'progress', 'progress_note', 'output', 'error',
+                       'worker', 'heartbeat_at', 'cancel_requested', 'schedule', 'created_at', 'started_at', 'finished_at']
+    raw_id_fields = ['requested_by']
+    paginator     = EstimatedCountPaginator
+    show_full_result_count = False
+    actions       = ['retry_jobs', 'cancel_jobs']
+ 
+    @admin.action(description='Retry selected failed or cancelled jobs')
+    def retry_jobs(self, request, queryset):
+        updated = queryset.filter(status__in=['FAILED', 'CANCELLED']).update(
+            status='QUEUED', attempts=0, run_after=timezone.now(), finished_at=None, error='',
+            cancel_requested=False)
+        self.message_user(request, f'{updated} jobs queued again.')
+ 
+    @admin.action(description='Cancel selected jobs')
+    def cancel_jobs(self, request, queryset):
+        updated = cancel(queryset)
+        self.message_user(request, f'{updated} jobs cancelled; running ones stop at their next progress report.')
+ 
+ 
+@admin.register(JobSchedule)
+class JobScheduleAdmin(admin.ModelAdmin):
+    list_display  = ['name', 'command', 'cron', 'is_active', 'next_run_at', 'last_run_at']
+    list_filter   = ['is_active']
+    readonly_fields = ['last_run_at']
+ 
+    def save_model(self, request, obj, form, change):
+        if 'cron' in form.changed_data:
+            obj.next_run_at = None      # recomputed from the new expression by run_jobs
+        super().save_model(request, obj, form, change)
@@ -0,0 +1,114 @@
+"""
+Receivables aging: each subscriber's open balance by days past due,
+stored as dated ReceivableAgingSnapshot rows so the delinquent report
+reads a small table and runs can be compared over time.
+
+    take_snapshot()                      # today's aging, replacing any earlier run today
+
+One run is one grouped query over the bills, with a conditional SUM per
+bucket, plus a bulk insert. A bill's balance includes the arrears it
+carried from earlier bills, and those bills still carry their own
+balances. Each bill therefore counts as its balance less its arrears:
+its own charges, net of what was paid on it. Where a payment on a newer
+bill also settled older ones, that bill comes out negative, and
+settle_oldest() moves the credit onto the oldest buckets.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Min, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Bill, ReceivableAgingSnapshot
+
+ZERO         = Decimal('0.00')
+OPEN_STATUS  = ['UNPAID', 'PARTIAL', 'OVERDUE']
+
+#   snapshot field, label, days past due from, to (inclusive; None = open-ended)
+BUCKETS = [
+    ('current',     'Current',       None, 0),
+    ('days_1_30',   '1–30 days',     1,    30),
+    ('days_31_60',  '31–60 days',    31,   60),
+    ('days_61_90',  '61–90 days',    61,   90),
+    ('days_91_120', '91–120 days',   91,   120),
+    ('over_120',    'Over 120 days', 121,  None),
+]
+BUCKET_FIELDS = [field for field, *_ in BUCKETS]
+
+
+def bucket_filter(as_of, low, high):
+    """Bills `low`–`high` days past their due date on `as_of`."""
+    q = Q()
+    if low is not None:
+        q &= Q(due_date__lte=as_of - timedelta(days=low))
+    if high is not None:
+        q &= Q(due_date__gte=as_of - timedelta(days=high))
+    return q
+
+
+def aging_rows(as_of):
+    """One dict per subscriber: barangay, classification, the buckets and open bill stats."""
+    own    = F('balance') - F('arrears')
+    amount = DecimalField(max_digits=12, decimal_places=2)
+    return (Bill.objects.exclude(status='WRITTEN_OFF')
+            .filter(Q(balance__gt=0) | Q(arrears__gt=0))
+            .values('subscriber_id', 'subscriber__barangay', 'subscriber__classification')
+            .annotate(
+                **{field: Coalesce(Sum(own, filter=bucket_filter(as_of, low, high)), ZERO,
+                                   output_field=amount)
+                   for field, _, low, high in BUCKETS},
+                open_bills = Count('id', filter=Q(status__in=OPEN_STATUS, balance__gt=0)),
+                oldest_due = Min('due_date', filter=Q(status__in=OPEN_STATUS, balance__gt=0)),
+            )
+            .order_by())
+
+
+def settle_oldest(buckets):
+    """Apply negative (over-paid) buckets to the oldest positive ones; returns the new list."""
+    credit  = -sum(b for b in buckets if b < 0)
+    settled = [max(b, ZERO) for b in buckets]
+    for i in reversed(range(len(settled))):
+        if credit <= 0:
+            break
+        used        = min(settled[i], credit)
+        settled[i] -= used
+        credit     -= used
+    return settled
+
+
+@transaction.atomic
+def take_snapshot(as_of=None):
+    """Compute and store the aging as of `as_of` (default today); returns the rows stored."""
+    as_of = as_of or date.today()
+    rows  = []
+    for row in aging_rows(as_of):
+        buckets = settle_oldest([row[field] for field in BUCKET_FIELDS])
+        total   = sum(buckets)
+        if total <= 0:
+            continue
+        rows.append(ReceivableAgingSnapshot(
+            as_of          = as_of,
+            subscriber_id  = row['subscriber_id'],
+            barangay       = row['subscriber__barangay'],
+            classification = row['subscriber__classification'],
+            total          = total,
+            open_bills     = row['open_bills'],
+            oldest_due     = row['oldest_due'],
+            **dict(zip(BUCKET_FIELDS, buckets)),
+        ))
+    ReceivableAgingSnapshot.objects.filter(as_of=as_of).delete()
+    ReceivableAgingSnapshot.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def latest_dates(limit=24):
+    return list(ReceivableAgingSnapshot.objects.order_by('-as_of')
+                .values_list('as_of', flat=True).distinct()[:limit])
+
+
+def bucket_totals(snapshots):
+    """Sum of each bucket, the total and the account count over a snapshot queryset."""
+    return snapshots.aggregate(
+        **{field: Coalesce(Sum(field), ZERO) for field in BUCKET_FIELDS},
+        total=Coalesce(Sum('total'), ZERO), accounts=Count('id'))
@@ -0,0 +1,158 @@
+import warnings
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+
+from .models import MeterReading, ReadingFlag
+
+
+# ══════════════════════════════════════════════════════════
+#   Consumption anomaly scan (runs before monthly billing)
+#
+#   All readings for the billing month plus a trailing history
+#   window are loaded with one query into a subscriber × month
+#   matrix, and every check below is a whole-matrix operation.
+#   Flags are stored as ReadingFlag rows; run_billing holds any
+#   reading that still has an OPEN flag.
+# ══════════════════════════════════════════════════════════
+HISTORY_MONTHS      = 12     # trailing months used as each subscriber's baseline
+MIN_HISTORY         = 3      # fewer past readings than this → skip own-history check
+Z_THRESHOLD         = 3.5    # robust z vs. own history
+COHORT_Z_THRESHOLD  = 5.0    # robust z vs. same classification + barangay
+MIN_COHORT_SIZE     = 5
+ZERO_STREAK_MONTHS  = 3
+MAD_SCALE           = 1.4826 # MAD → standard deviation for normal data
+MIN_SPREAD          = 2.0    # cu.m; keeps perfectly steady histories from dividing by ~0
+MIN_SPREAD_RATIO    = 0.25   # …and at least a quarter of the typical consumption
+MAX_SCORE           = 99999999.0
+
+
+def _month_index(d):
+    return d.year * 12 + d.month - 1
+
+
+def _robust_z(values, center, spread):
+    spread = np.maximum(spread * MAD_SCALE, np.maximum(np.abs(center) * MIN_SPREAD_RATIO, MIN_SPREAD))
+    return (values - center) / spread
+
+
+def scan_reading_anomalies(billing_month, history_months=HISTORY_MONTHS):
+    first = _month_index(billing_month) - history_months
+    since = date(first // 12, first % 12 + 1, 1)
+
+    rows = list(MeterReading.objects.filter(
+        billing_month__gte = since,
+        billing_month__lte = billing_month,
+    ).values_list(
+        'pk', 'subscriber_id', 'billing_month', 'previous_reading', 'current_reading',
+        'is_estimated', 'subscriber__classification', 'subscriber__barangay',
+    ))
+    summary = {code: 0 for code, _ in ReadingFlag.FLAG_TYPE_CHOICES}
+    if not rows:
+        return summary
+
+#     ── Build the subscriber × month matrices ────────────────
+    pks, sub_ids, months, prev, curr, estimated, cls, brgy = zip(*rows)
+    sub_ids       = np.asarray(sub_ids)
+    subs, row_of  = np.unique(sub_ids, return_inverse=True)
+    col_of        = np.fromiter((_month_index(m) - first for m in months), dtype=np.int64)
+    width         = history_months + 1
+
+    prev_m = np.full((len(subs), width), np.nan)
+    curr_m = np.full((len(subs), width), np.nan)
+    prev_m[row_of, col_of] = np.asarray(prev, dtype=float)
+    curr_m[row_of, col_of] = np.asarray(curr, dtype=float)
+    est_m  = np.zeros((len(subs), width), dtype=bool)
+    est_m[row_of, col_of]  = estimated
+    cons_m = curr_m - prev_m
+
+#     Keep only subscribers that were read this month
+    target  = col_of == history_months
+    t_rows  = row_of[target]
+    t_pks   = np.asarray(pks)[target]
+    t_subs  = sub_ids[target]
+    t_cons  = cons_m[t_rows, -1]
+    t_prev  = prev_m[t_rows, -1]
+    t_curr  = curr_m[t_rows, -1]
+    history = cons_m[t_rows, :-1]
+
+    flags = []
+
+    def flag(mask, flag_type, scores, detail):
+        for i in np.flatnonzero(mask):
+            flags.append((int(t_pks[i]), int(t_subs[i]), flag_type,
+                          float(scores[i]), detail(i)))
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)     # all-NaN rows (no history)
+
+#         ── 1. Outlier vs. the subscriber's own history ──────
+        n_hist = np.sum(~np.isnan(history), axis=1)
+        med    = np.nanmedian(history, axis=1)
+        mad    = np.nanmedian(np.abs(history - med[:, None]), axis=1)
+        z      = _robust_z(t_cons, med, mad)
+        flag((n_hist >= MIN_HISTORY) & (np.abs(z) > Z_THRESHOLD), 'OUTLIER', z,
+             lambda i: f'{t_cons[i]:.2f} cu.m vs. usual {med[i]:.2f} cu.m')
+
+#     ── 2. Outlier vs. classification + barangay cohort ──────
+    t_cohort = np.asarray([f'{c}|{b}' for c, b in zip(cls, brgy)])[target]
+    cohorts, cohort_of = np.unique(t_cohort, return_inverse=True)
+    sizes    = np.bincount(cohort_of)
+    c_med    = np.zeros(len(cohorts))
+    c_mad    = np.zeros(len(cohorts))
+    for c in np.flatnonzero(sizes >= MIN_COHORT_SIZE):
+        members  = t_cons[cohort_of == c]
+        c_med[c] = np.median(members)
+        c_mad[c] = np.median(np.abs(members - c_med[c]))
+    cz = _robust_z(t_cons, c_med[cohort_of], c_mad[cohort_of])
+    flag((sizes[cohort_of] >= MIN_COHORT_SIZE) & (np.abs(cz) > COHORT_Z_THRESHOLD),
+         'COHORT_OUTLIER', cz,
+         lambda i: f'{t_cons[i]:.2f} cu.m vs. neighbours {c_med[cohort_of[i]]:.2f} cu.m')
+
+#     ── 3. Zero-consumption streak ending this month ──────────
+    zeros  = (cons_m[t_rows] == 0)[:, ::-1]
+    streak = np.cumprod(zeros, axis=1).sum(axis=1)
+    flag(streak >= ZERO_STREAK_MONTHS, 'ZERO_STREAK', streak,
+         lambda i: f'No consumption for {streak[i]} consecutive months')
+
+#     ── 4. Register went backwards (rollover / meter swap) ────
+#     Carry each subscriber's last known current reading forward.
+#     Coming in below an estimate is an over-estimate, settled by
+#     reconcile_estimated_readings (previous set to current), not a rollover.
+    past_curr = curr_m[t_rows, :-1]
+    seen      = np.where(~np.isnan(past_curr), np.arange(history_months), 0)
+    last_idx  = np.maximum.accumulate(seen, axis=1)[:, -1]
+    last_curr = past_curr[np.arange(len(t_rows)), last_idx]
+    last_est  = est_m[t_rows, :-1][np.arange(len(t_rows)), last_idx]
+    backwards = (t_curr < t_prev) | ((t_prev < last_curr) & ~last_est)    # NaN compares False
+    drop      = np.where(t_curr < t_prev, t_prev - t_curr, last_curr - t_prev)
+    flag(backwards, 'ROLLOVER', np.nan_to_num(drop),
+         lambda i: (f'Previous {t_prev[i]:.2f}, current {t_curr[i]:.2f}, '
+                    f'last recorded {last_curr[i]:.2f}'))
+
+    for flag_obj in _store_flags(billing_month, flags):
+        summary[flag_obj.flag_type] += 1
+    return summary
+
+
+def _store_flags(billing_month, flags):
+    """Replaces the month's OPEN flags; flags a reviewer already cleared stay cleared."""
+    with transaction.atomic():
+        ReadingFlag.objects.filter(billing_month=billing_month, status='OPEN').delete()
+        cleared = set(ReadingFlag.objects.filter(
+            billing_month=billing_month, status='CLEARED',
+        ).values_list('meter_reading_id', 'flag_type'))
+        return ReadingFlag.objects.bulk_create([
+            ReadingFlag(
+                meter_reading_id = pk,
+                subscriber_id    = sub_id,
+                billing_month    = billing_month,
+                flag_type        = flag_type,
+                score            = Decimal(f'{max(min(score, MAX_SCORE), -MAX_SCORE):.2f}'),
+                detail           = detail[:255],
+            )
+            for pk, sub_id, flag_type, score, detail in flags
+            if (pk, flag_type) not in cleared
+        ])
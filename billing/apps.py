@@ -3,3 +3,13 @@ from django.apps import AppConfig
 
 class BillingConfig(AppConfig):
     name = 'billing'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from macrohon_water.database import apply_sqlite_pragmas
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='billing.sqlite_pragmas')
+
+        from django.db.models.signals import post_delete
+        from .services import reading_deleted
+        post_delete.connect(reading_deleted, sender='billing.MeterReading',
+                            dispatch_uid='billing.reading_deleted')
@@ -0,0 +1,200 @@
+"""
+Benchmark cases for the billing, posting and reporting hot paths, run by
+the run_benchmarks command against a generate_dataset database generated
+as of BILLING_MONTH, so runs on different days measure the same work.
+
+Every case runs inside a transaction that is rolled back afterwards, so
+each repeat sees the same data. A case returns how many operations it
+performed; run_case() makes one traced run for query count and peak
+Python memory, which also warms the caches, then reports the median time
+over the repeats.
+"""
+import io
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync, sync_to_async, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test import RequestFactory
+
+from . import views
+from .models import Subscriber, MeterReading, Bill
+from .services import get_running_balance, process_payment, months_before, refresh_latest_readings
+
+CASES = {}
+
+BILLING_MONTH   = date(2026, 10, 1)      # billed by run_billing; the dataset ends the month before
+PAYMENT_SAMPLE  = 200
+BALANCE_SAMPLE  = 500
+REPOST_SAMPLE   = 50
+TIME_SLACK      = 0.02                   # seconds of scheduler noise allowed on top of the tolerance
+MEMORY_SLACK    = 64                     # KiB, likewise
+
+
+def case(name):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+class BenchmarkContext:
+    """Fixed inputs shared by every case: the month to bill, the last billed month, sampled ids."""
+
+    def __init__(self, billing_month=BILLING_MONTH):
+        self.billing_month = billing_month
+        self.last_month    = (Bill.objects.aggregate(m=Max('billing_month'))['m']
+                              or months_before(self.billing_month, 1))
+        self.user, _       = User.objects.get_or_create(username='benchmark')
+        self.factory       = RequestFactory()
+        self.subscriber_ids = list(Subscriber.objects.filter(status='ACTIVE')
+                                   .order_by('id').values_list('id', flat=True))
+        self.open_bill_ids = list(Bill.objects.filter(billing_month=self.last_month,
+                                                      status__in=['UNPAID', 'PARTIAL', 'OVERDUE'])
+                                  .order_by('id').values_list('id', flat=True)[:PAYMENT_SAMPLE])
+        self.prepare_readings()
+
+    def prepare_readings(self):
+        """One unbilled reading this month per active subscriber, for the run_billing case."""
+        read = MeterReading.objects.filter(billing_month=self.billing_month).values('subscriber_id')
+        todo = (Subscriber.objects.filter(status='ACTIVE', latest_reading__isnull=False)
+                .exclude(id__in=read).select_related('latest_reading'))
+        MeterReading.objects.bulk_create([
+            MeterReading(
+                subscriber_id    = sub.id,
+                billing_month    = self.billing_month,
+                reading_date     = self.billing_month,
+                previous_reading = sub.latest_reading.current_reading,
+                current_reading  = sub.latest_reading.current_reading + 18 + sub.id % 11,
+                reader_name      = 'Benchmark',
+            ) for sub in todo.iterator(chunk_size=2000)
+        ], batch_size=2000)
+        refresh_latest_readings()
+
+    def get(self, view, path, **params):
+        request      = self.factory.get(path, params)
+        request.user = self.user
+        if iscoroutinefunction(view):
+            request.auser = sync_to_async(lambda: self.user)
+            return async_to_sync(view)(request)
+        return view(request)
+
+
+@contextmanager
+def rolled_back():
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def run_case(name, ctx, repeats=3):
+    fn      = CASES[name]
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with rolled_back(), connection.execute_wrapper(count):
+        tracemalloc.start()
+        try:
+            fn(ctx)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+#     timed after the traced run, which warms the caches a single repeat would pay for
+    times = []
+    for _ in range(repeats):
+        with rolled_back():
+            start = time.perf_counter()
+            ops   = fn(ctx)
+            times.append(time.perf_counter() - start)
+
+    seconds = statistics.median(times)
+    return {
+        'seconds':     round(seconds, 4),
+        'ops':         ops,
+        'ops_per_sec': round(ops / seconds, 1) if seconds else None,
+        'queries':     len(queries),
+        'peak_kib':    peak // 1024,
+    }
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Regressions of results against a baseline's cases: slower, more queries or more memory."""
+    problems = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if now['seconds'] > before['seconds'] * (1 + tolerance) + TIME_SLACK:
+            problems.append(f'{name}: {now["seconds"]:.3f}s vs baseline {before["seconds"]:.3f}s')
+        if now['queries'] > before['queries']:
+            problems.append(f'{name}: {now["queries"]} queries vs baseline {before["queries"]}')
+        if now['peak_kib'] > before['peak_kib'] * (1 + tolerance) + MEMORY_SLACK:
+            problems.append(f'{name}: peak {now["peak_kib"]} KiB vs baseline {before["peak_kib"]} KiB')
+    return problems
+
+
+# ══════════════════════════════════════════════════════════
+#   Cases
+# ══════════════════════════════════════════════════════════
+@case('run_billing')
+def bench_run_billing(ctx):
+#     billing itself; notice pre-rendering and message queuing would swamp it
+    call_command('run_billing', billing_month=ctx.billing_month.isoformat(), no_prerender=True,
+                 no_notify=True, stdout=io.StringIO())
+    return len(ctx.subscriber_ids)
+
+
+@case('process_payment')
+def bench_process_payment(ctx):
+    for n, bill in enumerate(Bill.objects.filter(id__in=ctx.open_bill_ids)):
+        process_payment(bill, bill.balance or Decimal('1.00'), f'BENCH-{n:06d}', 'Benchmark')
+    return len(ctx.open_bill_ids)
+
+
+@case('get_running_balance')
+def bench_get_running_balance(ctx):
+    for sub in Subscriber.objects.filter(id__in=ctx.subscriber_ids[:BALANCE_SAMPLE]):
+        get_running_balance(sub)
+    return len(ctx.subscriber_ids[:BALANCE_SAMPLE])
+
+
+@case('update_running_balances')
+def bench_update_running_balances(ctx):
+    for sub in Subscriber.objects.filter(id__in=ctx.subscriber_ids[:REPOST_SAMPLE]):
+        views.update_running_balances(sub)
+    return len(ctx.subscriber_ids[:REPOST_SAMPLE])
+
+
+@case('dashboard')
+def bench_dashboard(ctx):
+    ctx.get(views.dashboard, '/')
+    return 1
+
+
+@case('collection_report')
+def bench_collection_report(ctx):
+    ctx.get(views.collection_report, '/reports/collection/', month=ctx.last_month.strftime('%Y-%m'))
+    return 1
+
+
+@case('general_ledger')
+def bench_general_ledger(ctx):
+    ctx.get(views.general_ledger, '/ledger/')
+    return 1
+
+
+@case('delinquent_report')
+def bench_delinquent_report(ctx):
+    ctx.get(views.delinquent_report, '/reports/delinquent/')
+    return 1
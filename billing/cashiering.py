@@ -0,0 +1,199 @@
+"""
+Cashier end-of-day closing and the official receipt (OR) series check.
+
+    cashier_day(timezone.localdate())                          # {cashier: Remittance}
+    close_day(timezone.localdate(), 'Teller 2', 'supervisor')  # no more payments for that day
+
+Each cashier issues ORs from their own booklets, so one cashier's OR
+numbers should run without a break. A period's payments come from one
+query. A window function (LAG over each cashier's ORs) gives every row
+the OR before it. ORs are ordered by length, then value, so 'OR-99'
+sorts before 'OR-100'. One pass over the stream totals each cashier and
+finds the gaps. The payments are read through ledger_type_date_idx,
+and the window sorts one cashier's ORs at a time. A peak collection day
+is a single indexed range scan.
+
+An OR with a different prefix from the one before it starts a new series
+(another booklet), which is not a gap. The ledger_unique_or constraint
+stops two payments from sharing an OR string. The same number written
+differently ('OR-0042' and 'OR-042') still counts as a duplicate here.
+Payments that already shared an OR before the constraint (migration
+0011 refuses to add it while they do) are listed by
+`manage.py duplicate_receipts`. With --renumber, every payment after the
+first on each OR gets a suffix ('OR-0042-2').
+
+Business dates are local (settings.TIME_ZONE), as the cashiers count them.
+
+Once a cashier's day is closed, process_payment refuses that cashier's
+payments for the day. The closing keeps the counts and total as
+remitted. A payment that slips in while the closing is being written
+shows up as a difference from the ledger on the closing page.
+"""
+import re
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Window
+from django.db.models.functions import Lag, Length
+from django.utils import timezone
+
+from .models import Ledger, CashierClosing
+
+ZERO       = Decimal('0.00')
+CHUNK      = 2_000
+OR_PATTERN = re.compile(r'^(.*?)(\d+)$')
+
+
+def split_or(or_number):
+    """('OR-', 42, 4) for 'OR-0042'; None when the OR does not end in digits."""
+    match = OR_PATTERN.match(or_number or '')
+    if not match:
+        return None
+    prefix, digits = match.groups()
+    return prefix, int(digits), len(digits)
+
+
+class Remittance:
+    """One cashier's payments over a day (or an audited period) and the OR issues found."""
+
+    def __init__(self, cashier):
+        self.cashier    = cashier
+        self.payments   = 0
+        self.total      = ZERO
+        self.first_or   = ''
+        self.last_or    = ''
+        self.gaps       = 0                      # OR numbers skipped
+        self.duplicates = 0
+        self.issues     = []                     # dicts: kind, entry_date, or_number, detail
+        self.closing    = None
+
+    def add(self, or_number, credit):
+        self.payments += 1
+        self.total    += credit
+        if or_number:
+            self.first_or = self.first_or or or_number
+            self.last_or  = or_number
+
+    def issue(self, kind, entry_date, or_number, detail):
+        self.issues.append({'kind': kind, 'entry_date': entry_date, 'or_number': or_number,
+                            'detail': detail})
+
+    @property
+    def unremitted(self):
+        """Payments posted after the closing was written: (count, amount), or None."""
+        if self.closing is None:
+            return None
+        extra = (self.payments - self.closing.payments, self.total - self.closing.total)
+        return extra if any(extra) else None
+
+
+def or_stream(start, end, cashier=None):
+    """(received_by, or_number, previous OR, entry_date, credit) per payment, in series order."""
+    series   = [Length('or_number').asc(), F('or_number').asc()]
+    payments = Ledger.objects.filter(entry_type='PAYMENT', entry_date__gte=start, entry_date__lte=end)
+    if cashier is not None:
+        payments = payments.filter(received_by=cashier)
+    return (payments
+            .annotate(previous=Window(Lag('or_number'), partition_by=[F('received_by')], order_by=series))
+            .order_by('received_by', *series)
+            .values_list('received_by', 'or_number', 'previous', 'entry_date', 'credit')
+            .iterator(chunk_size=CHUNK))
+
+
+def audit(start, end, cashier=None):
+    """{cashier: Remittance} for the payments of `start`–`end` (inclusive), gaps and duplicates found."""
+    found, seen = {}, {}                         # seen: (prefix, number) → (cashier, OR)
+    for received_by, or_number, previous, entry_date, credit in or_stream(start, end, cashier):
+        remittance = found.get(received_by)
+        if remittance is None:
+            remittance = found[received_by] = Remittance(received_by)
+        remittance.add(or_number, credit)
+
+        parsed = split_or(or_number)
+        if parsed is None:
+            remittance.issue('NO OR', entry_date, or_number, 'Payment without a numbered OR')
+            continue
+        prefix, number, width = parsed
+
+        if (prefix, number) in seen:
+            other_cashier, other = seen[(prefix, number)]
+            remittance.duplicates += 1
+            remittance.issue('DUPLICATE', entry_date, or_number,
+                             f'Same receipt as {other} ({other_cashier})')
+        else:
+            seen[(prefix, number)] = (received_by, or_number)
+
+        before = split_or(previous)
+        if before and before[0] == prefix and number - before[1] > 1:
+            missing = number - before[1] - 1
+            remittance.gaps += missing
+            first   = f'{prefix}{before[1] + 1:0{width}d}'
+            remittance.issue('GAP', entry_date, or_number,
+                             f'{missing} missing after {previous}'
+                             + (f': {first}' if missing == 1 else f': {first} to {prefix}{number - 1:0{width}d}'))
+    return found
+
+
+def cashier_day(day):
+    """{cashier: Remittance} for `day`, with each cashier's closing attached (closed days without payments too)."""
+    found = audit(day, day)
+    for closing in CashierClosing.objects.filter(business_date=day):
+        found.setdefault(closing.cashier, Remittance(closing.cashier)).closing = closing
+    return dict(sorted(found.items()))
+
+
+def duplicate_receipts():
+    """{or_number: [payment entries, first posted first]} for every OR string used more than once."""
+    shared = (Ledger.objects.filter(entry_type='PAYMENT').exclude(or_number='')
+              .values('or_number').annotate(n=Count('id')).filter(n__gt=1).values('or_number'))
+    found  = {}
+    for entry in (Ledger.objects.filter(entry_type='PAYMENT', or_number__in=shared)
+                  .select_related('subscriber').order_by('or_number', 'entry_date', 'created_at', 'id')):
+        found.setdefault(entry.or_number, []).append(entry)
+    return found
+
+
+@transaction.atomic
+def renumber_duplicates(found):
+    """Suffix every payment after the first on each shared OR ('OR-0042-2'); returns the entries changed."""
+    changed = []
+    for or_number, entries in found.items():
+        suffix = 1
+        for entry in entries[1:]:
+            suffix += 1
+            while Ledger.objects.filter(or_number=f'{or_number}-{suffix}').exists():
+                suffix += 1
+            entry.or_number = f'{or_number}-{suffix}'
+            changed.append(entry)
+    Ledger.objects.bulk_update(changed, ['or_number'])
+    return changed
+
+
+def ensure_open(day, cashier):
+    """Raise ValueError if `cashier` has closed `day`."""
+    if CashierClosing.objects.filter(business_date=day, cashier=cashier).exists():
+        raise ValueError(
+            f'{cashier} has already closed {day:%b %d, %Y}. '
+            f'Payments cannot be posted to a closed day.'
+        )
+
+
+@transaction.atomic
+def close_day(day, cashier, closed_by, remarks=''):
+    """Close `cashier`'s `day` at what the ledger shows now; returns the CashierClosing."""
+    if not cashier:
+        raise ValueError('Choose the cashier to close.')
+    ensure_open(day, cashier)
+    remittance = audit(day, day, cashier).get(cashier) or Remittance(cashier)
+    return CashierClosing.objects.create(
+        business_date = day,
+        cashier       = cashier,
+        payments      = remittance.payments,
+        total         = remittance.total,
+        first_or      = remittance.first_or,
+        last_or       = remittance.last_or,
+        gaps          = remittance.gaps,
+        duplicates    = remittance.duplicates,
+        remarks       = remarks,
+        closed_by     = closed_by,
+    )
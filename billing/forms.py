@@ -1,5 +1,6 @@
 from django import forms
-from .models import Subscriber, WaterRate, MeterReading, OtherCharge
+from .models import Subscriber, WaterRate, MeterReading, OtherCharge, Ledger
+from .jobs import JOB_COMMANDS, MONTH_COMMANDS
  
 # ──────────────────────────────────────────────────────────
 #   FORM 1 — SubscriberForm
@@ -58,9 +59,14 @@ class MeterReadingForm(forms.ModelForm):
         billing_month = cleaned.get('billing_month')
         
         # Check if current reading is less than previous reading
+        # (allowed when the previous reading was an estimate that overshot)
         if prev is not None and curr is not None and curr < prev:
-            raise forms.ValidationError(
-                'Current reading cannot be less than previous reading.')
+            last = MeterReading.objects.filter(
+                subscriber=subscriber, billing_month__lt=billing_month,
+            ).first() if subscriber and billing_month else None
+            if not (last and last.is_estimated and last.current_reading == prev):
+                raise forms.ValidationError(
+                    'Current reading cannot be less than previous reading.')
         
         # Check for duplicate meter reading (subscriber + billing_month combination)
         if subscriber and billing_month:
@@ -106,6 +112,15 @@ class PaymentForm(forms.Form):
         max_length=255, required=False,
         label='Remarks (optional)',
     )
+
+    def clean_or_number(self):
+        or_number = self.cleaned_data['or_number'].strip()
+        issued = Ledger.objects.filter(entry_type='PAYMENT', or_number=or_number).first()
+        if issued:
+            raise forms.ValidationError(
+                f'OR {or_number} was already issued on {issued.entry_date:%b %d, %Y} '
+                f'by {issued.received_by or "another cashier"}.')
+        return or_number
  
  
 # ──────────────────────────────────────────────────────────
@@ -137,3 +152,47 @@ class BillingPeriodForm(forms.Form):
         label='Disconnection Cutoff Date',
     )
 
+
+
+# ──────────────────────────────────────────────────────────
+#   FORM 6 — ReadingImportForm  (route reader sheet upload)
+# ──────────────────────────────────────────────────────────
+class ReadingImportForm(forms.Form):
+    billing_month = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        label='Billing Month (enter first day, e.g. 2025-01-01)',
+    )
+    csv_file      = forms.FileField(
+        label='Reader Sheet (CSV)',
+        help_text='Columns: meter_number, current_reading, '
+                  'and optionally previous_reading, reading_date, reader_name, remarks',
+    )
+    reader_name   = forms.CharField(
+        max_length=100, required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control'}),
+        label='Reader Name (used when the sheet has none)',
+    )
+
+
+# ──────────────────────────────────────────────────────────
+#   FORM 7 — JobForm  (start a background job)
+# ──────────────────────────────────────────────────────────
+class JobForm(forms.Form):
+    command       = forms.ChoiceField(
+        choices=list(JOB_COMMANDS.items()),
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Job',
+    )
+    billing_month = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        label='Billing Month (first day; blank = this month)',
+        help_text='Used by billing, estimates, anomaly scans and route books',
+    )
+
+    def arguments(self):
+        """call_command options for the chosen job."""
+        month = self.cleaned_data.get('billing_month')
+        if month and self.cleaned_data['command'] in MONTH_COMMANDS:
+            return {'billing_month': month.isoformat()}
+        return {}
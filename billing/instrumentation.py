@@ -0,0 +1,172 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.template.backends.django import DjangoTemplates
+
+slow_log = logging.getLogger('billing.slow_requests')
+
+_current = contextvars.ContextVar('billing_request_metrics', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+# ══════════════════════════════════════════════════════════
+#   RequestMetrics — what one request spent its time on
+# ══════════════════════════════════════════════════════════
+class RequestMetrics:
+    def __init__(self):
+        self.queries       = []       # (sql, seconds)
+        self.db_time       = 0.0
+        self.template_time = 0.0
+        self.lock          = threading.Lock()
+
+#     also installed on the worker connections of gather_queries, so
+#     several threads may record into one request's metrics
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.db_time += elapsed
+                self.queries.append((sql, elapsed))
+
+    def most_repeated(self):
+        """The statement run most often (placeholders, not values) — the usual N+1 culprit."""
+        if not self.queries:
+            return None, 0
+        return Counter(sql for sql, _ in self.queries).most_common(1)[0]
+
+    def slowest(self, n=5):
+        return sorted(self.queries, key=lambda q: q[1], reverse=True)[:n]
+
+
+def current_metrics():
+    return _current.get()
+
+
+# ══════════════════════════════════════════════════════════
+#   RequestMetricsMiddleware
+#   Adds a Server-Timing header (db, tpl, app), logs slow
+#   requests with their worst SQL, and enforces per-view query
+#   budgets: settings.QUERY_BUDGETS maps URL names to a maximum
+#   query count (QUERY_BUDGET_DEFAULT for the rest). Over budget
+#   raises QueryBudgetExceeded when QUERY_BUDGET_RAISE is on
+#   (tests), otherwise it is logged as a warning. Sync and async:
+#   under ASGI the async views are awaited, not run in a thread.
+# ══════════════════════════════════════════════════════════
+class RequestMetricsMiddleware:
+    sync_capable  = True
+    async_capable = True              # async views are awaited directly, not run in a thread
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode   = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token   = _current.set(metrics)
+        start   = time.perf_counter()
+        try:
+            with connection.execute_wrapper(metrics.record_query):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+#         the request's queries run in its sync_to_async thread, on that
+#         thread's connection: the wrapper goes there (the ContextVar follows)
+        metrics = RequestMetrics()
+        token   = _current.set(metrics)
+        start   = time.perf_counter()
+        await sync_to_async(lambda: connection.execute_wrappers.append(metrics.record_query))()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(lambda: connection.execute_wrappers.remove(metrics.record_query))()
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    def finish(self, request, response, metrics, wall):
+        match = getattr(request, 'resolver_match', None)
+        view  = match.view_name if match else request.path
+
+        response['Server-Timing'] = (
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{len(metrics.queries)} queries", '
+            f'tpl;dur={metrics.template_time * 1000:.1f}, '
+            f'app;dur={wall * 1000:.1f}'
+        )
+
+        if wall * 1000 >= getattr(settings, 'SLOW_REQUEST_MS', 500):
+            self.log_slow(request, view, wall, metrics)
+        self.check_budget(view, metrics)
+        return response
+
+    @staticmethod
+    def log_slow(request, view, wall, metrics):
+        repeated_sql, repeated = metrics.most_repeated()
+        lines = [f'{request.method} {request.get_full_path()} [{view}] '
+                 f'{wall * 1000:.0f}ms total, {len(metrics.queries)} queries '
+                 f'{metrics.db_time * 1000:.0f}ms db, {metrics.template_time * 1000:.0f}ms templates']
+        if repeated > 1:
+            lines.append(f'  repeated x{repeated}: {repeated_sql}')
+        for sql, secs in metrics.slowest():
+            lines.append(f'  {secs * 1000:7.1f}ms  {sql}')
+        slow_log.warning('\n'.join(lines))
+
+    @staticmethod
+    def check_budget(view, metrics):
+        budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        budget  = budgets.get(view, getattr(settings, 'QUERY_BUDGET_DEFAULT', None))
+        if budget is None or len(metrics.queries) <= budget:
+            return
+        repeated_sql, repeated = metrics.most_repeated()
+        message = (f'{view} ran {len(metrics.queries)} queries (budget {budget}); '
+                   f'most repeated x{repeated}: {repeated_sql}')
+        if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+            raise QueryBudgetExceeded(message)
+        slow_log.warning(message)
+
+
+# ══════════════════════════════════════════════════════════
+#   InstrumentedTemplates — Django template backend that
+#   adds each top-level render's time to the request metrics
+# ══════════════════════════════════════════════════════════
+class InstrumentedTemplates(DjangoTemplates):
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return self._template.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self._template.render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
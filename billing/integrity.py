@@ -0,0 +1,162 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Max, Q, Sum, Window, Value, DecimalField
+from django.db.models.functions import Abs, Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Subscriber, Bill, Ledger
+
+
+# ══════════════════════════════════════════════════════════
+#   Ledger / bill integrity
+#
+#   Stored totals are checked against what the ledger says:
+#
+#   Ledger.running_balance  = Σ(debit − credit) of the subscriber's
+#                             entries up to and including this one,
+#                             in (entry_date, created_at, id) order
+#   Bill.amount_paid        = Σ credit of PAYMENT entries on the bill
+#   Bill.penalty_amount     = Σ debit of PENALTY entries on the bill
+#   Bill.total_amount_due   = basic + other charges + arrears + penalty
+#   Bill.balance            = total − paid (never below zero) while the
+#                             bill is open; a PAID bill owes nothing
+#   Bill.status             = OVERDUE while its last penalty is newer
+#                             than its last payment, else PARTIAL once
+#                             anything is paid
+#
+#   Work is split into subscriber-id ranges so chunks can be checked
+#   in parallel; each chunk is two queries (a window-function pass
+#   over the ledger and a grouped aggregate over bills).
+# ══════════════════════════════════════════════════════════
+TOLERANCE = Decimal('0.005')
+MONEY     = DecimalField(max_digits=12, decimal_places=2)
+ZERO      = Value(Decimal('0.00'), output_field=MONEY)
+OPEN      = ['UNPAID', 'PARTIAL', 'OVERDUE']
+BILL_FIELDS = ('amount_paid', 'penalty_amount', 'total_amount_due', 'balance', 'status')
+
+
+def subscriber_chunks(size):
+    """(first_id, last_id) ranges of about `size` subscribers each."""
+    ids = list(Subscriber.objects.order_by('id').values_list('id', flat=True))
+    return [(ids[i], ids[min(i + size, len(ids)) - 1]) for i in range(0, len(ids), size)]
+
+
+def ledger_drift(first_id, last_id):
+    """Entries whose stored running balance differs from the recomputed one."""
+    expected = Window(
+        Sum(F('debit') - F('credit'), output_field=MONEY),
+        partition_by = F('subscriber_id'),
+        order_by     = [F('entry_date').asc(), F('created_at').asc(), F('id').asc()],
+    )
+    return list(
+        Ledger.objects.filter(subscriber_id__gte=first_id, subscriber_id__lte=last_id)
+        .annotate(expected=expected)
+        .annotate(drift=Abs(F('expected') - F('running_balance')))
+        .filter(drift__gt=TOLERANCE)
+        .order_by()
+        .values('id', 'subscriber_id', 'running_balance', 'expected')
+    )
+
+
+def bill_drift(first_id, last_id):
+    """Bills whose stored totals disagree with their ledger entries or with each other."""
+    paid    = Coalesce(Sum('ledger_entries__credit', filter=Q(ledger_entries__entry_type='PAYMENT')),
+                       ZERO, output_field=MONEY)
+    penalty = Coalesce(Sum('ledger_entries__debit', filter=Q(ledger_entries__entry_type='PENALTY')),
+                       ZERO, output_field=MONEY)
+    bills = (
+        Bill.objects.filter(subscriber_id__gte=first_id, subscriber_id__lte=last_id)
+        .exclude(status='WRITTEN_OFF')
+        .annotate(ledger_paid=paid, ledger_penalty=penalty,
+                  last_paid_at=Max('ledger_entries__created_at',
+                                   filter=Q(ledger_entries__entry_type='PAYMENT')),
+                  last_penalty_at=Max('ledger_entries__created_at',
+                                      filter=Q(ledger_entries__entry_type='PENALTY')))
+        .annotate(
+            paid_drift    = Abs(F('amount_paid') - F('ledger_paid')),
+            penalty_drift = Abs(F('penalty_amount') - F('ledger_penalty')),
+            total_drift   = Abs(F('total_amount_due') - F('basic_charge') - F('other_charges')
+                                - F('arrears') - F('penalty_amount')),
+            open_drift    = Abs(F('balance') - Greatest(F('total_amount_due') - F('amount_paid'), ZERO)),
+        )
+        .filter(
+            Q(paid_drift__gt=TOLERANCE) | Q(penalty_drift__gt=TOLERANCE) |
+            Q(total_drift__gt=TOLERANCE) |
+            Q(status='PAID', balance__gt=TOLERANCE) |
+            Q(status__in=OPEN, open_drift__gt=TOLERANCE) |
+            Q(status__in=OPEN, balance__lte=TOLERANCE)
+        )
+        .order_by()
+    )
+    return [expected_bill(b) for b in bills]
+
+
+def expected_bill(bill):
+    """The bill's stored totals next to the values its ledger entries imply."""
+    paid    = bill.ledger_paid
+    penalty = bill.ledger_penalty
+    total   = bill.basic_charge + bill.other_charges + bill.arrears + penalty
+    if bill.status == 'PAID':
+        balance = Decimal('0.00')
+    else:
+        balance = max(total - paid, Decimal('0.00'))
+
+#     apply_penalty marks a part-paid bill OVERDUE; a payment after the penalty makes it PARTIAL
+    if balance <= 0:
+        status = 'PAID'
+    elif penalty > 0 and (paid <= 0 or bill.last_penalty_at > bill.last_paid_at):
+        status = 'OVERDUE'
+    elif paid > 0:
+        status = 'PARTIAL'
+    else:
+        status = 'UNPAID'
+
+    return {
+        'bill':     bill,
+        'stored':   {'amount_paid': bill.amount_paid, 'penalty_amount': bill.penalty_amount,
+                     'total_amount_due': bill.total_amount_due, 'balance': bill.balance,
+                     'status': bill.status},
+        'expected': {'amount_paid': paid, 'penalty_amount': penalty,
+                     'total_amount_due': total, 'balance': balance, 'status': status},
+    }
+
+
+def verify_chunk(first_id, last_id):
+    return {'ledger': ledger_drift(first_id, last_id), 'bills': bill_drift(first_id, last_id)}
+
+
+def fix_chunk(first_id, last_id):
+    """Recompute and repair one chunk inside a transaction; returns what was changed."""
+    with transaction.atomic():
+        found = verify_chunk(first_id, last_id)
+
+        Ledger.objects.bulk_update(
+            [Ledger(id=row['id'], running_balance=row['expected']) for row in found['ledger']],
+            ['running_balance'], batch_size=1000,
+        )
+
+#         bulk_update skips auto_now, and updated_at versions the cached notices
+        bills, now = [], timezone.now()
+        for item in found['bills']:
+            bill = item['bill']
+            for field, value in item['expected'].items():
+                setattr(bill, field, value)
+            bill.updated_at = now
+            bills.append(bill)
+        Bill.objects.bulk_update(bills, [*BILL_FIELDS, 'updated_at'], batch_size=1000)
+    return found
+
+
+def drift_by_account(results):
+    """subscriber_id → {'entries': n, 'max_drift': Decimal, 'bills': n}"""
+    accounts = defaultdict(lambda: {'entries': 0, 'max_drift': Decimal('0'), 'bills': 0})
+    for found in results:
+        for row in found['ledger']:
+            acct = accounts[row['subscriber_id']]
+            acct['entries']  += 1
+            acct['max_drift'] = max(acct['max_drift'], abs(row['expected'] - row['running_balance']))
+        for item in found['bills']:
+            accounts[item['bill'].subscriber_id]['bills'] += 1
+    return accounts
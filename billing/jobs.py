@@ -0,0 +1,330 @@
+"""
+Background jobs: management commands queued in the Job table and run by
+the run_jobs worker processes, so long operations (monthly billing,
+integrity checks, exports) don't tie up a web worker. No broker: the
+database is the queue.
+
+    enqueue('run_billing', {'billing_month': '2026-03-01'}, user=request.user)
+
+Workers claim the oldest due job under a row lock (SELECT … FOR UPDATE
+SKIP LOCKED on PostgreSQL; on SQLite the IMMEDIATE write transaction
+serializes claims), run it with call_command and keep its heartbeat,
+output tail and progress up to date. Commands report progress with
+report_progress(done, total), which does nothing outside a job. A job
+that raises is retried with exponential back-off up to max_attempts; a
+CommandError or unknown option fails at once.
+
+One job per command runs at a time: claims skip commands already running,
+and a unique partial index on RUNNING jobs (job_one_running_per_command)
+turns away the loser of two racing claims. Cancelling a queued job is
+immediate. A running job is only flagged (cancel_requested) and stays
+RUNNING, holding its command, until the worker stops it at its next
+progress report or the command finishes.
+
+JobSchedule rows enqueue a job whenever their cron expression comes due;
+the run_jobs parent process checks them every poll.
+"""
+import contextvars
+import io
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from django.core.management import call_command, get_commands
+from django.core.management.base import CommandError
+from django.db import DatabaseError, IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, JobSchedule
+
+#   commands staff may start from the Jobs page: command → label
+JOB_COMMANDS = {
+    'run_billing':         'Monthly billing',
+    'estimate_readings':   'Estimate unread meters',
+    'scan_anomalies':      'Scan readings for anomalies',
+    'route_books':         'Write route books',
+    'verify_ledger':       'Verify ledger and bill totals',
+    'export_snapshot':     'Export analytics snapshot',
+    'prerender_notices':   'Pre-render billing notices',
+    'statements':          'Statements of account, year to date',
+    'aging_snapshot':      'Receivables aging snapshot',
+    'refresh_summaries':   'Refresh monthly billing summaries',
+    'journal_export':      'Export new journal vouchers',
+    'or_audit':            'Check OR series, last 30 days',
+    'queue_notifications': 'Queue subscriber SMS and e-mail',
+    'send_notifications':  'Send queued SMS and e-mail',
+}
+MONTH_COMMANDS = {'run_billing', 'estimate_readings', 'scan_anomalies', 'route_books',
+                  'prerender_notices', 'queue_notifications'}
+
+POLL_SECONDS   = 2.0
+HEARTBEAT      = 30       # seconds between heartbeats of a running job
+STALE_AFTER    = 300      # a RUNNING job this long without a heartbeat lost its worker
+RETRY_BACKOFF  = 60       # seconds before the first retry; doubles each attempt
+PROGRESS_EVERY = 1.0      # seconds between progress writes
+OUTPUT_LIMIT   = 20_000   # characters of command output kept on the job
+
+log      = logging.getLogger('billing.jobs')
+_current = contextvars.ContextVar('billing_current_job', default=None)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def cancel(jobs):
+    """
+    Cancel the queued jobs in `jobs` and ask the running ones to stop;
+    returns how many. A running job is CANCELLED once its worker stops it.
+    """
+    return (jobs.filter(status='QUEUED').update(status='CANCELLED', finished_at=timezone.now())
+            + jobs.filter(status='RUNNING', cancel_requested=False).update(cancel_requested=True))
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def enqueue(command, arguments=None, user=None, priority=0, schedule=None, run_after=None):
+    if command not in get_commands():
+        raise ValueError(f'Unknown management command {command!r}')
+    return Job.objects.create(command=command, arguments=arguments or {}, requested_by=user,
+                              priority=priority, schedule=schedule, run_after=run_after or timezone.now())
+
+
+def claim(worker=None):
+    """The next due job, marked RUNNING for this worker; None when nothing is due."""
+    now  = timezone.now()
+#     one job per command at a time: two billing runs would race for the same readings
+    busy = Job.objects.filter(status='RUNNING').values('command')
+    try:
+        with transaction.atomic():
+            job = (Job.objects.select_for_update(skip_locked=True)
+                   .filter(status='QUEUED', run_after__lte=now)
+                   .exclude(command__in=busy)
+                   .order_by('-priority', 'run_after', 'id')
+                   .first())
+            if job is None:
+                return None
+            claimed = Job.objects.filter(pk=job.pk, status='QUEUED').update(
+                status        = 'RUNNING',
+                worker        = worker or worker_name(),
+                attempts      = F('attempts') + 1,
+                started_at    = now,
+                heartbeat_at  = now,
+                progress      = 0,
+                progress_note = '',
+            )
+    except IntegrityError:
+#         another worker started this command since `busy` was read; try again next poll
+        return None
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+# ══════════════════════════════════════════════════════════
+#   Running a job — output tail, progress and heartbeat
+# ══════════════════════════════════════════════════════════
+class JobOutput(io.TextIOBase):
+    """Write-only stream keeping the last OUTPUT_LIMIT characters."""
+
+    def __init__(self):
+        self.parts, self.size = [], 0
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size > 2 * OUTPUT_LIMIT:
+            tail = self.getvalue()
+            self.parts, self.size = [tail], len(tail)
+        return len(text)
+
+    def getvalue(self):
+        return ''.join(self.parts)[-OUTPUT_LIMIT:]
+
+
+class JobRun:
+    def __init__(self, job):
+        self.job       = job
+        self.output    = JobOutput()
+        self.last_save = 0.0
+
+    def update(self, **fields):
+        """Write to the job while it is still ours to run; raises JobCancelled otherwise."""
+        if not Job.objects.filter(pk=self.job.pk, status='RUNNING', cancel_requested=False).update(
+                heartbeat_at=timezone.now(), **fields):
+            raise JobCancelled(f'Job #{self.job.pk} was cancelled')
+
+    def progress(self, done, total, note=''):
+        now = time.monotonic()
+        if now - self.last_save < PROGRESS_EVERY and done < total:
+            return
+        self.last_save = now
+        percent = min(100, int(100 * done / total)) if total else 100
+        self.update(progress=percent, progress_note=note[:255], output=self.output.getvalue())
+
+
+def report_progress(done, total, note=''):
+    """Progress of the job running this code; a no-op outside the job workers."""
+    run = _current.get()
+    if run is not None:
+        run.progress(done, total, note)
+
+
+def _heartbeat(job_pk, stop):
+    try:
+        while not stop.wait(HEARTBEAT):
+            try:
+                Job.objects.filter(pk=job_pk, status='RUNNING').update(heartbeat_at=timezone.now())
+            except DatabaseError:
+#                 "database is locked" under a busy import: a dead heartbeat would get the job run twice
+                log.warning('Heartbeat of job %s failed; retrying', job_pk, exc_info=True)
+                close_old_connections()
+    finally:
+        close_old_connections()
+
+
+def run_job(job):
+    """Run a claimed job to completion and record the outcome; returns the final status."""
+    run   = JobRun(job)
+    token = _current.set(run)
+    stop  = threading.Event()
+    beat  = threading.Thread(target=_heartbeat, args=(job.pk, stop), daemon=True)
+    beat.start()
+
+    arguments = dict(job.arguments)
+    args      = arguments.pop('args', [])
+    outcome   = {'status': 'SUCCEEDED', 'progress': 100}
+    try:
+        call_command(job.command, *args, stdout=run.output, stderr=run.output, **arguments)
+    except JobCancelled:
+        outcome = None
+    except CommandError as e:
+        outcome = {'status': 'FAILED', 'error': str(e)}
+    except TypeError:                        # call_command: unknown option; a retry won't help
+        outcome = {'status': 'FAILED', 'error': traceback.format_exc()}
+    except Exception:
+        outcome = {'status': 'FAILED', 'error': traceback.format_exc()}
+        if job.attempts < job.max_attempts:
+            outcome.update(status='QUEUED', run_after=timezone.now() + timedelta(
+                seconds=RETRY_BACKOFF * 2 ** (job.attempts - 1)))
+    finally:
+        stop.set()
+        beat.join()
+        _current.reset(token)
+
+#     stopped on request, or failed after a cancel was asked for: never retried
+    if outcome is None or (outcome['status'] == 'QUEUED'
+                           and Job.objects.filter(pk=job.pk, cancel_requested=True).exists()):
+        outcome = {'status': 'CANCELLED'}
+    if outcome['status'] != 'QUEUED':
+        outcome['finished_at'] = timezone.now()
+    Job.objects.filter(pk=job.pk, status='RUNNING').update(output=run.output.getvalue(), **outcome)
+    return outcome['status']
+
+
+def requeue_stale(now=None):
+    """Jobs whose worker died: retried if attempts remain, else failed. Returns how many."""
+    now   = now or timezone.now()
+    stale = Job.objects.filter(status='RUNNING', heartbeat_at__lt=now - timedelta(seconds=STALE_AFTER))
+    lost  = 'Worker stopped sending heartbeats'
+    return (stale.filter(cancel_requested=True).update(status='CANCELLED', error=lost, finished_at=now)
+            + stale.filter(attempts__lt=F('max_attempts')).update(status='QUEUED', run_after=now, error=lost)
+            + stale.update(status='FAILED', error=lost, finished_at=now))
+
+
+# ══════════════════════════════════════════════════════════
+#   Schedules — five-field cron expressions in local time:
+#   minute hour day-of-month month day-of-week (0 = Sunday)
+#   with *, lists (1,15), ranges (1-5) and steps (*/15)
+# ══════════════════════════════════════════════════════════
+CRON_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+def parse_cron(expr):
+    """[minutes, hours, days, months, weekdays] as sets; raises ValueError on a bad expression."""
+    parts = expr.split()
+    if len(parts) != 5:
+        raise ValueError(f'{expr!r}: a cron expression has five fields')
+    fields = []
+    for part, (lo, hi) in zip(parts, CRON_FIELDS):
+        values = set()
+        for item in part.split(','):
+            span, _, step = item.partition('/')
+            try:
+                step = int(step) if step else 1
+                if span == '*':
+                    start, end = lo, hi
+                elif '-' in span:
+                    start, end = map(int, span.split('-'))
+                else:
+                    start = int(span)
+                    end   = hi if step > 1 else start
+            except ValueError:
+                raise ValueError(f'{expr!r}: cannot read {item!r}')
+            if not (lo <= start <= end <= hi) or step < 1:
+                raise ValueError(f'{expr!r}: {item!r} is outside {lo}-{hi}')
+            values.update(range(start, end + 1, step))
+        fields.append(values)
+    fields[4] = {d % 7 for d in fields[4]}        # 7 is Sunday too
+    return fields
+
+
+def next_run(expr, after):
+    """First time strictly after `after` that matches `expr`, as an aware datetime."""
+    minutes, hours, days, months, weekdays = parse_cron(expr)
+    any_day     = len(days) == 31
+    any_weekday = len(weekdays) == 7
+
+    def day_matches(t):
+        in_month = t.day in days
+        in_week  = (t.weekday() + 1) % 7 in weekdays
+        if any_day or any_weekday:
+            return in_month and in_week
+        return in_month or in_week               # cron: either field may match
+
+    t     = timezone.localtime(after).replace(tzinfo=None, second=0, microsecond=0) + timedelta(minutes=1)
+    limit = t + timedelta(days=5 * 366)
+    while t < limit:
+        if t.month not in months:
+            t = datetime(t.year + t.month // 12, t.month % 12 + 1, 1)
+        elif not day_matches(t):
+            t = datetime(t.year, t.month, t.day) + timedelta(days=1)
+        elif t.hour not in hours:
+            t = t.replace(minute=0) + timedelta(hours=1)
+        elif t.minute not in minutes:
+            t += timedelta(minutes=1)
+        else:
+            return timezone.make_aware(t)
+    raise ValueError(f'{expr!r} never comes due')
+
+
+def enqueue_due_schedules(now=None):
+    """Queue a job for every active schedule that has come due; returns the jobs queued."""
+    now    = now or timezone.now()
+    queued = []
+    for schedule in JobSchedule.objects.filter(is_active=True, next_run_at__isnull=True):
+        JobSchedule.objects.filter(pk=schedule.pk, next_run_at__isnull=True).update(
+            next_run_at=next_run(schedule.cron, now))
+
+    for schedule in JobSchedule.objects.filter(is_active=True, next_run_at__lte=now):
+        with transaction.atomic():
+#             the conditional update decides which scheduler process gets this slot
+            if not JobSchedule.objects.filter(pk=schedule.pk, next_run_at=schedule.next_run_at).update(
+                    next_run_at=next_run(schedule.cron, now), last_run_at=now):
+                continue
+#             a slot that comes due while the last run is still queued or running is skipped
+            if schedule.jobs.filter(status__in=['QUEUED', 'RUNNING']).exists():
+                continue
+            queued.append(enqueue(schedule.command, schedule.arguments, schedule=schedule))
+    return queued
@@ -0,0 +1,151 @@
+"""
+Daily journal vouchers for the municipal books, built from the ledger.
+
+Each voucher holds one day's ledger entries, summed per entry type and
+posted against Accounts Receivable through settings.JOURNAL_ACCOUNTS:
+
+    charge (ledger debit)    Dr receivable       Cr the type's account
+    credit (ledger credit)   Dr the type's acct  Cr receivable
+
+so every voucher balances by construction. A BILLING entry's debit
+includes the arrears carried from earlier bills, which were booked when
+those bills were issued. Only the new charges (debit less arrears) are
+journalled as revenue.
+
+Exports are incremental. The 'journal' HighWaterMark holds the last
+ledger id exported, and each run journals only newer entries. Entries
+from the last minute (HighWaterMark.SETTLE_SECONDS) wait for the next
+run: an entry committed late under a lower id would otherwise fall
+below the mark and never be journalled. A new
+entry dated on an already exported day gets its own voucher, numbered
+JV-<date>-<last ledger id>, rather than revising the posted one.
+export_year() writes one complete voucher per day (JV-<date>) for a
+whole year from the same grouped query and leaves the mark alone.
+
+Rows come from one grouped query streamed in date order, and vouchers
+are written as they complete, so a year's export stays small in memory.
+"""
+import csv
+import json
+from datetime import date
+from decimal import Decimal
+from itertools import groupby
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Sum, When
+
+from .models import Ledger, HighWaterMark
+
+MARK    = 'journal'
+FORMATS = ('csv', 'json')
+ZERO    = Decimal('0.00')
+
+CSV_HEADER = ['voucher', 'date', 'account', 'account_name', 'debit', 'credit', 'memo']
+
+
+def account_for(entry_type):
+    return settings.JOURNAL_ACCOUNTS.get(entry_type, settings.JOURNAL_ACCOUNTS['OTHER'])
+
+
+def daily_totals(entries):
+    """(entry_date, entry_type, charges, credits, count) rows in date order, one grouped query."""
+    amount  = DecimalField(max_digits=14, decimal_places=2)
+    charged = Case(When(entry_type='BILLING', bill__isnull=False, then=F('debit') - F('bill__arrears')),
+                   default=F('debit'), output_field=amount)
+    return (entries.values('entry_date', 'entry_type')
+            .annotate(charges=Sum(charged), credits=Sum('credit'), entries=Count('id'))
+            .order_by('entry_date', 'entry_type')
+            .values_list('entry_date', 'entry_type', 'charges', 'credits', 'entries')
+            .iterator())
+
+
+def voucher_lines(rows):
+    """Balanced journal lines for one day's rows: receivable debits, type lines, receivable credits."""
+    receivable = settings.JOURNAL_RECEIVABLE
+    charged    = sum((r[2] or ZERO for r in rows), ZERO)
+    credited   = sum((r[3] or ZERO for r in rows), ZERO)
+    lines = []
+    if charged:
+        lines.append((*receivable, charged, ZERO, 'Charges to subscriber accounts'))
+    for _, entry_type, charges, credits, count in rows:
+        account = account_for(entry_type)
+        memo    = f'{entry_type} × {count}'
+        if charges:
+            lines.append((*account, ZERO, charges, memo))
+        if credits:
+            lines.append((*account, credits, ZERO, memo))
+    if credited:
+        lines.append((*receivable, ZERO, credited, 'Credits to subscriber accounts'))
+    return lines
+
+
+def vouchers(entries, suffix=''):
+    """(voucher number, date, lines) per day of `entries`."""
+    for day, rows in groupby(daily_totals(entries), key=lambda r: r[0]):
+        lines = voucher_lines(list(rows))
+        if lines:
+            yield f'JV-{day:%Y%m%d}{suffix}', day, lines
+
+
+# ══════════════════════════════════════════════════════════
+#   Writers — CSV (one row per line) or a JSON array of
+#   vouchers, streamed to a temp file and moved into place
+# ══════════════════════════════════════════════════════════
+def write_vouchers(path, fmt, items):
+    """Write `items` from vouchers() to `path`; returns (vouchers, total debits)."""
+    path  = Path(path)
+    tmp   = path.with_name(f'.{path.name}.tmp')
+    count, total = 0, ZERO
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(tmp, 'w', newline='', encoding='utf-8') as fh:
+        if fmt == 'csv':
+            writer = csv.writer(fh)
+            writer.writerow(CSV_HEADER)
+        else:
+            fh.write('[')
+        for number, day, lines in items:
+            if fmt == 'csv':
+                writer.writerows([number, f'{day:%Y-%m-%d}', *line] for line in lines)
+            else:
+                fh.write(',\n' if count else '\n')
+                fh.write(json.dumps({
+                    'voucher': number,
+                    'date':    f'{day:%Y-%m-%d}',
+                    'lines':   [{'account': code, 'account_name': name, 'debit': str(debit),
+                                 'credit': str(credit), 'memo': memo}
+                                for code, name, debit, credit, memo in lines],
+                }))
+            count += 1
+            total += sum(line[2] for line in lines)
+        if fmt == 'json':
+            fh.write('\n]\n')
+    tmp.replace(path)
+    return count, total
+
+
+def export_new(root, fmt='csv'):
+    """
+    Journal the ledger entries added since the last export into one file
+    under `root`. Returns (path, vouchers, total debits), or None when there
+    is nothing new.
+    """
+    with transaction.atomic():
+        mark, _ = HighWaterMark.objects.select_for_update().get_or_create(name=MARK)
+        up_to   = HighWaterMark.settled_ledger_id()
+        if up_to <= mark.last_id:
+            return None
+        entries = Ledger.objects.filter(id__gt=mark.last_id, id__lte=up_to)
+        path    = Path(root) / f'journal-{mark.last_id + 1}-{up_to}.{fmt}'
+        count, total = write_vouchers(path, fmt, vouchers(entries, suffix=f'-{up_to}'))
+        mark.last_id = up_to
+        mark.save()
+    return path, count, total
+
+
+def export_year(root, year, fmt='csv'):
+    """One complete voucher per day of `year`; returns (path, vouchers, total debits)."""
+    entries = Ledger.objects.filter(entry_date__gte=date(year, 1, 1), entry_date__lt=date(year + 1, 1, 1))
+    path    = Path(root) / f'journal-{year}.{fmt}'
+    return (path, *write_vouchers(path, fmt, vouchers(entries)))
@@ -0,0 +1,236 @@
+"""
+Concurrent-user load test for the cashier and meter-reader workflows,
+run by the load_test command.
+
+Each simulated user is a thread with its own logged-in session, driving a
+weighted mix of subscriber search, dashboard loads, payments and the
+reading → bill flow. Requests go either through Django's test client
+(in-process, one DB connection per thread) or over HTTP to a running
+server. Latencies and outcomes are kept per endpoint so one report shows
+where throughput flattens and where locks start as users are added.
+"""
+import http.cookiejar
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import OperationalError, connection
+from django.test import Client
+
+from .models import Subscriber, Bill
+from .services import months_before
+
+#   workflow: relative weight in the mix
+MIX = {
+    'search':    35,
+    'dashboard': 15,
+    'payment':   30,
+    'reading':   20,
+}
+SEARCH_TERMS = ['Santos', 'Reyes', 'Garcia', 'Cruz', 'Maria', 'Jose', 'SYN-00012', 'Flores']
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+# ══════════════════════════════════════════════════════════
+#   Drivers — how a simulated user reaches the views
+#   get()/post() return (status, location); a raised
+#   OperationalError counts as a lock or DB error
+# ══════════════════════════════════════════════════════════
+class ClientDriver:
+    """In-process, through the full middleware stack."""
+
+    def __init__(self, user):
+        self.client = Client(HTTP_HOST='localhost')
+        self.client.force_login(user)
+
+    def get(self, path, params=None):
+        response = self.client.get(path, params or {})
+        return response.status_code, response.get('Location', '')
+
+    def post(self, path, data):
+        response = self.client.post(path, data)
+        return response.status_code, response.get('Location', '')
+
+    def close(self):
+        connection.close()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpDriver:
+    """Over HTTP against a running server, logging in through the login form."""
+
+    def __init__(self, base_url, username, password):
+        self.base   = base_url.rstrip('/')
+        self.jar    = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.jar), _NoRedirect())
+        self.get('/accounts/login/')
+        status, _ = self.post('/accounts/login/', {'username': username, 'password': password})
+        if status != 302:
+            raise RuntimeError(f'Login as {username!r} failed (HTTP {status})')
+
+    def _open(self, request):
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                response.read()
+                return response.status, ''
+        except urllib.error.HTTPError as e:
+            body = e.read().decode(errors='replace')
+            if 'database is locked' in body:
+                raise OperationalError('database is locked')
+            return e.code, e.headers.get('Location', '')
+
+    def get(self, path, params=None):
+        query = f'?{urllib.parse.urlencode(params)}' if params else ''
+        return self._open(urllib.request.Request(self.base + path + query))
+
+    def post(self, path, data):
+        token = next((c.value for c in self.jar if c.name == 'csrftoken'), '')
+        body  = urllib.parse.urlencode({**data, 'csrfmiddlewaretoken': token}).encode()
+        return self._open(urllib.request.Request(
+            self.base + path, data=body, headers={'Referer': self.base + path}))
+
+    def close(self):
+        pass
+
+
+# ══════════════════════════════════════════════════════════
+#   LoadTest — shared work pools, the workflows, and stats
+# ══════════════════════════════════════════════════════════
+class LoadTest:
+    def __init__(self, make_driver, seed=None):
+        today              = date.today()
+        self.make_driver   = make_driver
+        self.billing_month = date(today.year, today.month, 1)
+        self.rng_seed      = seed
+        self.lock          = threading.Lock()
+
+#         payments go to last month's open bills; small amounts keep them open
+        last_month = months_before(self.billing_month, 1)
+        self.open_bills = list(Bill.objects.filter(
+            billing_month=last_month, status__in=['UNPAID', 'PARTIAL', 'OVERDUE'],
+        ).values_list('id', flat=True)[:5000])
+#         readings go to active subscribers not yet read this month, each used once
+        self.unread = list(Subscriber.objects.filter(
+            status='ACTIVE', latest_reading__isnull=False,
+        ).exclude(meter_readings__billing_month=self.billing_month).values_list(
+            'id', 'latest_reading__current_reading')[:20000])
+        random.Random(seed).shuffle(self.unread)
+
+    def run(self, users, seconds):
+        """One concurrency step: `users` threads for `seconds`; returns per-endpoint samples."""
+        samples  = defaultdict(list)                        # endpoint → [(seconds, outcome)]
+        deadline = time.perf_counter() + seconds
+        failures = []
+        step     = f'{time.time_ns() // 1_000_000:x}'       # OR numbers are unique across runs
+
+        def user_loop(n):
+            try:
+                driver = self.make_driver()
+            except Exception as e:
+                failures.append(e)
+                return
+            rng      = random.Random(None if self.rng_seed is None else self.rng_seed + n)
+            local    = defaultdict(list)
+            sequence = 0
+            try:
+                while time.perf_counter() < deadline:
+                    sequence += 1
+                    workflow  = rng.choices(list(MIX), weights=list(MIX.values()))[0]
+                    getattr(self, f'do_{workflow}')(driver, rng, local, f'{step}-{n}-{sequence}')
+            finally:
+                driver.close()
+                with self.lock:
+                    for endpoint, values in local.items():
+                        samples[endpoint].extend(values)
+
+        threads = [threading.Thread(target=user_loop, args=(n,)) for n in range(users)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if failures:
+            raise failures[0]
+        return samples
+
+    @staticmethod
+    def hit(local, endpoint, call):
+        start = time.perf_counter()
+        try:
+            status, location = call()
+            outcome = 'ok' if status < 400 else 'error'
+        except OperationalError as e:
+            status, location = None, ''
+            outcome = 'locked' if 'locked' in str(e) else 'error'
+        except Exception:
+            status, location = None, ''
+            outcome = 'error'
+        local[endpoint].append((time.perf_counter() - start, outcome))
+        return status, location
+
+    # ── workflows ─────────────────────────────────────────────
+    def do_search(self, driver, rng, local, tag):
+        self.hit(local, 'subscriber_list', lambda: driver.get('/subscribers/', {'q': rng.choice(SEARCH_TERMS)}))
+
+    def do_dashboard(self, driver, rng, local, tag):
+        self.hit(local, 'dashboard', lambda: driver.get('/'))
+
+    def do_payment(self, driver, rng, local, tag):
+        if not self.open_bills:
+            return self.do_search(driver, rng, local, tag)
+        bill_id = rng.choice(self.open_bills)
+        self.hit(local, 'record_payment', lambda: driver.post(f'/bills/{bill_id}/pay/', {
+            'amount_paid': '50.00', 'or_number': f'LT-{tag}', 'received_by': 'Load test',
+        }))
+
+    def do_reading(self, driver, rng, local, tag):
+        with self.lock:
+            job = self.unread.pop() if self.unread else None
+        if job is None:
+            return self.do_search(driver, rng, local, tag)
+        sub_id, previous = job
+        status, location = self.hit(local, 'reading_create', lambda: driver.post(
+            f'/readings/{sub_id}/add/', {
+                'subscriber': sub_id, 'billing_month': self.billing_month.isoformat(),
+                'reading_date': date.today().isoformat(), 'previous_reading': previous,
+                'current_reading': previous + rng.randint(5, 40), 'reader_name': 'Load test',
+            }))
+        if status != 302 or '/bills/generate/' not in location:
+            return
+        self.hit(local, 'generate_bill_view', lambda: driver.post(location, {
+            'billing_month': self.billing_month.isoformat(),
+            'due_date':      (self.billing_month + timedelta(days=15)).isoformat(),
+            'cutoff_date':   (self.billing_month + timedelta(days=20)).isoformat(),
+        }))
+
+
+def summarize(samples, seconds):
+    """Per-endpoint throughput, latency percentiles (ms) and error / lock rates."""
+    rows = {}
+    for endpoint, values in sorted(samples.items()):
+        times = sorted(t for t, _ in values)
+        n     = len(values)
+        rows[endpoint] = {
+            'requests':  n,
+            'per_sec':   round(n / seconds, 1),
+            'p50_ms':    round(percentile(times, 50) * 1000, 1),
+            'p95_ms':    round(percentile(times, 95) * 1000, 1),
+            'p99_ms':    round(percentile(times, 99) * 1000, 1),
+            'error_pct': round(100 * sum(o == 'error' for _, o in values) / n, 2),
+            'lock_pct':  round(100 * sum(o == 'locked' for _, o in values) / n, 2),
+        }
+    return rows
@@ -0,0 +1,12 @@
+from billing.aging import take_snapshot
+from billing.profiling import ProfiledCommand
+
+class Command(ProfiledCommand):
+    help = ('Compute receivables aging per subscriber (current to over 120 days past due) and store '
+            'it as today\'s snapshot for the delinquent accounts report; rerunning replaces it')
+
+    def handle(self, *args, **options):
+        stored = take_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f'Done. {stored} accounts with an open balance.'
+        ))
@@ -0,0 +1,151 @@
+import json
+import os
+import random
+import threading
+import time
+from argparse import SUPPRESS
+from datetime import date
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction, OperationalError
+from django.db.models import Sum
+
+from billing.models import Subscriber, Bill, Ledger
+from billing.scratch import require_scratch, run_worker
+from billing.services import get_running_balance
+from macrohon_water.database import PROFILES
+
+SEED_SUBSCRIBERS = 200
+SEED_ENTRIES     = 24
+
+
+class Command(BaseCommand):
+    help = ('Measure concurrent read/write throughput of each database profile. '
+            'Every profile runs in its own scratch database; live data is never touched.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile',   action='append', choices=PROFILES,
+                            help='Profile to benchmark (repeatable; default: sqlite-default and sqlite)')
+        parser.add_argument('--threads',   type=int, default=8,
+                            help='Concurrent workers, like cashiers at their desks (default: 8)')
+        parser.add_argument('--seconds',   type=float, default=10,
+                            help='Run time per profile (default: 10)')
+        parser.add_argument('--write-pct', type=int, default=20,
+                            help='Percent of operations that post a payment (default: 20)')
+        parser.add_argument('--worker',    action='store_true', help=SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            return self.run_worker(options)
+
+        rows = []
+        for profile in options['profile'] or ['sqlite-default', 'sqlite']:
+            self.stdout.write(f'Benchmarking {profile} ...')
+            rows.append(self.run_profile(profile, options))
+
+        self.stdout.write('')
+        self.stdout.write(f'{"Profile":<16}{"ops/s":>9}{"reads/s":>9}{"writes/s":>9}'
+                          f'{"read p95":>10}{"write p95":>11}{"locked":>8}')
+        for r in rows:
+            self.stdout.write(
+                f'{r["profile"]:<16}{r["ops_per_sec"]:>9.1f}{r["reads_per_sec"]:>9.1f}'
+                f'{r["writes_per_sec"]:>9.1f}{r["read_p95_ms"]:>8.1f}ms{r["write_p95_ms"]:>9.1f}ms'
+                f'{r["errors"]:>8}'
+            )
+
+    # ── parent: one subprocess per profile, each on a scratch database ──
+    def run_profile(self, profile, options):
+        return run_worker('benchmark_db',
+                          ['--threads', str(options['threads']), '--seconds', str(options['seconds']),
+                           '--write-pct', str(options['write_pct'])],
+                          f'{profile} benchmark', profile=profile)
+
+    # ── worker: seed, hammer from N threads, print one JSON line ──
+    def run_worker(self, options):
+        require_scratch()
+
+        call_command('migrate', verbosity=0)
+        subscriber_ids = self.seed()
+        deadline  = time.perf_counter() + options['seconds']
+        write_pct = options['write_pct']
+        results   = []
+
+        def work():
+            reads, writes, errors = [], [], 0
+            rng = random.Random()
+            try:
+                while time.perf_counter() < deadline:
+                    sub_id = rng.choice(subscriber_ids)
+                    start  = time.perf_counter()
+                    try:
+                        if rng.randrange(100) < write_pct:
+                            self.post_payment(sub_id)
+                            writes.append(time.perf_counter() - start)
+                        else:
+                            self.read_account(sub_id)
+                            reads.append(time.perf_counter() - start)
+                    except OperationalError:        # "database is locked" and friends
+                        errors += 1
+            finally:
+                connection.close()
+            results.append((reads, writes, errors))
+
+        threads = [threading.Thread(target=work) for _ in range(options['threads'])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        reads  = sorted(x for r, _, _ in results for x in r)
+        writes = sorted(x for _, w, _ in results for x in w)
+        p95    = lambda xs: xs[int(len(xs) * 0.95)] * 1000 if xs else 0.0
+        secs   = options['seconds']
+        self.stdout.write(json.dumps({
+            'profile':        os.environ.get('DATABASE_PROFILE', 'sqlite'),
+            'ops_per_sec':    (len(reads) + len(writes)) / secs,
+            'reads_per_sec':  len(reads) / secs,
+            'writes_per_sec': len(writes) / secs,
+            'read_p95_ms':    p95(reads),
+            'write_p95_ms':   p95(writes),
+            'errors':         sum(e for _, _, e in results),
+        }))
+
+        if connection.vendor != 'sqlite':       # scratch sqlite files are simply deleted
+            Subscriber.objects.filter(pk__in=subscriber_ids).delete()
+
+    def seed(self):
+        subs = Subscriber.objects.bulk_create([
+            Subscriber(
+                account_number=f'BENCH-{i:05d}', last_name='Benchmark', first_name=str(i),
+                address='-', barangay='Benchmark', meter_number=f'BENCH-{i:05d}',
+                service_address='-', connection_date=date(2020, 1, 1),
+            ) for i in range(SEED_SUBSCRIBERS)
+        ])
+        Ledger.objects.bulk_create([
+            Ledger(subscriber=sub, entry_date=date(2024, 1 + m % 12, 1), entry_type='BILLING',
+                   description='Benchmark bill', debit=Decimal('250.00'))
+            for sub in subs for m in range(SEED_ENTRIES)
+        ])
+        return [s.pk for s in subs]
+
+    @staticmethod
+    def read_account(sub_id):
+        sub = Subscriber.objects.get(pk=sub_id)
+        get_running_balance(sub)
+        list(sub.ledger_entries.order_by('-entry_date', '-created_at')[:20])
+        Bill.objects.filter(subscriber_id=sub_id, status__in=['UNPAID', 'PARTIAL']).aggregate(Sum('balance'))
+
+    @staticmethod
+    def post_payment(sub_id):
+        with transaction.atomic():
+            sub = Subscriber.objects.get(pk=sub_id)
+            Ledger.objects.create(
+                subscriber      = sub,
+                entry_date      = date.today(),
+                entry_type      = 'PAYMENT',
+                description     = 'Benchmark payment',
+                credit          = Decimal('100.00'),
+                running_balance = get_running_balance(sub) - Decimal('100.00'),
+            )
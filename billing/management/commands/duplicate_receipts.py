@@ -0,0 +1,27 @@
+from billing.cashiering import duplicate_receipts, renumber_duplicates
+from billing.profiling import ProfiledCommand
+
+class Command(ProfiledCommand):
+    help = ('List payments that share an OR number, which migration 0011 (the unique OR '
+            'constraint) refuses to apply over; --renumber suffixes all but the first on each OR')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renumber', action='store_true',
+                            help="Keep the first payment's OR and add -2, -3, … to the others")
+
+    def handle(self, *args, **options):
+        found = duplicate_receipts()
+        for or_number, entries in found.items():
+            self.stdout.write(f'{or_number}  ({len(entries)} payments)')
+            for entry in entries:
+                self.stdout.write(f'    #{entry.pk:<8} {entry.entry_date}  {entry.subscriber.account_number:<16} '
+                                  f'{entry.credit:>12,.2f}  {entry.received_by or "—"}')
+
+        if options['renumber'] and found:
+            changed = renumber_duplicates(found)
+            for entry in changed:
+                self.stdout.write(f'    #{entry.pk} is now {entry.or_number}')
+            self.stdout.write(self.style.SUCCESS(
+                f'Done. {len(changed)} payments renumbered on {len(found)} OR numbers.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Done. {len(found)} OR numbers used more than once.'))
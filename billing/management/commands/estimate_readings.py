@@ -0,0 +1,26 @@
+from datetime import date
+from billing.profiling import ProfiledCommand
+from billing.services import estimate_unread_readings, ESTIMATE_AVERAGE_MONTHS
+ 
+class Command(ProfiledCommand):
+    help = 'Create estimated readings for active subscribers whose meters were not read this month'
+ 
+    def add_arguments(self, parser):
+        parser.add_argument('--billing-month', type=str,
+                            help='YYYY-MM-DD (first day of billing month)')
+        parser.add_argument('--months',       type=int, default=ESTIMATE_AVERAGE_MONTHS,
+                            help=f'Trailing months of actual readings to average (default: {ESTIMATE_AVERAGE_MONTHS})')
+ 
+    def handle(self, *args, **options):
+        if options['billing_month']:
+            billing_month = date.fromisoformat(options['billing_month'])
+        else:
+            today = date.today()
+            billing_month = date(today.year, today.month, 1)
+ 
+        result = estimate_unread_readings(billing_month, options['months'])
+ 
+        self.stdout.write(self.style.SUCCESS(
+            f'Done. {result["estimated"]} readings estimated. '
+            f'{result["skipped"]} skipped (no reading history).'
+        ))
@@ -0,0 +1,330 @@
+import random
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from billing.models import (
+    Subscriber, WaterRate, MeterReading, Bill,
+    Ledger, OtherCharge, DisconnectionNotice, ReadingFlag
+)
+from billing.services import months_before, settled, water_charge
+
+SYNTHETIC_PREFIX = 'SYN'
+
+BARANGAYS = [
+    'Amparo', 'Asuncion', 'Bagong Silang', 'Buscayan', 'Cambaro', 'Canlusay',
+    'Danao', 'Flordeliz', 'Guadalupe', 'Ichon', 'Ilihan', 'Laray', 'Mabini',
+    'Mohon', 'Molopolo', 'Poblacion', 'Rizal', 'Salvador', 'San Isidro',
+    'San Joaquin', 'San Roque', 'San Vicente', 'Santa Cruz', 'Santo Niño',
+]
+LAST_NAMES  = ['Dela Cruz', 'Santos', 'Reyes', 'Garcia', 'Mendoza', 'Bautista', 'Gonzales',
+               'Ramos', 'Aquino', 'Villanueva', 'Castillo', 'Flores', 'Rivera', 'Torres',
+               'Navarro', 'Salazar', 'Pacquiao', 'Lim', 'Tan', 'Cabrera', 'Morales', 'Rizal']
+FIRST_NAMES = ['Juan', 'Maria', 'Jose', 'Ana', 'Pedro', 'Rosa', 'Antonio', 'Carmen',
+               'Manuel', 'Elena', 'Ramon', 'Teresita', 'Eduardo', 'Luz', 'Roberto', 'Grace',
+               'Ricardo', 'Josefina', 'Mark', 'Angelica', 'John Paul', 'Kristine']
+CASHIERS    = ['Cashier 1 - Dela Pena', 'Cashier 2 - Ocampo', 'Cashier 3 - Abad', 'Collector - Uy']
+
+#   classification: (share of accounts, median cu.m per month, log-spread)
+CLASSES = {
+    'PRIVATE':    (0.85,  16, 0.45),
+    'COMMERCIAL': (0.10,  45, 0.60),
+    'GOVERNMENT': (0.03,  70, 0.50),
+    'BULK':       (0.02, 250, 0.40),
+}
+DEFAULT_RATES = {            # used only when a classification has no active rate
+    'PRIVATE':    (Decimal('150.00'), Decimal('10.00'), Decimal('15.50')),
+    'COMMERCIAL': (Decimal('250.00'), Decimal('10.00'), Decimal('18.00')),
+    'GOVERNMENT': (Decimal('200.00'), Decimal('10.00'), Decimal('16.00')),
+    'BULK':       (Decimal('400.00'), Decimal('20.00'), Decimal('14.00')),
+}
+#   March–May is the dry season: more water use
+SEASON = {1: 0.95, 2: 0.97, 3: 1.10, 4: 1.20, 5: 1.15, 6: 1.00,
+          7: 0.95, 8: 0.93, 9: 0.95, 10: 0.97, 11: 1.00, 12: 1.05}
+#   payer profile: (share, chance a bill is paid on time, chance it is paid at all)
+PAYERS = [(0.80, 0.97, 1.00), (0.14, 0.55, 0.95), (0.06, 0.20, 0.55)]
+
+PENALTY_RATE = Decimal('10.00')
+OPEN         = ('UNPAID', 'PARTIAL', 'OVERDUE')
+CENT         = Decimal('0.01')
+
+
+class Command(BaseCommand):
+    help = ('Generate a seeded, production-scale synthetic dataset: subscribers, monthly readings, '
+            'bills, penalties, payments and disconnection notices following the billing rules')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=1000,
+                            help='Number of subscribers (default: 1000)')
+        parser.add_argument('--years',       type=int, default=5,
+                            help='Years of monthly history ending last month (default: 5)')
+        parser.add_argument('--until',       type=str,
+                            help='YYYY-MM: generate the data as of the first of this month, history '
+                                 'ending the month before (default: this month)')
+        parser.add_argument('--seed',        type=int, default=2026,
+                            help='Random seed; same seed and size give the same data (default: 2026)')
+        parser.add_argument('--chunk',       type=int, default=1000,
+                            help='Subscribers written per transaction (default: 1000)')
+        parser.add_argument('--replace',     action='store_true',
+                            help=f'Delete previously generated {SYNTHETIC_PREFIX}- accounts first')
+
+    def handle(self, *args, **options):
+        today = date.today()
+        if options['until']:
+            try:
+                today = datetime.strptime(options['until'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--until must be a month as YYYY-MM, e.g. 2026-10')
+
+        if Subscriber.objects.filter(account_number__startswith=f'{SYNTHETIC_PREFIX}-').exists():
+            if not options['replace']:
+                raise CommandError('Synthetic data already exists; use --replace to regenerate it.')
+            self.stdout.write('Deleting previous synthetic data ...')
+            self.delete_synthetic()
+
+        self.rng     = random.Random(options['seed'])
+        self.rates   = self.load_rates()
+        self.today   = today
+        self.months  = [months_before(date(today.year, today.month, 1), n)
+                        for n in range(options['years'] * 12, 0, -1)]
+        self.ids     = {model: (model.objects.aggregate(m=Max('pk'))['m'] or 0)
+                        for model in (Subscriber, MeterReading, Bill, Ledger, DisconnectionNotice)}
+        self.clock   = timezone.now()
+        if not connection.features.supports_timezones:     # SQLite stores naive UTC
+            self.clock = timezone.make_naive(self.clock, dt_timezone.utc)
+        self.or_next = {cashier: (i + 1) * 10_000_000 for i, cashier in enumerate(CASHIERS)}
+        self.totals  = dict.fromkeys(['subscribers', 'readings', 'bills', 'ledger', 'notices'], 0)
+        self.tables  = {model: self.table_spec(model)
+                        for model in (Subscriber, MeterReading, Bill, Ledger, DisconnectionNotice)}
+
+        started = time.perf_counter()
+        total   = options['subscribers']
+        for start in range(0, total, options['chunk']):
+            self.write_chunk(range(start, min(start + options['chunk'], total)))
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'  {min(start + options["chunk"], total):>8} / {total} subscribers '
+                              f'({self.totals["ledger"]} ledger entries, {elapsed:.0f}s)')
+
+#         rows were inserted with explicit ids; move PostgreSQL sequences past them
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), list(self.tables)):
+                cursor.execute(sql)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Done. ' + ', '.join(f'{v} {k}' for k, v in self.totals.items()) +
+            f' in {time.perf_counter() - started:.0f}s.'
+        ))
+
+    def load_rates(self):
+        rates = {}
+        for cls, defaults in DEFAULT_RATES.items():
+            rate = WaterRate.objects.filter(classification=cls, is_active=True).first()
+            if rate is None:
+                minimum_charge, minimum_volume, per_cu_m = defaults
+                rate = WaterRate.objects.create(
+                    classification=cls, minimum_charge=minimum_charge,
+                    minimum_volume=minimum_volume, rate_per_cubic_m=per_cu_m,
+                    effective_date=date(2020, 1, 1), approved_by='Synthetic dataset',
+                )
+            rates[cls] = rate
+        return rates
+
+    def delete_synthetic(self):
+        """Plain DELETEs, children first — the ORM cascade would load every row into memory."""
+        qn      = connection.ops.quote_name
+        subs    = f'SELECT id FROM {qn(Subscriber._meta.db_table)} WHERE account_number LIKE %s'
+        pattern = [f'{SYNTHETIC_PREFIX}-%']
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {qn(Subscriber._meta.db_table)} SET latest_reading_id = NULL '
+                           f'WHERE id IN ({subs})', pattern)
+            for model in (ReadingFlag, DisconnectionNotice, OtherCharge, Ledger, Bill, MeterReading):
+                cursor.execute(f'DELETE FROM {qn(model._meta.db_table)} '
+                               f'WHERE subscriber_id IN ({subs})', pattern)
+            cursor.execute(f'DELETE FROM {qn(Subscriber._meta.db_table)} WHERE id IN ({subs})', pattern)
+
+    @staticmethod
+    def table_spec(model):
+        """INSERT statement, column defaults and auto-timestamp columns for plain dict rows."""
+        qn      = connection.ops.quote_name
+        fields  = model._meta.concrete_fields
+        stamped = [f.attname for f in fields
+                   if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)]
+        defaults = {f.attname: f.get_default() for f in fields}
+        sql = (f'INSERT INTO {qn(model._meta.db_table)} '
+               f'({", ".join(qn(f.column) for f in fields)}) '
+               f'VALUES ({", ".join(["%s"] * len(fields))})')
+        return sql, defaults, stamped
+
+    def tick(self):
+        """A strictly increasing created_at, so ledger ties on entry_date keep insert order."""
+        self.clock += timedelta(microseconds=1)
+        return self.clock
+
+    def next_id(self, model):
+        self.ids[model] += 1
+        return self.ids[model]
+
+    # ── one transaction per chunk of subscribers ──────────────
+    def write_chunk(self, numbers):
+        rows = {model: [] for model in self.tables}
+        for n in numbers:
+            self.build_subscriber(n, rows)
+
+#         FKs are deferred until commit, so insert order within the transaction is free
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model, dicts in rows.items():
+                sql, defaults, stamped = self.tables[model]
+                values = []
+                for row in dicts:
+                    full = {**defaults, **row}
+                    for name in stamped:
+                        if name not in row:
+                            full[name] = self.tick()
+                    values.append(tuple(full.values()))
+                for i in range(0, len(values), 5000):
+                    cursor.executemany(sql, values[i:i + 5000])
+
+        self.totals['subscribers'] += len(rows[Subscriber])
+        self.totals['readings']    += len(rows[MeterReading])
+        self.totals['bills']       += len(rows[Bill])
+        self.totals['ledger']      += len(rows[Ledger])
+        self.totals['notices']     += len(rows[DisconnectionNotice])
+
+    def build_subscriber(self, n, rows):
+        rng = self.rng
+        cls = rng.choices(list(CLASSES), weights=[c[0] for c in CLASSES.values()])[0]
+        _, median, spread = CLASSES[cls]
+        household = rng.lognormvariate(0, spread)          # this account's usual level
+        on_time, pays_at_all = rng.choices([p[1:] for p in PAYERS], weights=[p[0] for p in PAYERS])[0]
+        months = self.months[rng.randrange(0, len(self.months) // 4 + 1):]   # some connect later
+        barangay = rng.choice(BARANGAYS)
+
+        sub = dict(
+            id              = self.next_id(Subscriber),
+            account_number  = f'{SYNTHETIC_PREFIX}-{n:07d}',
+            last_name       = rng.choice(LAST_NAMES),
+            first_name      = rng.choice(FIRST_NAMES),
+            address         = f'Purok {rng.randint(1, 7)}, {barangay}',
+            barangay        = barangay,
+            contact_number  = '',                          # a random 09… number is someone's real phone
+            classification  = cls,
+            meter_number    = f'{SYNTHETIC_PREFIX}-M{n:07d}',
+            service_address = f'Purok {rng.randint(1, 7)}, {barangay}, Macrohon',
+            connection_date = months[0] - timedelta(days=rng.randint(1, 60)),
+            is_senior       = cls == 'PRIVATE' and rng.random() < 0.12,
+        )
+        rows[Subscriber].append(sub)
+
+        register   = Decimal(rng.randint(0, 500))
+        balance    = Decimal('0.00')                       # ledger running balance
+        open_bills = []
+        notice     = None
+
+        for month in months:
+#             ── reading ───────────────────────────────────────
+            if rng.random() < 0.02:
+                use = Decimal('0')                         # vacant / away this month
+            else:
+                use = Decimal(max(0, round(median * household * SEASON[month.month]
+                                           * rng.lognormvariate(0, 0.25))))
+            reading = dict(
+                id=self.next_id(MeterReading), subscriber_id=sub['id'], billing_month=month,
+                reading_date=month + timedelta(days=rng.randint(0, 4)),
+                previous_reading=register, current_reading=register + use,
+                reader_name='Route Reader',
+            )
+            register += use
+            rows[MeterReading].append(reading)
+
+#             ── bill (same arithmetic as services.generate_bill) ─
+            basic, discount = water_charge(self.rates[cls], sub['is_senior'], use)
+            arrears = sum((b['balance'] for b in open_bills), Decimal('0.00'))
+            total   = basic + arrears
+            bill = dict(
+                id=self.next_id(Bill), subscriber_id=sub['id'], meter_reading_id=reading['id'],
+                billing_month=month, due_date=month + timedelta(days=15),
+                cutoff_date=month + timedelta(days=20), volume_consumed=use,
+                basic_charge=basic, senior_discount=discount, arrears=arrears,
+                penalty_amount=Decimal('0.00'), amount_paid=Decimal('0.00'),
+                total_amount_due=total, balance=total, status='UNPAID',
+                generated_by='Synthetic dataset',
+            )
+            rows[Bill].append(bill)
+            balance += total
+            self.post(rows, bill, month, 'BILLING', f'Water Bill for {month:%B %Y}',
+                      debit=total, running_balance=balance)
+            open_bills.append(bill)
+
+#             ── payment behaviour for this bill ───────────────
+            if rng.random() < on_time:
+                pay_day = month + timedelta(days=rng.randint(3, 15))
+            elif rng.random() < pays_at_all:
+                pay_day = month + timedelta(days=rng.randint(16, 28))
+            else:
+                pay_day = None
+            if pay_day and pay_day > self.today:
+                pay_day = None                             # not paid yet
+            if pay_day is None and bill['due_date'] >= self.today:
+                open_bills = [b for b in open_bills if b['status'] in OPEN]
+                continue                                   # still within the due period
+
+            if pay_day is None or pay_day > bill['due_date']:
+#                 apply_penalty on the day after the due date
+                penalty = (bill['balance'] * PENALTY_RATE / 100).quantize(CENT)
+                bill['penalty_amount']   += penalty
+                bill['total_amount_due'] += penalty
+                bill['balance']          += penalty
+                bill['status']            = 'OVERDUE'
+                balance += penalty
+                self.post(rows, bill, bill['due_date'] + timedelta(days=1), 'PENALTY',
+                          f'{PENALTY_RATE}% Late Penalty — {month:%B %Y}',
+                          debit=penalty, running_balance=balance)
+
+            if pay_day is not None:
+                amount = bill['balance'] if rng.random() < 0.9 else (bill['balance'] / 2).quantize(CENT)
+                balance -= amount
+                self.pay(rows, bill, amount, pay_day, balance)
+                if notice:                                 # settled before the cutoff
+                    notice['status'] = 'CANCELLED'
+                    notice = None
+            elif notice:
+#                 notice ignored past its cutoff → disconnected, billing stops
+                notice['status']          = 'DISCONNECTED'
+                sub['status']             = 'DISCONNECTED'
+                sub['disconnection_date'] = notice['cutoff_date']
+                break
+            elif sum(1 for b in open_bills if b['status'] in OPEN) >= 2:
+                notice = dict(
+                    id=self.next_id(DisconnectionNotice), subscriber_id=sub['id'],
+                    bill_id=bill['id'], notice_date=bill['cutoff_date'],
+                    cutoff_date=bill['cutoff_date'], amount_overdue=bill['balance'],
+                    issued_by='Synthetic dataset', status='DELIVERED',
+                )
+                rows[DisconnectionNotice].append(notice)
+
+            open_bills = [b for b in open_bills if b['status'] in OPEN]
+
+        sub['latest_reading_id'] = rows[MeterReading][-1]['id']
+
+    def pay(self, rows, bill, amount, day, running_balance):
+        """Same bookkeeping as services.process_payment."""
+        bill['amount_paid'] += amount
+        bill['balance'], bill['status'] = settled(bill['total_amount_due'], bill['amount_paid'], bill['status'])
+        cashier = self.rng.choice(CASHIERS)               # each cashier has an OR booklet series
+        self.or_next[cashier] += 1
+        or_number = f'{self.or_next[cashier]:08d}'
+        self.post(rows, bill, day, 'PAYMENT', f'Payment received — OR# {or_number}',
+                  credit=amount, running_balance=running_balance,
+                  or_number=or_number, received_by=cashier)
+
+    def post(self, rows, bill, day, entry_type, description, **amounts):
+        rows[Ledger].append(dict(
+            id=self.next_id(Ledger), subscriber_id=bill['subscriber_id'], bill_id=bill['id'],
+            entry_date=day, entry_type=entry_type, description=description, **amounts,
+        ))
@@ -0,0 +1,48 @@
+import csv
+from datetime import date
+from django.core.management.base import CommandError
+from billing.profiling import ProfiledCommand
+from billing.services import import_meter_readings, READING_IMPORT_CHUNK
+ 
+class Command(ProfiledCommand):
+    help = 'Bulk-import a route reader sheet (CSV) of meter readings for one billing month'
+ 
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', type=str,
+                            help='CSV with meter_number, current_reading '
+                                 '[, previous_reading, reading_date, reader_name, remarks]')
+        parser.add_argument('--billing-month', type=str,
+                            help='YYYY-MM-DD (first day of billing month)')
+        parser.add_argument('--reader-name',  type=str, default='',
+                            help='Reader name for rows that have none')
+        parser.add_argument('--chunk-size',   type=int, default=READING_IMPORT_CHUNK,
+                            help=f'Rows validated and inserted per batch (default: {READING_IMPORT_CHUNK})')
+ 
+    def handle(self, *args, **options):
+        if options['billing_month']:
+            billing_month = date.fromisoformat(options['billing_month'])
+        else:
+            today = date.today()
+            billing_month = date(today.year, today.month, 1)
+ 
+        try:
+            handle = open(options['csv_path'], newline='', encoding='utf-8-sig')
+        except OSError as e:
+            raise CommandError(str(e))
+ 
+        with handle:
+            report = import_meter_readings(
+                csv.DictReader(handle),
+                billing_month = billing_month,
+                reader_name   = options['reader_name'],
+                chunk_size    = options['chunk_size'],
+            )
+ 
+        for err in report['errors']:
+            self.stdout.write(self.style.ERROR(
+                f'Row {err["row"]} ({err["meter_number"] or "-"}): {err["error"]}'
+            ))
+ 
+        self.stdout.write(self.style.SUCCESS(
+            f'Done. {report["created"]} readings imported. {len(report["errors"])} errors.'
+        ))
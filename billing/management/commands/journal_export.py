@@ -0,0 +1,32 @@
+from django.core.management.base import CommandError
+from billing.journals import FORMATS, export_new, export_year
+from billing.profiling import ProfiledCommand
+
+class Command(ProfiledCommand):
+    help = ('Write daily journal vouchers (balanced debit/credit lines per ledger entry type, mapped '
+            'through settings.JOURNAL_ACCOUNTS) for the ledger entries added since the last export')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', type=str, default='journals',
+                            help='Directory for the voucher files (default: journals)')
+        parser.add_argument('--format',     type=str, default='csv', choices=FORMATS,
+                            help='csv (one row per journal line) or json; default: csv')
+        parser.add_argument('--year',       type=int,
+                            help='Regenerate one complete voucher per day of this year instead; '
+                                 'the incremental mark is not moved')
+
+    def handle(self, *args, **options):
+        if options['year']:
+            result = export_year(options['output_dir'], options['year'], options['format'])
+        else:
+            result = export_new(options['output_dir'], options['format'])
+        if result is None:
+            self.stdout.write(self.style.SUCCESS('Done. No ledger entries since the last export.'))
+            return
+
+        path, count, total = result
+        if not count and options['year']:
+            raise CommandError(f'No ledger entries in {options["year"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Done. {count} vouchers, ₱{total:,.2f} debits and credits → {path}'
+        ))
@@ -0,0 +1,108 @@
+import json
+import sys
+from argparse import SUPPRESS
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.loadtest import LoadTest, ClientDriver, HttpDriver, summarize
+from billing.models import Subscriber
+from billing.scratch import require_scratch, run_worker
+
+
+class Command(BaseCommand):
+    help = ('Simulate concurrent cashiers and meter readers (search, dashboard, payments, '
+            'reading → bill) and report throughput, p50/p95/p99 latency and error / lock rates '
+            'per endpoint at each concurrency level. Runs in-process on a scratch copy of a '
+            'generated dataset, or with --url against a running server and the database this '
+            'project is configured for (use a staging copy: payments and bills are written).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users',       type=str, default='1,4,8,16',
+                            help='Comma-separated concurrency levels (default: 1,4,8,16)')
+        parser.add_argument('--seconds',     type=float, default=15,
+                            help='Run time per concurrency level (default: 15)')
+        parser.add_argument('--seed',        type=int, default=2026)
+        parser.add_argument('--url',         type=str,
+                            help='Base URL of a running server, e.g. http://127.0.0.1:8000')
+        parser.add_argument('--username',    type=str, help='Login for --url')
+        parser.add_argument('--password',    type=str, help='Password for --url')
+        parser.add_argument('--subscribers', type=int, default=2000,
+                            help='In-process mode: generated dataset size (default: 2000)')
+        parser.add_argument('--years',       type=int, default=2,
+                            help='In-process mode: years of history (default: 2)')
+        parser.add_argument('--dataset',     type=str,
+                            help='In-process mode: SQLite file to keep and reuse the dataset in')
+        parser.add_argument('--output',      type=str, help='Also write the results JSON here')
+        parser.add_argument('--worker',      action='store_true', help=SUPPRESS)
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(n) for n in options['users'].split(',')]
+        except ValueError:
+            raise CommandError('--users must be a comma-separated list of numbers, e.g. 1,4,8')
+
+        if options['worker']:
+            return self.run_worker(levels, options)
+
+        if options['url']:
+            if not (options['username'] and options['password']):
+                raise CommandError('--url needs --username and --password.')
+            test = LoadTest(lambda: HttpDriver(options['url'], options['username'], options['password']),
+                            seed=options['seed'])
+            results = []
+            for users in levels:
+                self.stdout.write(f'{users} users for {options["seconds"]:.0f}s ...')
+                samples = test.run(users, options['seconds'])
+                results.append({'users': users, 'endpoints': summarize(samples, options['seconds'])})
+        else:
+            results = self.run_in_scratch(options)
+
+        self.report(results, options['seconds'])
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2) + '\n')
+
+    def report(self, results, seconds):
+        for step in results:
+            rows  = step['endpoints']
+            total = sum(r['requests'] for r in rows.values())
+            self.stdout.write('')
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{step["users"]} users — {total / seconds:.1f} req/s'))
+            self.stdout.write(f'  {"Endpoint":<20}{"req/s":>8}{"p50":>9}{"p95":>9}{"p99":>9}'
+                              f'{"errors":>9}{"locked":>9}')
+            for endpoint, r in rows.items():
+                self.stdout.write(
+                    f'  {endpoint:<20}{r["per_sec"]:>8.1f}{r["p50_ms"]:>7.0f}ms{r["p95_ms"]:>7.0f}ms'
+                    f'{r["p99_ms"]:>7.0f}ms{r["error_pct"]:>8.1f}%{r["lock_pct"]:>8.1f}%'
+                )
+
+    # ── parent: in-process runs happen in a subprocess on a scratch database ──
+    def run_in_scratch(self, options):
+        self.stdout.write(f'Load testing {options["users"]} users in-process on '
+                          f'{options["subscribers"]} subscribers x {options["years"]} years ...')
+        return run_worker('load_test',
+                          ['--users', options['users'], '--seconds', str(options['seconds']),
+                           '--seed', str(options['seed']), '--subscribers', str(options['subscribers']),
+                           '--years', str(options['years'])],
+                          'Load test', dataset=options['dataset'])
+
+    # ── worker: build or reuse the dataset, step through the levels, print one JSON line ──
+    def run_worker(self, levels, options):
+        require_scratch()
+
+        call_command('migrate', verbosity=0)
+        if not Subscriber.objects.filter(account_number__startswith='SYN-').exists():
+            call_command('generate_dataset', subscribers=options['subscribers'],
+                         years=options['years'], seed=options['seed'], stdout=sys.stderr)
+        user, _ = User.objects.get_or_create(username='loadtest')
+
+        test    = LoadTest(lambda: ClientDriver(user), seed=options['seed'])
+        results = []
+        for users in levels:
+            sys.stderr.write(f'  {users} users ...\n')
+            samples = test.run(users, options['seconds'])
+            results.append({'users': users, 'endpoints': summarize(samples, options['seconds'])})
+        self.stdout.write(json.dumps(results))
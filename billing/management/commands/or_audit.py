@@ -0,0 +1,39 @@
+from datetime import date, timedelta
+from django.core.management.base import CommandError
+from django.utils import timezone
+from billing.cashiering import audit
+from billing.profiling import ProfiledCommand
+
+class Command(ProfiledCommand):
+    help = ('Check each cashier\'s official receipt series over a date range for skipped and '
+            'duplicate OR numbers (the cashier closing page checks one day)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start',   type=str,
+                            help='YYYY-MM-DD, first payment date checked (default: 30 days ago)')
+        parser.add_argument('--end',     type=str,
+                            help='YYYY-MM-DD, last payment date checked (default: today)')
+        parser.add_argument('--cashier', type=str,
+                            help='Only this cashier (as entered in Received By)')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        start = date.fromisoformat(options['start']) if options['start'] else today - timedelta(days=30)
+        end   = date.fromisoformat(options['end']) if options['end'] else today
+        if end < start:
+            raise CommandError('--end is before --start')
+
+        found  = audit(start, end, options['cashier'])
+        issues = 0
+        for cashier, remittance in sorted(found.items()):
+            self.stdout.write(f'{cashier or "—":<24} {remittance.payments:>7} payments  '
+                              f'{remittance.first_or or "—"} – {remittance.last_or or "—"}  '
+                              f'{remittance.gaps} skipped, {remittance.duplicates} duplicates')
+            for issue in remittance.issues:
+                self.stdout.write(f'    {issue["entry_date"]}  {issue["kind"]:<9} '
+                                  f'{issue["or_number"] or "—":<16} {issue["detail"]}')
+            issues += len(remittance.issues)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done. {len(found)} cashiers, {issues} OR issues from {start} to {end}.'
+        ))
@@ -0,0 +1,27 @@
+from datetime import date
+from billing.jobs import report_progress
+from billing.notices import prerender
+from billing.profiling import ProfiledCommand
+
+class Command(ProfiledCommand):
+    help = ('Render the printable billing notices of a month into the notice cache, so the first '
+            'print of each is served without rendering (run_billing does this after billing)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--billing-month', type=str,
+                            help='YYYY-MM-DD (first day of billing month)')
+        parser.add_argument('--force',        action='store_true',
+                            help='Render every notice again, even those already cached')
+
+    def handle(self, *args, **options):
+        if options['billing_month']:
+            billing_month = date.fromisoformat(options['billing_month'])
+        else:
+            today = date.today()
+            billing_month = date(today.year, today.month, 1)
+
+        rendered, total = prerender(billing_month, force=options['force'], progress=report_progress)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done. {rendered} notices rendered, {total - rendered} already cached.'
+        ))
@@ -0,0 +1,45 @@
+from datetime import date
+from billing.notifications import queue_bill_ready, queue_cutoffs, queue_due_soon, schedule_send
+from billing.profiling import ProfiledCommand
+
+KINDS = ('bills', 'due', 'cutoffs')
+
+class Command(ProfiledCommand):
+    help = ('Queue SMS and e-mail messages to subscribers (bill ready, payment due soon, '
+            'disconnection cutoff) and start a send_notifications job to send them')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind',          type=str, action='append', choices=KINDS,
+                            help='bills, due or cutoffs (repeatable; default: all three)')
+        parser.add_argument('--billing-month', type=str,
+                            help='YYYY-MM-DD (first day of billing month) for bill-ready messages')
+        parser.add_argument('--due-days',      type=int, default=3,
+                            help='Remind of bills due within this many days (default: 3)')
+        parser.add_argument('--no-send',       action='store_true',
+                            help='Only queue; leave sending to a later send_notifications run')
+
+    def handle(self, *args, **options):
+        if options['billing_month']:
+            billing_month = date.fromisoformat(options['billing_month'])
+        else:
+            today = date.today()
+            billing_month = date(today.year, today.month, 1)
+        kinds = options['kind'] or KINDS
+
+        queued = 0
+        if 'bills' in kinds:
+            count = queue_bill_ready(billing_month)
+            self.stdout.write(f'{count} bill-ready messages queued for {billing_month:%B %Y}.')
+            queued += count
+        if 'due' in kinds:
+            count = queue_due_soon(options['due_days'])
+            self.stdout.write(f'{count} payment reminders queued.')
+            queued += count
+        if 'cutoffs' in kinds:
+            count = queue_cutoffs()
+            self.stdout.write(f'{count} disconnection messages queued.')
+            queued += count
+
+        if queued and not options['no_send']:
+            schedule_send()
+        self.stdout.write(self.style.SUCCESS(f'Done. {queued} messages queued.'))
@@ -0,0 +1,16 @@
+from billing.profiling import ProfiledCommand
+from billing.rollups import refresh_summaries
+
+class Command(ProfiledCommand):
+    help = ('Refresh the monthly billing summaries behind the trends report for every month with '
+            'ledger activity since the last refresh (run_billing does this after billing)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild every month from scratch')
+
+    def handle(self, *args, **options):
+        months, rows = refresh_summaries(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Done. {months} months refreshed, {rows} summary rows written.'
+        ))
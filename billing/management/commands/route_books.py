@@ -0,0 +1,37 @@
+from pathlib import Path
+from datetime import date
+from billing.profiling import ProfiledCommand
+from django.utils.text import slugify
+from billing.models import Subscriber
+from billing.services import build_route_book, write_route_book_csv
+ 
+class Command(ProfiledCommand):
+    help = 'Write one reading-sheet CSV per barangay route for a billing month'
+ 
+    def add_arguments(self, parser):
+        parser.add_argument('--billing-month', type=str,
+                            help='YYYY-MM-DD (first day of billing month)')
+        parser.add_argument('--output-dir',   type=str, default='route_books',
+                            help='Directory for the CSV files (default: route_books)')
+        parser.add_argument('--barangay',     type=str, action='append',
+                            help='Only this barangay (repeatable); default is every barangay')
+ 
+    def handle(self, *args, **options):
+        if options['billing_month']:
+            billing_month = date.fromisoformat(options['billing_month'])
+        else:
+            today = date.today()
+            billing_month = date(today.year, today.month, 1)
+ 
+        out = Path(options['output_dir'])
+        out.mkdir(parents=True, exist_ok=True)
+ 
+        barangays = options['barangay'] or Subscriber.objects.filter(
+            status='ACTIVE').order_by('barangay').values_list('barangay', flat=True).distinct()
+ 
+        for barangay in barangays:
+            rows = list(build_route_book(barangay, billing_month))
+            path = out / f'route-book-{slugify(barangay)}-{billing_month:%Y-%m}.csv'
+            with open(path, 'w', newline='', encoding='utf-8') as fh:
+                write_route_book_csv(fh, rows)
+            self.stdout.write(self.style.SUCCESS(f'{barangay}: {len(rows)} meters → {path}'))
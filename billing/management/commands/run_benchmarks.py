@@ -0,0 +1,117 @@
+import json
+import os
+import platform
+import sys
+from argparse import SUPPRESS
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.benchmarks import BILLING_MONTH, CASES, BenchmarkContext, run_case, compare
+from billing.models import Subscriber
+from billing.scratch import require_scratch, run_worker
+
+DEFAULT_BASELINE = 'benchmarks/baseline.json'
+
+
+class Command(BaseCommand):
+    help = ('Time the billing, posting and reporting hot paths on a generated dataset, with '
+            'query counts and peak memory, and compare against a stored baseline JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--case',          action='append', choices=list(CASES),
+                            help='Case to run (repeatable; default: all)')
+        parser.add_argument('--subscribers',   type=int, default=2000,
+                            help='Dataset size passed to generate_dataset (default: 2000)')
+        parser.add_argument('--years',         type=int, default=2,
+                            help='Years of history in the dataset (default: 2)')
+        parser.add_argument('--seed',          type=int, default=2026)
+        parser.add_argument('--repeat',        type=int, default=3,
+                            help='Timed runs per case; the median is reported (default: 3)')
+        parser.add_argument('--dataset',       type=str,
+                            help='SQLite file to keep the generated dataset in and reuse '
+                                 '(default: a temporary file)')
+        parser.add_argument('--baseline',      type=str, default=DEFAULT_BASELINE,
+                            help=f'Baseline JSON, relative to the project (default: {DEFAULT_BASELINE})')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Write these results as the new baseline')
+        parser.add_argument('--tolerance',     type=float, default=0.25,
+                            help='Allowed slowdown / memory growth before a regression (default: 0.25)')
+        parser.add_argument('--output',        type=str, help='Also write the results JSON here')
+        parser.add_argument('--worker',        action='store_true', help=SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            return self.run_worker(options)
+
+        results = self.run_in_scratch(options)
+        report  = {
+            'dataset': {**{k: options[k] for k in ('subscribers', 'years', 'seed')},
+                        'until': BILLING_MONTH.strftime('%Y-%m')},
+            'machine': f'{platform.system()} {platform.machine()}, Python {platform.python_version()}',
+            'profile': os.environ.get('DATABASE_PROFILE', 'sqlite'),
+            'date':    date.today().isoformat(),
+            'cases':   results,
+        }
+
+        self.stdout.write('')
+        self.stdout.write(f'{"Case":<26}{"median":>10}{"ops/s":>10}{"queries":>9}{"peak":>11}')
+        for name, r in results.items():
+            self.stdout.write(f'{name:<26}{r["seconds"]:>9.3f}s{r["ops_per_sec"] or 0:>10.1f}'
+                              f'{r["queries"]:>9}{r["peak_kib"]:>7} KiB')
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2) + '\n')
+
+        baseline_path = settings.BASE_DIR / options['baseline']
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Done. Baseline saved to {baseline_path}.'))
+            return
+
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(
+                f'No baseline at {baseline_path}; run with --save-baseline to create one.'))
+            return
+
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get('dataset') != report['dataset']:
+            self.stdout.write(self.style.WARNING(
+                f'Baseline was recorded on a different dataset ({baseline.get("dataset")}); '
+                f'comparison is only indicative.'))
+        problems = compare(results, baseline.get('cases', {}), options['tolerance'])
+        if problems:
+            raise CommandError('Regressions against baseline:\n  ' + '\n  '.join(problems))
+        self.stdout.write(self.style.SUCCESS(f'Done. No regressions against {baseline_path}.'))
+
+    # ── parent: run the cases in a subprocess on a scratch database ──
+    def run_in_scratch(self, options):
+        args = ['--subscribers', str(options['subscribers']), '--years', str(options['years']),
+                '--seed', str(options['seed']), '--repeat', str(options['repeat'])]
+        for name in options['case'] or []:
+            args += ['--case', name]
+
+        self.stdout.write(f'Running {len(options["case"] or CASES)} cases on '
+                          f'{options["subscribers"]} subscribers x {options["years"]} years ...')
+        return run_worker('run_benchmarks', args, 'Benchmark run', dataset=options['dataset'])
+
+    # ── worker: build or reuse the dataset, run cases, print one JSON line ──
+    def run_worker(self, options):
+        require_scratch()
+
+        call_command('migrate', verbosity=0)
+        if not Subscriber.objects.filter(account_number__startswith='SYN-').exists():
+            call_command('generate_dataset', subscribers=options['subscribers'],
+                         years=options['years'], seed=options['seed'],
+                         until=BILLING_MONTH.strftime('%Y-%m'), stdout=sys.stderr)
+
+        ctx     = BenchmarkContext()
+        results = {}
+        for name in options['case'] or CASES:
+            sys.stderr.write(f'  {name} ...\n')
+            results[name] = run_case(name, ctx, options['repeat'])
+        self.stdout.write(json.dumps(results))
@@ -1,10 +1,14 @@
-from django.core.management.base import BaseCommand
+from billing.profiling import ProfiledCommand
 from django.utils import timezone
-from billing.models import MeterReading, Bill
-from billing.services import generate_bill
+from billing.models import MeterReading, Bill, ReadingFlag
+from billing.jobs import report_progress
+from billing.notices import prerender
+from billing.notifications import queue_bill_ready, schedule_send
+from billing.rollups import refresh_months
+from billing.services import generate_bill, estimate_unread_readings
 from datetime import date, timedelta
  
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = 'Generate bills for all meter readings that have no bill yet'
  
     def add_arguments(self, parser):
@@ -14,6 +18,14 @@ class Command(BaseCommand):
                             help='Days from billing month to due date (default: 15)')
         parser.add_argument('--cutoff-days',  type=int, default=20,
                             help='Days from billing month to cutoff (default: 20)')
+        parser.add_argument('--estimate',     action='store_true',
+                            help='First create estimated readings for active subscribers not read this month')
+        parser.add_argument('--include-flagged', action='store_true',
+                            help='Also bill readings with open anomaly flags (see scan_anomalies)')
+        parser.add_argument('--no-prerender', action='store_true',
+                            help='Skip pre-rendering the month\'s printable notices afterwards')
+        parser.add_argument('--no-notify',    action='store_true',
+                            help='Don\'t queue bill-ready SMS and e-mail messages afterwards')
  
     def handle(self, *args, **options):
         if options['billing_month']:
@@ -25,6 +37,13 @@ class Command(BaseCommand):
         due_date    = billing_month + timedelta(days=options['due_days'])
         cutoff_date = billing_month + timedelta(days=options['cutoff_days'])
  
+        if options['estimate']:
+            result = estimate_unread_readings(billing_month)
+            self.stdout.write(self.style.WARNING(
+                f'{result["estimated"]} readings estimated '
+                f'({result["skipped"]} unread subscribers have no reading history).'
+            ))
+ 
         readings_without_bill = MeterReading.objects.filter(
             billing_month = billing_month
         ).exclude(
@@ -32,9 +51,21 @@ class Command(BaseCommand):
                 billing_month=billing_month).values('meter_reading_id')
         )
  
+        if not options['include_flagged']:
+            flagged = ReadingFlag.objects.filter(
+                billing_month=billing_month, status='OPEN').values('meter_reading_id')
+            held_count = readings_without_bill.filter(id__in=flagged).count()
+            if held_count:
+                readings_without_bill = readings_without_bill.exclude(id__in=flagged)
+                self.stdout.write(self.style.WARNING(
+                    f'{held_count} readings held for review (open anomaly flags).'
+                ))
+ 
+        readings = list(readings_without_bill)
         count = 0
         errors = 0
-        for reading in readings_without_bill:
+        for reading in readings:
+            report_progress(count + errors, len(readings), f'{count} bills generated, {errors} errors')
             try:
                 bill = generate_bill(
                     subscriber    = reading.subscriber,
@@ -55,6 +86,19 @@ class Command(BaseCommand):
                     self.style.ERROR(f'ERROR for {reading.subscriber}: {e}')
                 )
  
+        if count and not options['no_prerender']:
+            rendered, total = prerender(billing_month)
+            self.stdout.write(f'{rendered} of {total} billing notices pre-rendered.')
+        if count:
+#             the new bills are too recent for the rollups mark; rebuild their month directly
+            rows = refresh_months([billing_month])
+            self.stdout.write(f'Billing summaries refreshed for {billing_month:%B %Y}: {rows} rows.')
+        if count and not options['no_notify']:
+            queued = queue_bill_ready(billing_month)
+            if queued:
+                schedule_send()
+            self.stdout.write(f'{queued} bill-ready messages queued.')
+
         self.stdout.write(self.style.SUCCESS(
             f'Done. {count} bills generated. {errors} errors.'
         ))
\ No newline at end of file
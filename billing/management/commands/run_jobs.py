@@ -0,0 +1,97 @@
+import signal
+import subprocess
+import sys
+import time
+from argparse import SUPPRESS
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from billing.jobs import POLL_SECONDS, claim, run_job, requeue_stale, enqueue_due_schedules, worker_name
+
+
+class Command(BaseCommand):
+    help = ('Run queued background jobs (billing runs, checks, exports started from the Jobs page) '
+            'in a pool of worker processes, and queue scheduled jobs as they come due. '
+            'Stop with Ctrl-C or SIGTERM; running jobs finish first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Worker processes (default: 2)')
+        parser.add_argument('--poll',    type=float, default=POLL_SECONDS,
+                            help=f'Seconds between queue checks when idle (default: {POLL_SECONDS})')
+        parser.add_argument('--once',    action='store_true',
+                            help='Queue due schedules, run every job due now in this process, then exit')
+        parser.add_argument('--no-schedules', action='store_true',
+                            help='Do not queue scheduled jobs (another run_jobs does it)')
+        parser.add_argument('--worker',  action='store_true', help=SUPPRESS)
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        if options['worker']:
+#             Ctrl-C reaches the whole process group; a worker finishes its job first
+            signal.signal(signal.SIGINT, self.stop)
+            return self.work(options['poll'])
+        if options['once']:
+            return self.run_once(options)
+        return self.supervise(options)
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def tick(self, options):
+        if not options['no_schedules']:
+            for job in enqueue_due_schedules():
+                self.stdout.write(f'Scheduled: job #{job.pk} {job.command}')
+        lost = requeue_stale()
+        if lost:
+            self.stdout.write(self.style.WARNING(f'{lost} jobs lost their worker and were requeued or failed.'))
+
+    def run_once(self, options):
+        self.tick(options)
+        done = 0
+        while (job := claim()) is not None:
+            status = run_job(job)
+            done  += 1
+            self.stdout.write(f'Job #{job.pk} {job.command}: {status}')
+        self.stdout.write(self.style.SUCCESS(f'Done. {done} jobs run.'))
+
+    # ── worker: claim, run, repeat ─────────────────────────────
+    def work(self, poll):
+        name = worker_name()
+        while not self.stopping:
+            job = claim(name)
+            if job is None:
+                close_old_connections()
+                time.sleep(poll)
+                continue
+            self.stdout.write(f'[{name}] job #{job.pk} {job.command} ...')
+            status = run_job(job)
+            self.stdout.write(f'[{name}] job #{job.pk} {status}')
+            close_old_connections()
+
+    # ── parent: keep the workers alive and the schedules ticking ──
+    def supervise(self, options):
+        command = [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'run_jobs', '--worker',
+                   '--poll', str(options['poll'])]
+        workers = [subprocess.Popen(command) for _ in range(options['workers'])]
+        self.stdout.write(f'{len(workers)} job workers started. Ctrl-C to stop.')
+        try:
+            while not self.stopping:
+                self.tick(options)
+                close_old_connections()
+                for i, proc in enumerate(workers):
+                    if proc.poll() is not None:
+                        self.stdout.write(self.style.WARNING(
+                            f'Worker {proc.pid} exited ({proc.returncode}); restarting.'))
+                        workers[i] = subprocess.Popen(command)
+                time.sleep(options['poll'])
+        except KeyboardInterrupt:
+            pass
+        for proc in workers:
+            proc.terminate()
+        for proc in workers:
+            proc.wait()
+        self.stdout.write(self.style.SUCCESS('Done. Workers stopped.'))
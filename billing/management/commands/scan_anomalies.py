@@ -0,0 +1,29 @@
+from datetime import date
+from billing.profiling import ProfiledCommand
+from billing.anomalies import scan_reading_anomalies, HISTORY_MONTHS
+from billing.models import ReadingFlag
+ 
+class Command(ProfiledCommand):
+    help = 'Flag suspect meter readings for a billing month so run_billing holds them for review'
+ 
+    def add_arguments(self, parser):
+        parser.add_argument('--billing-month', type=str,
+                            help='YYYY-MM-DD (first day of billing month)')
+        parser.add_argument('--history-months', type=int, default=HISTORY_MONTHS,
+                            help=f'Trailing months used as baseline (default: {HISTORY_MONTHS})')
+ 
+    def handle(self, *args, **options):
+        if options['billing_month']:
+            billing_month = date.fromisoformat(options['billing_month'])
+        else:
+            today = date.today()
+            billing_month = date(today.year, today.month, 1)
+ 
+        summary = scan_reading_anomalies(billing_month, options['history_months'])
+ 
+        labels = dict(ReadingFlag.FLAG_TYPE_CHOICES)
+        for flag_type, count in summary.items():
+            self.stdout.write(f'  {labels[flag_type]:<40} {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Done. {sum(summary.values())} readings flagged for {billing_month:%B %Y}.'
+        ))
@@ -0,0 +1,21 @@
+from billing.jobs import report_progress
+from billing.notifications import BATCH, dispatch
+from billing.profiling import ProfiledCommand
+
+class Command(ProfiledCommand):
+    help = ('Send the queued SMS and e-mail messages in batches, at each channel\'s rate; '
+            'failed sends are retried later with back-off')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH,
+                            help=f'Messages claimed and written back at a time (default: {BATCH})')
+        parser.add_argument('--limit',      type=int,
+                            help='Send at most this many messages this run')
+
+    def handle(self, *args, **options):
+        counts = dispatch(batch_size=options['batch_size'], limit=options['limit'],
+                          progress=report_progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Done. {counts["SENT"]} sent, {counts["RETRY"]} to retry, {counts["FAILED"]} failed, '
+            f'{counts["CANCELLED"]} cancelled.'
+        ))
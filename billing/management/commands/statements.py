@@ -0,0 +1,51 @@
+from datetime import date
+from django.core.management.base import CommandError
+from billing.jobs import report_progress
+from billing.models import Subscriber
+from billing.profiling import ProfiledCommand
+from billing.statements import FORMATS, write_statements
+
+class Command(ProfiledCommand):
+    help = ('Write statements of account (opening balance, transactions, closing balance, aging) '
+            'for a date range, one CSV or printable HTML file per barangay')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start',        type=str,
+                            help='YYYY-MM-DD, first day of the statement (default: 1 January this year)')
+        parser.add_argument('--end',          type=str,
+                            help='YYYY-MM-DD, last day of the statement (default: today)')
+        parser.add_argument('--account',      type=str, action='append',
+                            help='Only this account number (repeatable); default is every account')
+        parser.add_argument('--barangay',     type=str, action='append',
+                            help='Only this barangay (repeatable)')
+        parser.add_argument('--format',       type=str, default='html', choices=FORMATS,
+                            help='html (printable, one page per account) or csv; default: html')
+        parser.add_argument('--output-dir',   type=str, default='statements',
+                            help='Directory for the files (default: statements)')
+        parser.add_argument('--include-empty', action='store_true',
+                            help='Also write accounts with no balance and no activity in the range')
+
+    def handle(self, *args, **options):
+        today = date.today()
+        start = date.fromisoformat(options['start']) if options['start'] else date(today.year, 1, 1)
+        end   = date.fromisoformat(options['end']) if options['end'] else today
+        if end < start:
+            raise CommandError('--end is before --start')
+
+        subscribers = None
+        if options['account'] or options['barangay']:
+            subscribers = Subscriber.objects.all()
+            if options['account']:
+                subscribers = subscribers.filter(account_number__in=options['account'])
+            if options['barangay']:
+                subscribers = subscribers.filter(barangay__in=options['barangay'])
+
+        written = write_statements(options['output_dir'], start, end, fmt=options['format'],
+                                   subscribers=subscribers, include_empty=options['include_empty'],
+                                   progress=report_progress)
+        for path, count in written.items():
+            self.stdout.write(f'{count:>6} statements → {path}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done. {sum(written.values())} statements in {len(written)} files.'
+        ))
@@ -0,0 +1,91 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+
+from billing.integrity import subscriber_chunks, verify_chunk, fix_chunk, drift_by_account
+from billing.jobs import report_progress
+from billing.models import Subscriber
+from billing.profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    help = ('Recompute every ledger running balance and bill total from the ledger entries '
+            'and report drift per account; --fix repairs it in bulk')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix',   action='store_true',
+                            help='Rewrite drifted running balances and bill totals')
+        parser.add_argument('--jobs',  type=int, default=min(4, os.cpu_count() or 1),
+                            help='Chunks checked in parallel, one DB connection each '
+                                 '(default: CPU count, at most 4)')
+        parser.add_argument('--chunk', type=int, default=2000,
+                            help='Subscribers per chunk (default: 2000)')
+        parser.add_argument('--show',  type=int, default=25,
+                            help='Accounts listed in the drift report (default: 25)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        chunks  = subscriber_chunks(options['chunk'])
+        self.stdout.write(f'Checking {len(chunks)} chunks with {options["jobs"]} workers ...')
+
+        def check(bounds):
+            try:
+                return bounds, verify_chunk(*bounds)
+            finally:
+                connection.close()
+
+        results = []
+        with ThreadPoolExecutor(max_workers=options['jobs']) as pool:
+            for result in pool.map(check, chunks):
+                results.append(result)
+                report_progress(len(results), len(chunks), f'{len(results)} of {len(chunks)} chunks checked')
+
+        drifted = [(bounds, found) for bounds, found in results if found['ledger'] or found['bills']]
+        entries = sum(len(found['ledger']) for _, found in drifted)
+        bills   = sum(len(found['bills']) for _, found in drifted)
+        self.report([found for _, found in drifted], options['show'])
+
+        if drifted and options['fix']:
+#             writes go one chunk at a time, each re-checked inside its own transaction
+            entries = bills = 0
+            for bounds, _ in drifted:
+                fixed    = fix_chunk(*bounds)
+                entries += len(fixed['ledger'])
+                bills   += len(fixed['bills'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Done. Fixed {entries} ledger entries and {bills} bills '
+                f'in {time.perf_counter() - started:.1f}s.'
+            ))
+        elif drifted:
+            self.stdout.write(self.style.WARNING(
+                f'Done. {entries} ledger entries and {bills} bills have drifted '
+                f'({time.perf_counter() - started:.1f}s). Run with --fix to repair.'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Done. No drift found in {time.perf_counter() - started:.1f}s.'))
+
+    def report(self, results, show):
+        accounts = drift_by_account(results)
+        if not accounts:
+            return
+        worst   = sorted(accounts.items(), key=lambda kv: (kv[1]['max_drift'], kv[1]['bills']),
+                         reverse=True)
+        numbers = dict(Subscriber.objects.filter(pk__in=[pk for pk, _ in worst[:show]])
+                       .values_list('pk', 'account_number'))
+
+        self.stdout.write(f'{"Account":<16}{"ledger rows":>12}{"max drift":>14}{"bills":>8}')
+        for sub_id, acct in worst[:show]:
+            number = numbers[sub_id]
+            self.stdout.write(f'{number:<16}{acct["entries"]:>12}{acct["max_drift"]:>14.2f}'
+                              f'{acct["bills"]:>8}')
+        if len(worst) > show:
+            self.stdout.write(f'... and {len(worst) - show} more accounts')
+
+        details = [item for found in results for item in found['bills']][:show]
+        for item in details:
+            changed = ', '.join(f'{k} {item["stored"][k]} → {v}' for k, v in item['expected'].items()
+                                if item['stored'][k] != v)
+            self.stdout.write(f'  bill #{item["bill"].pk} ({item["bill"].billing_month:%b %Y}): {changed}')
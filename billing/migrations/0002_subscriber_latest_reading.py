@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-19 00:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_latest_reading(apps, schema_editor):
+    Subscriber   = apps.get_model('billing', 'Subscriber')
+    MeterReading = apps.get_model('billing', 'MeterReading')
+    latest = MeterReading.objects.filter(
+        subscriber=OuterRef('pk')).order_by('-billing_month').values('pk')[:1]
+    Subscriber.objects.update(latest_reading=Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscriber',
+            name='latest_reading',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Most recent reading by billing month (kept up to date on insert)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='billing.meterreading'),
+        ),
+        migrations.RunPython(backfill_latest_reading, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 00:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0002_subscriber_latest_reading'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meterreading',
+            name='client_id',
+            field=models.CharField(blank=True, editable=False, help_text='ID assigned by the handheld device that captured the reading', max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-19 00:33
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0003_meterreading_client_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingFlag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('billing_month', models.DateField()),
+                ('flag_type', models.CharField(choices=[('OUTLIER', 'Unusual vs. Own History'), ('COHORT_OUTLIER', 'Unusual vs. Barangay / Classification'), ('ZERO_STREAK', 'Zero Consumption Streak'), ('ROLLOVER', 'Register Went Backwards / Rollover')], max_length=20)),
+                ('score', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Robust z-score or streak length, depending on flag type', max_digits=10)),
+                ('detail', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(choices=[('OPEN', 'Open — Hold Billing'), ('CLEARED', 'Cleared — OK to Bill')], default='OPEN', max_length=10)),
+                ('reviewed_by', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('meter_reading', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flags', to='billing.meterreading')),
+                ('subscriber', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reading_flags', to='billing.subscriber')),
+            ],
+            options={
+                'ordering': ['-billing_month', 'subscriber'],
+                'unique_together': {('meter_reading', 'flag_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-19 00:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0004_readingflag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meterreading',
+            name='is_estimated',
+            field=models.BooleanField(default=False, help_text='Meter not read; consumption estimated from recent history'),
+        ),
+        migrations.AlterField(
+            model_name='othercharge',
+            name='charge_type',
+            field=models.CharField(choices=[('PENALTY', 'Late Payment Penalty'), ('RECONNECTION', 'Reconnection Fee'), ('MATERIAL', 'Materials Charge'), ('LABOR', 'Labor Charge'), ('METER_REPL', 'Meter Replacement'), ('ESTIMATE_ADJ', 'Estimated Reading Adjustment'), ('CUSTOM', 'Custom / Other')], max_length=20),
+        ),
+    ]
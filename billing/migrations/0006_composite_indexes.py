@@ -0,0 +1,55 @@
+# Generated by Django 6.0.2 on 2026-10-19 00:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0005_estimated_readings'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['subscriber', 'status'], name='bill_sub_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['billing_month', 'status'], name='bill_month_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['status', 'balance'], name='bill_status_balance_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(condition=models.Q(('status__in', ['UNPAID', 'PARTIAL', 'OVERDUE'])), fields=['-balance'], name='bill_open_balance_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disconnectionnotice',
+            index=models.Index(fields=['status'], name='notice_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledger',
+            index=models.Index(fields=['subscriber', 'entry_date', 'created_at'], name='ledger_sub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledger',
+            index=models.Index(fields=['entry_type', 'entry_date'], name='ledger_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meterreading',
+            index=models.Index(fields=['billing_month'], name='reading_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='readingflag',
+            index=models.Index(fields=['billing_month', 'status'], name='flag_month_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscriber',
+            index=models.Index(fields=['status'], name='sub_status_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0006_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ledger',
+            index=models.Index(fields=['entry_date', 'created_at'], name='ledger_date_idx'),
+        ),
+    ]
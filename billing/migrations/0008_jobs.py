@@ -0,0 +1,61 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0007_ledger_date_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('command', models.CharField(max_length=50)),
+                ('arguments', models.JSONField(blank=True, default=dict)),
+                ('cron', models.CharField(help_text='minute hour day-of-month month day-of-week, local time; e.g. "30 1 * * *" = daily at 01:30', max_length=100)),
+                ('is_active', models.BooleanField(default=True)),
+                ('next_run_at', models.DateTimeField(blank=True, help_text='Filled in from the cron expression when left blank', null=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('command', models.CharField(help_text='Management command name, e.g. run_billing', max_length=50)),
+                ('arguments', models.JSONField(blank=True, default=dict, help_text='Command options, e.g. {"billing_month": "2026-03-01"}')),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('SUCCEEDED', 'Succeeded'), ('FAILED', 'Failed'), ('CANCELLED', 'Cancelled')], default='QUEUED', max_length=10)),
+                ('priority', models.SmallIntegerField(default=0, help_text='Higher runs first')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, help_text='Not claimed before this time (retry back-off)')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3)),
+                ('progress', models.PositiveSmallIntegerField(default=0, help_text='Percent done')),
+                ('progress_note', models.CharField(blank=True, max_length=255)),
+                ('output', models.TextField(blank=True, help_text='Tail of the command output')),
+                ('error', models.TextField(blank=True)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('schedule', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='billing.jobschedule')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx')],
+            },
+        ),
+    ]
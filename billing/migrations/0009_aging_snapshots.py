@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:28
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0008_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceivableAgingSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateField()),
+                ('barangay', models.CharField(max_length=100)),
+                ('classification', models.CharField(choices=[('PRIVATE', 'Private / Residential'), ('COMMERCIAL', 'Commercial / Business'), ('GOVERNMENT', 'Government Institution'), ('BULK', 'Bulk / Reseller')], max_length=20)),
+                ('current', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Not yet due', max_digits=12)),
+                ('days_1_30', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('days_31_60', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('days_61_90', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('days_91_120', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('over_120', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('open_bills', models.PositiveIntegerField(default=0)),
+                ('oldest_due', models.DateField(blank=True, null=True)),
+                ('subscriber', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aging_snapshots', to='billing.subscriber')),
+            ],
+            options={
+                'ordering': ['-as_of', '-total'],
+                'indexes': [models.Index(fields=['as_of', 'barangay'], name='aging_as_of_barangay_idx')],
+                'constraints': [models.UniqueConstraint(fields=('as_of', 'subscriber'), name='aging_as_of_subscriber_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-19 02:05
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0009_aging_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HighWaterMark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MonthlyBillingSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('barangay', models.CharField(max_length=100)),
+                ('classification', models.CharField(choices=[('PRIVATE', 'Private / Residential'), ('COMMERCIAL', 'Commercial / Business'), ('GOVERNMENT', 'Government Institution'), ('BULK', 'Bulk / Reseller')], max_length=20)),
+                ('connections', models.PositiveIntegerField(default=0, help_text='Connected at some time during the month')),
+                ('billed_subscribers', models.PositiveIntegerField(default=0)),
+                ('paying_subscribers', models.PositiveIntegerField(default=0)),
+                ('bills', models.PositiveIntegerField(default=0)),
+                ('volume', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='m³ billed', max_digits=14)),
+                ('water_charges', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='After senior discounts', max_digits=14)),
+                ('discounts', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('other_charges', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('penalties', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('collections', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('payments', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['month', 'barangay', 'classification'],
+                'constraints': [models.UniqueConstraint(fields=('month', 'barangay', 'classification'), name='summary_month_group_uniq')],
+            },
+        ),
+    ]
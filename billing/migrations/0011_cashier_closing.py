@@ -0,0 +1,57 @@
+# Generated by Django 6.0.2 on 2026-10-19 14:20
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_receipts(apps, schema_editor):
+    Ledger = apps.get_model('billing', 'Ledger')
+    duplicates = list(Ledger.objects.filter(entry_type='PAYMENT').exclude(or_number='')
+                      .values('or_number').annotate(n=Count('id')).filter(n__gt=1)
+                      .values_list('or_number', flat=True)[:20])
+    if duplicates:
+        raise RuntimeError(
+            'Payments share an OR number, so it cannot be made unique: '
+            f'{", ".join(duplicates)}. List them with manage.py duplicate_receipts and correct the '
+            f'OR numbers (--renumber suffixes all but the first payment on each), then migrate again.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0010_monthly_summaries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CashierClosing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_date', models.DateField()),
+                ('cashier', models.CharField(help_text='Ledger.received_by of the payments closed', max_length=100)),
+                ('payments', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('first_or', models.CharField(blank=True, max_length=50)),
+                ('last_or', models.CharField(blank=True, max_length=50)),
+                ('gaps', models.PositiveIntegerField(default=0, help_text="OR numbers skipped within the day's series")),
+                ('duplicates', models.PositiveIntegerField(default=0)),
+                ('remarks', models.CharField(blank=True, max_length=255)),
+                ('closed_by', models.CharField(max_length=150)),
+                ('closed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-business_date', 'cashier'],
+            },
+        ),
+        migrations.RunPython(check_duplicate_receipts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ledger',
+            constraint=models.UniqueConstraint(condition=models.Q(('entry_type', 'PAYMENT'), models.Q(('or_number', ''), _negated=True)), fields=('or_number',), name='ledger_unique_or'),
+        ),
+        migrations.AddConstraint(
+            model_name='cashierclosing',
+            constraint=models.UniqueConstraint(fields=('business_date', 'cashier'), name='closing_unique_day'),
+        ),
+    ]
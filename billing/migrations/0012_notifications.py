@@ -0,0 +1,42 @@
+# Generated by Django 6.0.2 on 2026-10-19 15:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0011_cashier_closing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('BILL_READY', 'Bill Ready'), ('DUE_SOON', 'Payment Due Soon'), ('CUTOFF', 'Disconnection Cutoff')], max_length=20)),
+                ('channel', models.CharField(choices=[('SMS', 'SMS'), ('EMAIL', 'E-mail')], max_length=10)),
+                ('recipient', models.CharField(help_text='Mobile number or e-mail address', max_length=254)),
+                ('subject', models.CharField(blank=True, max_length=200)),
+                ('body', models.TextField()),
+                ('dedupe_key', models.CharField(help_text='kind:channel:bill or notice; one message per event', max_length=100, unique=True)),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('SENDING', 'Sending'), ('SENT', 'Sent'), ('FAILED', 'Failed'), ('CANCELLED', 'Cancelled')], default='QUEUED', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Not sent before this time (retry back-off)')),
+                ('last_error', models.TextField(blank=True)),
+                ('provider_ref', models.CharField(blank=True, help_text='Message id returned by the backend', max_length=100)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bill', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='billing.bill')),
+                ('notice', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='billing.disconnectionnotice')),
+                ('subscriber', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='billing.subscriber')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='notify_status_next_idx'), models.Index(fields=['subscriber', 'created_at'], name='notify_sub_created_idx')],
+            },
+        ),
+    ]
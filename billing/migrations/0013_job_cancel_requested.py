@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-19 16:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0012_notifications'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='cancel_requested',
+            field=models.BooleanField(default=False, help_text='Stays RUNNING until the worker stops the command'),
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'RUNNING')), fields=('command',), name='job_one_running_per_command'),
+        ),
+    ]
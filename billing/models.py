@@ -1,6 +1,7 @@
 # Create your models here.
 from django.db import models
 from django.utils import timezone
+from datetime import timedelta
 from decimal import Decimal
 from django.contrib.auth.models import User
  
@@ -49,6 +50,9 @@ class Subscriber(models.Model):
     meter_number    = models.CharField(max_length=50, unique=True)
     meter_size      = models.CharField(max_length=20, default='1/2 inch')
     service_address = models.TextField()
+    latest_reading  = models.ForeignKey('MeterReading', on_delete=models.SET_NULL,
+                          null=True, blank=True, editable=False, related_name='+',
+                          help_text='Most recent reading by billing month (kept up to date on insert)')
  
 #     ── Account Dates ─────────────────────────────────────────
     connection_date = models.DateField()
@@ -69,6 +73,9 @@ class Subscriber(models.Model):
         ordering = ['last_name', 'first_name']
         verbose_name        = 'Subscriber'
         verbose_name_plural = 'Subscribers'
+        indexes = [
+            models.Index(fields=['status'], name='sub_status_idx'),
+        ]
  
     def __str__(self):
         return f'{self.account_number} - {self.last_name}, {self.first_name}'
@@ -126,17 +133,33 @@ class MeterReading(models.Model):
     current_reading  = models.DecimalField(max_digits=12, decimal_places=2)
     reader_name      = models.CharField(max_length=100, blank=True)
     remarks          = models.TextField(blank=True)
+    is_estimated     = models.BooleanField(default=False,
+                           help_text='Meter not read; consumption estimated from recent history')
+    client_id        = models.CharField(max_length=64, unique=True, null=True,
+                           blank=True, editable=False,
+                           help_text='ID assigned by the handheld device that captured the reading')
     created_at       = models.DateTimeField(auto_now_add=True)
  
     class Meta:
         ordering = ['-billing_month']
         unique_together = ['subscriber', 'billing_month']
+        indexes = [
+            models.Index(fields=['billing_month'], name='reading_month_idx'),
+        ]
  
     @property
     def volume_consumed(self):
         """Returns cubic meters consumed this month."""
         return self.current_reading - self.previous_reading
  
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+#         Move the subscriber's latest-reading pointer forward if this one is newer
+        Subscriber.objects.filter(pk=self.subscriber_id).filter(
+            models.Q(latest_reading__isnull=True) |
+            models.Q(latest_reading__billing_month__lte=self.billing_month)
+        ).update(latest_reading=self)
+ 
     def __str__(self):
         return (f'{self.subscriber.account_number} | '
                 f'{self.billing_month:%B %Y} | '
@@ -192,6 +215,14 @@ class Bill(models.Model):
  
     class Meta:
         ordering = ['-billing_month']
+        indexes = [
+            models.Index(fields=['subscriber', 'status'],    name='bill_sub_status_idx'),
+            models.Index(fields=['billing_month', 'status'], name='bill_month_status_idx'),
+            models.Index(fields=['status', 'balance'],       name='bill_status_balance_idx'),
+#             Open bills only — delinquent list ordered by balance
+            models.Index(fields=['-balance'], name='bill_open_balance_idx',
+                         condition=models.Q(status__in=['UNPAID', 'PARTIAL', 'OVERDUE'])),
+        ]
  
     def __str__(self):
         return (f'Bill {self.subscriber.account_number} | '
@@ -244,6 +275,16 @@ class Ledger(models.Model):
  
     class Meta:
         ordering = ['entry_date', 'created_at']
+        indexes = [
+            models.Index(fields=['subscriber', 'entry_date', 'created_at'], name='ledger_sub_date_idx'),
+            models.Index(fields=['entry_type', 'entry_date'],              name='ledger_type_date_idx'),
+            models.Index(fields=['entry_date', 'created_at'],              name='ledger_date_idx'),
+        ]
+        constraints = [
+#             One payment per official receipt; also the index for OR lookups
+            models.UniqueConstraint(fields=['or_number'], name='ledger_unique_or',
+                                    condition=models.Q(entry_type='PAYMENT') & ~models.Q(or_number='')),
+        ]
  
     def __str__(self):
         return (f'{self.subscriber.account_number} | '
@@ -261,6 +302,7 @@ class OtherCharge(models.Model):
         ('MATERIAL',     'Materials Charge'),
         ('LABOR',        'Labor Charge'),
         ('METER_REPL',   'Meter Replacement'),
+        ('ESTIMATE_ADJ', 'Estimated Reading Adjustment'),
         ('CUSTOM',       'Custom / Other'),
     ]
  
@@ -314,7 +356,357 @@ class DisconnectionNotice(models.Model):
  
     class Meta:
         ordering = ['-notice_date']
+        indexes = [
+            models.Index(fields=['status'], name='notice_status_idx'),
+        ]
  
     def __str__(self):
         return (f'Notice | {self.subscriber.account_number} | '
-                f'Cutoff: {self.cutoff_date} | {self.get_status_display()}')
\ No newline at end of file
+                f'Cutoff: {self.cutoff_date} | {self.get_status_display()}')
+
+# ═══════════════════════════════════════════════════════════
+#   MODEL 8 — ReadingFlag  (suspect reading held for review)
+# ═══════════════════════════════════════════════════════════
+class ReadingFlag(models.Model):
+    FLAG_TYPE_CHOICES = [
+        ('OUTLIER',        'Unusual vs. Own History'),
+        ('COHORT_OUTLIER', 'Unusual vs. Barangay / Classification'),
+        ('ZERO_STREAK',    'Zero Consumption Streak'),
+        ('ROLLOVER',       'Register Went Backwards / Rollover'),
+    ]
+    STATUS_CHOICES = [
+        ('OPEN',    'Open — Hold Billing'),
+        ('CLEARED', 'Cleared — OK to Bill'),
+    ]
+ 
+    meter_reading    = models.ForeignKey(MeterReading,
+                           on_delete=models.CASCADE,
+                           related_name='flags')
+    subscriber       = models.ForeignKey(Subscriber,
+                           on_delete=models.CASCADE,
+                           related_name='reading_flags')
+    billing_month    = models.DateField()
+    flag_type        = models.CharField(max_length=20, choices=FLAG_TYPE_CHOICES)
+    score            = models.DecimalField(max_digits=10, decimal_places=2,
+                           default=Decimal('0.00'),
+                           help_text='Robust z-score or streak length, depending on flag type')
+    detail           = models.CharField(max_length=255, blank=True)
+    status           = models.CharField(max_length=10,
+                           choices=STATUS_CHOICES, default='OPEN')
+    reviewed_by      = models.CharField(max_length=100, blank=True)
+    created_at       = models.DateTimeField(auto_now_add=True)
+ 
+    class Meta:
+        ordering = ['-billing_month', 'subscriber']
+        unique_together = ['meter_reading', 'flag_type']
+        indexes = [
+            models.Index(fields=['billing_month', 'status'], name='flag_month_status_idx'),
+        ]
+ 
+    def __str__(self):
+        return (f'{self.subscriber.account_number} | '
+                f'{self.billing_month:%B %Y} | '
+                f'{self.get_flag_type_display()} | {self.get_status_display()}')
+
+
+# ═══════════════════════════════════════════════════════════
+#   MODEL 9 — Job  (management command queued for the workers)
+# ═══════════════════════════════════════════════════════════
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('QUEUED',    'Queued'),
+        ('RUNNING',   'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED',    'Failed'),
+        ('CANCELLED', 'Cancelled'),
+    ]
+
+    command       = models.CharField(max_length=50,
+                        help_text='Management command name, e.g. run_billing')
+    arguments     = models.JSONField(default=dict, blank=True,
+                        help_text='Command options, e.g. {"billing_month": "2026-03-01"}')
+    status        = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    priority      = models.SmallIntegerField(default=0, help_text='Higher runs first')
+    run_after     = models.DateTimeField(default=timezone.now,
+                        help_text='Not claimed before this time (retry back-off)')
+    attempts      = models.PositiveSmallIntegerField(default=0)
+    max_attempts  = models.PositiveSmallIntegerField(default=3)
+
+#     ── Progress (written by the worker) ──────────────────────
+    progress      = models.PositiveSmallIntegerField(default=0, help_text='Percent done')
+    progress_note = models.CharField(max_length=255, blank=True)
+    output        = models.TextField(blank=True, help_text='Tail of the command output')
+    error         = models.TextField(blank=True)
+    worker        = models.CharField(max_length=100, blank=True)
+    heartbeat_at  = models.DateTimeField(null=True, blank=True)
+    cancel_requested = models.BooleanField(default=False,
+                        help_text='Stays RUNNING until the worker stops the command')
+
+#     ── Audit ─────────────────────────────────────────────────
+    schedule      = models.ForeignKey('JobSchedule', on_delete=models.SET_NULL,
+                        null=True, blank=True, related_name='jobs')
+    requested_by  = models.ForeignKey(User, on_delete=models.SET_NULL,
+                        null=True, blank=True, related_name='+')
+    created_at    = models.DateTimeField(auto_now_add=True)
+    started_at    = models.DateTimeField(null=True, blank=True)
+    finished_at   = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+        constraints = [
+#             two workers may race to claim the same command; the second claim fails here
+            models.UniqueConstraint(fields=['command'], condition=models.Q(status='RUNNING'),
+                                    name='job_one_running_per_command'),
+        ]
+
+    def __str__(self):
+        return f'Job #{self.pk} | {self.command} | {self.get_status_display()}'
+
+    @property
+    def status_label(self):
+        if self.status == 'RUNNING' and self.cancel_requested:
+            return 'Cancelling'
+        return self.get_status_display()
+
+    @property
+    def is_finished(self):
+        return self.status in ('SUCCEEDED', 'FAILED', 'CANCELLED')
+
+
+# ═══════════════════════════════════════════════════════════
+#   MODEL 10 — JobSchedule  (cron-style recurring job)
+# ═══════════════════════════════════════════════════════════
+class JobSchedule(models.Model):
+    name          = models.CharField(max_length=100, unique=True)
+    command       = models.CharField(max_length=50)
+    arguments     = models.JSONField(default=dict, blank=True)
+    cron          = models.CharField(max_length=100,
+                        help_text='minute hour day-of-month month day-of-week, local time; '
+                                  'e.g. "30 1 * * *" = daily at 01:30')
+    is_active     = models.BooleanField(default=True)
+    next_run_at   = models.DateTimeField(null=True, blank=True,
+                        help_text='Filled in from the cron expression when left blank')
+    last_run_at   = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f'{self.name} ({self.cron} → {self.command})'
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        from .jobs import parse_cron
+        try:
+            parse_cron(self.cron)
+        except ValueError as e:
+            raise ValidationError({'cron': str(e)})
+
+
+# ═══════════════════════════════════════════════════════════
+#   MODEL 11 — ReceivableAgingSnapshot  (one subscriber's open
+#   balance by days past due, as of one date; see aging.py)
+# ═══════════════════════════════════════════════════════════
+class ReceivableAgingSnapshot(models.Model):
+    as_of          = models.DateField()
+    subscriber     = models.ForeignKey(Subscriber, on_delete=models.CASCADE,
+                         related_name='aging_snapshots')
+
+#     ── Copied from the subscriber, so old snapshots group as they were ──
+    barangay       = models.CharField(max_length=100)
+    classification = models.CharField(max_length=20,
+                         choices=Subscriber.CLASSIFICATION_CHOICES)
+
+#     ── Open balance by days past the bill's due date ─────────
+    current        = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'),
+                         help_text='Not yet due')
+    days_1_30      = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    days_31_60     = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    days_61_90     = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    days_91_120    = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    over_120       = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    total          = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    open_bills     = models.PositiveIntegerField(default=0)
+    oldest_due     = models.DateField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-as_of', '-total']
+        constraints = [
+            models.UniqueConstraint(fields=['as_of', 'subscriber'], name='aging_as_of_subscriber_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['as_of', 'barangay'], name='aging_as_of_barangay_idx'),
+        ]
+
+    def __str__(self):
+        return f'Aging {self.as_of} | {self.subscriber.account_number} | {self.total}'
+
+
+# ═══════════════════════════════════════════════════════════
+#   MODEL 12 — MonthlyBillingSummary  (month × barangay ×
+#   classification rollup for the trends report; see rollups.py)
+# ═══════════════════════════════════════════════════════════
+class MonthlyBillingSummary(models.Model):
+    month          = models.DateField(help_text='First day of the month')
+    barangay       = models.CharField(max_length=100)
+    classification = models.CharField(max_length=20,
+                         choices=Subscriber.CLASSIFICATION_CHOICES)
+
+#     ── Subscribers ───────────────────────────────────────────
+    connections    = models.PositiveIntegerField(default=0,
+                         help_text='Connected at some time during the month')
+    billed_subscribers = models.PositiveIntegerField(default=0)
+    paying_subscribers = models.PositiveIntegerField(default=0)
+
+#     ── Billing (by billing month) ────────────────────────────
+    bills          = models.PositiveIntegerField(default=0)
+    volume         = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'),
+                         help_text='m³ billed')
+    water_charges  = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'),
+                         help_text='After senior discounts')
+    discounts      = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    other_charges  = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+#     ── Ledger (by entry date) ────────────────────────────────
+    penalties      = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    collections    = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    payments       = models.PositiveIntegerField(default=0)
+
+    refreshed_at   = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['month', 'barangay', 'classification']
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'barangay', 'classification'],
+                                    name='summary_month_group_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.month:%Y-%m} | {self.barangay} | {self.classification}'
+
+    @property
+    def billed(self):
+        """New charges of the month: water plus other charges, no arrears."""
+        return self.water_charges + self.other_charges
+
+
+# ═══════════════════════════════════════════════════════════
+#   MODEL 13 — HighWaterMark  (last ledger id an incremental
+#   job has processed, by job name)
+# ═══════════════════════════════════════════════════════════
+class HighWaterMark(models.Model):
+#     On PostgreSQL ids are handed out before commit, so a higher id can
+#     become visible before a lower one. A mark only moves up to entries
+#     older than SETTLE_SECONDS; a ledger write open longer than that is
+#     assumed not to happen (posting a payment or a bill takes well under
+#     a second).
+    SETTLE_SECONDS = 60
+
+    name       = models.CharField(max_length=50, unique=True)
+    last_id    = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.last_id}'
+
+    @classmethod
+    def settled_ledger_id(cls, now=None):
+        """Highest ledger id below every entry written in the last SETTLE_SECONDS."""
+        since  = (now or timezone.now()) - timedelta(seconds=cls.SETTLE_SECONDS)
+        recent = Ledger.objects.filter(created_at__gte=since).aggregate(m=models.Min('id'))['m']
+        if recent is not None:
+            return recent - 1
+        return Ledger.objects.aggregate(m=models.Max('id'))['m'] or 0
+
+
+# ═══════════════════════════════════════════════════════════
+#   MODEL 14 — CashierClosing  (a cashier's end-of-day
+#   remittance; no more payments post for that cashier and day)
+# ═══════════════════════════════════════════════════════════
+class CashierClosing(models.Model):
+    business_date = models.DateField()
+    cashier       = models.CharField(max_length=100,
+                        help_text='Ledger.received_by of the payments closed')
+#     ── Remittance (as counted at closing) ───────────────────
+    payments      = models.PositiveIntegerField(default=0)
+    total         = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    first_or      = models.CharField(max_length=50, blank=True)
+    last_or       = models.CharField(max_length=50, blank=True)
+    gaps          = models.PositiveIntegerField(default=0,
+                        help_text='OR numbers skipped within the day\'s series')
+    duplicates    = models.PositiveIntegerField(default=0)
+#     ── Audit ─────────────────────────────────────────────────
+    remarks       = models.CharField(max_length=255, blank=True)
+    closed_by     = models.CharField(max_length=150)
+    closed_at     = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-business_date', 'cashier']
+        constraints = [
+            models.UniqueConstraint(fields=['business_date', 'cashier'], name='closing_unique_day'),
+        ]
+
+    def __str__(self):
+        return f'{self.cashier} | {self.business_date} | P{self.total}'
+
+
+# ═══════════════════════════════════════════════════════════
+#   MODEL 15 — Notification  (SMS / e-mail to a subscriber,
+#   queued in bulk and sent by send_notifications)
+# ═══════════════════════════════════════════════════════════
+class Notification(models.Model):
+    KIND_CHOICES = [
+        ('BILL_READY', 'Bill Ready'),
+        ('DUE_SOON',   'Payment Due Soon'),
+        ('CUTOFF',     'Disconnection Cutoff'),
+    ]
+    CHANNEL_CHOICES = [
+        ('SMS',   'SMS'),
+        ('EMAIL', 'E-mail'),
+    ]
+    STATUS_CHOICES = [
+        ('QUEUED',    'Queued'),
+        ('SENDING',   'Sending'),
+        ('SENT',      'Sent'),
+        ('FAILED',    'Failed'),
+        ('CANCELLED', 'Cancelled'),
+    ]
+
+    subscriber      = models.ForeignKey(Subscriber, on_delete=models.CASCADE,
+                          related_name='notifications')
+    bill            = models.ForeignKey(Bill, on_delete=models.CASCADE,
+                          null=True, blank=True, related_name='notifications')
+    notice          = models.ForeignKey(DisconnectionNotice, on_delete=models.CASCADE,
+                          null=True, blank=True, related_name='notifications')
+    kind            = models.CharField(max_length=20, choices=KIND_CHOICES)
+    channel         = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient       = models.CharField(max_length=254, help_text='Mobile number or e-mail address')
+    subject         = models.CharField(max_length=200, blank=True)
+    body            = models.TextField()
+    dedupe_key      = models.CharField(max_length=100, unique=True,
+                          help_text='kind:channel:bill or notice; one message per event')
+#     ── Delivery ──────────────────────────────────────────────
+    status          = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    attempts        = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now,
+                          help_text='Not sent before this time (retry back-off)')
+    last_error      = models.TextField(blank=True)
+    provider_ref    = models.CharField(max_length=100, blank=True,
+                          help_text='Message id returned by the backend')
+    sent_at         = models.DateTimeField(null=True, blank=True)
+    created_at      = models.DateTimeField(auto_now_add=True)
+    updated_at      = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='notify_status_next_idx'),
+            models.Index(fields=['subscriber', 'created_at'],  name='notify_sub_created_idx'),
+        ]
+
+    def __str__(self):
+        return (f'{self.subscriber.account_number} | {self.get_kind_display()} | '
+                f'{self.channel} | {self.get_status_display()}')
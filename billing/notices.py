@@ -0,0 +1,142 @@
+"""
+Printable billing notices, rendered once and served from the 'notices'
+cache until the bill changes.
+
+A rendered notice is stored under a version string built from the bill
+id, the bill's and subscriber's updated_at, the meter reading as printed
+(date, registers, estimated flag) and the open disconnection notice as
+printed (status, dates, penalty rate, reconnection fee). Posting a
+payment, editing the account, correcting or reconciling the reading, or
+issuing, delivering or editing a notice produces a new version, so a
+stale entry is never served; old entries expire after NOTICE_TTL.
+Readings and notices carry no change timestamp, so editing one changes
+the ETag but not Last-Modified. The same version is the response ETag, so reprinting an unchanged bill costs two
+small queries and a 304, with no template render.
+
+run_billing pre-renders the month's notices as its last step, and
+prerender_notices does the same on demand, so the first print after a
+billing run is already a cache hit. The cache is on disk (settings.CACHES)
+so the run_jobs workers and every server process share it.
+"""
+import hashlib
+
+from django.core.cache import caches
+from django.db.models import Prefetch
+from django.template.loader import render_to_string
+
+from .models import Bill, DisconnectionNotice
+from .profiling import phased
+
+ACTIVE_NOTICE = ['PENDING', 'DELIVERED']
+READING_SHOWN = ('reading_date', 'previous_reading', 'current_reading', 'is_estimated')
+NOTICE_SHOWN  = ('id', 'status', 'notice_date', 'cutoff_date', 'penalty_rate_pct', 'reconnection_fee')
+NOTICE_TTL    = 45 * 24 * 3600   # outlives the month's due and cutoff dates
+WARM_BATCH    = 500              # bills rendered per cache write when pre-rendering
+
+
+def active_notices():
+    return (DisconnectionNotice.objects.filter(status__in=ACTIVE_NOTICE)
+            .order_by('-notice_date', '-id'))
+
+
+def version(pk, bill_updated, subscriber_updated, reading, notice):
+    """
+    (ETag, Last-Modified) of one notice; `reading` is the bill's meter
+    reading as READING_SHOWN values, `notice` the open disconnection
+    notice as NOTICE_SHOWN values followed by its created_at, or None.
+    """
+    parts    = [pk, bill_updated.isoformat(), subscriber_updated.isoformat(), *reading]
+    modified = max(bill_updated, subscriber_updated)
+    if notice:
+        parts   += notice[:-1]
+        modified = max(modified, notice[-1])
+    etag = hashlib.blake2b('|'.join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return etag, modified
+
+
+def current_version(pk):
+    """Version of bill `pk` as stored now, without loading the bill; None if it doesn't exist."""
+    row = Bill.objects.filter(pk=pk).values_list(
+        'updated_at', 'subscriber__updated_at', *(f'meter_reading__{f}' for f in READING_SHOWN)).first()
+    if row is None:
+        return None
+    notice = (active_notices().filter(bill_id=pk)
+              .values_list(*NOTICE_SHOWN, 'created_at').first())
+    return version(pk, row[0], row[1], row[2:], notice)
+
+
+def version_of(bill, notice):
+    return version(bill.pk, bill.updated_at, bill.subscriber.updated_at,
+                   [getattr(bill.meter_reading, f) for f in READING_SHOWN],
+                   notice and [*(getattr(notice, f) for f in NOTICE_SHOWN), notice.created_at])
+
+
+def cache_key(etag):
+    return f'billing-notice:{etag}'
+
+
+def render_notice(bill, notice):
+    return render_to_string('billing/billing_notice.html', {'bill': bill, 'notice': notice})
+
+
+def get_notice(pk, state):
+    """
+    (html, etag, last_modified) for bill `pk` at `state`, the version from
+    current_version, rendering and caching it on a miss. Raises
+    Bill.DoesNotExist.
+    """
+    cache = caches['notices']
+    html  = cache.get(cache_key(state[0]))
+    if html is not None:
+        return html, *state
+
+    bill   = Bill.objects.select_related('subscriber', 'meter_reading').get(pk=pk)
+    notice = active_notices().filter(bill=bill).first()
+#     versioned from the rows actually rendered, in case the bill changed in between
+    etag, modified = version_of(bill, notice)
+    html = render_notice(bill, notice)
+    cache.set(cache_key(etag), html, NOTICE_TTL)
+    return html, etag, modified
+
+
+# ══════════════════════════════════════════════════════════
+#   Pre-rendering — warm the cache for a whole billing month
+# ══════════════════════════════════════════════════════════
+@phased('prerender_notices')
+def prerender(billing_month, force=False, progress=None):
+    """
+    Render and cache every notice of `billing_month` not already cached
+    (all of them with force=True). Returns (rendered, total).
+    """
+    bills = (Bill.objects.filter(billing_month=billing_month)
+             .select_related('subscriber', 'meter_reading')
+             .prefetch_related(Prefetch('disconnection_notices', queryset=active_notices(),
+                                        to_attr='open_notices'))
+             .order_by('id'))
+    total    = bills.count()
+    rendered = done = 0
+    batch    = []
+    for bill in bills.iterator(chunk_size=WARM_BATCH):
+        batch.append(bill)
+        if len(batch) == WARM_BATCH:
+            rendered += _warm(batch, force)
+            done     += len(batch)
+            batch     = []
+            if progress:
+                progress(done, total, f'{rendered} notices rendered')
+    rendered += _warm(batch, force)
+    return rendered, total
+
+
+def _warm(bills, force):
+    cache   = caches['notices']
+    pending = {}
+    for bill in bills:
+        notice = bill.open_notices[0] if bill.open_notices else None
+        pending[cache_key(version_of(bill, notice)[0])] = (bill, notice)
+    if not force:
+        for key in cache.get_many(list(pending)):
+            del pending[key]
+    cache.set_many({key: render_notice(bill, notice) for key, (bill, notice) in pending.items()},
+                   NOTICE_TTL)
+    return len(pending)
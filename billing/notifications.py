@@ -0,0 +1,405 @@
+"""
+SMS and e-mail notifications to subscribers: bill ready, payment due
+soon and disconnection cutoff. Messages are queued in bulk as
+Notification rows, then sent by send_notifications running in the job
+workers.
+
+    queue_bill_ready(date(2026, 3, 1))   # run_billing does this after billing
+    queue_due_soon(days=3)               # schedule daily (queue_notifications --kind due)
+    queue_cutoffs()                      # issuing a notice queues its own message
+    dispatch()                           # send_notifications
+
+Queuing reads each source in one streamed query and inserts in chunks.
+A subscriber gets one message per channel for which they have a
+contact: a valid mobile number for SMS, an e-mail address for EMAIL.
+Each message has a unique dedupe_key (kind:channel:bill-<id> or
+notice-<id>), so queuing the same month again adds nothing.
+
+Sending claims a batch of due messages, opens each channel's backend
+once per batch and sends at no more than the channel's RATE a second.
+The batch's statuses are written back in one bulk update. A failed
+send is retried with exponential back-off up to MAX_ATTEMPTS; a run
+that leaves retries queues the send job that picks them up. A
+PermanentFailure (a refused number or address) fails at once. A
+channel whose backend fails to open counts a failed attempt for each of
+its messages in the batch; the other channels still send. A
+reminder for a bill paid since, or a cutoff notice no longer pending,
+is cancelled instead of sent.
+
+Channels and their backends are set in settings.NOTIFICATION_CHANNELS,
+in the same shape as CACHES. FileBackend writes messages to an outbox
+directory and stands in for an SMS gateway. EmailBackend sends through
+Django's mail settings: SMTP in production, a local debugging SMTP
+server or the file backend in testing.
+"""
+import json
+import re
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+from email.utils import make_msgid
+from itertools import islice
+from pathlib import Path
+from smtplib import SMTPRecipientsRefused
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.utils import DNS_NAME
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .jobs import enqueue
+from .models import Bill, DisconnectionNotice, Job, Notification
+
+CHUNK         = 500
+BATCH         = 100
+MAX_ATTEMPTS  = 5
+RETRY_BACKOFF = 60        # seconds before the first retry; doubles each attempt
+STALE_AFTER   = 600       # a SENDING message this old lost its worker
+OPEN_NOTICES  = ['PENDING', 'DELIVERED']
+MOBILE        = re.compile(r'^(?:\+?63|0)?(9\d{9})$')
+
+#   kind → (e-mail subject, message); formatted with the source row
+TEXTS = {
+    'BILL_READY': ('Water bill for {month:%B %Y}, account {account}',
+                   'Macrohon Water: Hi {first_name}, your {month:%B %Y} bill for account {account} '
+                   'is P{amount:,.2f} for {volume:,.0f} cu.m, due {due:%b %d}. Please pay at the '
+                   'Municipal Treasurer\'s Office.'),
+    'DUE_SOON':   ('Payment reminder, account {account}',
+                   'Macrohon Water: Reminder, account {account} has P{amount:,.2f} due on '
+                   '{due:%b %d}. Pay on time to avoid the late payment penalty.'),
+    'CUTOFF':     ('Disconnection notice, account {account}',
+                   'Macrohon Water: Account {account} is overdue by P{amount:,.2f}. Water service '
+                   'will be disconnected on {due:%b %d, %Y} unless the balance is paid.'),
+}
+
+#   the subscriber's fields every source row carries
+CONTACT = dict(account=F('subscriber__account_number'), first_name=F('subscriber__first_name'),
+               mobile=F('subscriber__contact_number'), email=F('subscriber__email'))
+REACHABLE = ~Q(subscriber__contact_number='') | ~Q(subscriber__email='')
+
+
+def normalize_mobile(number):
+    """'+639171234567' for any common way of writing a PH mobile number; None otherwise."""
+    match = MOBILE.match(re.sub(r'[\s\-().]', '', number or ''))
+    return f'+63{match.group(1)}' if match else None
+
+
+# ══════════════════════════════════════════════════════════
+#   Queuing — one streamed query per source, chunked bulk
+#   inserts, already queued messages skipped by dedupe_key
+# ══════════════════════════════════════════════════════════
+def queue(kind, rows, source):
+    """Queue `kind` messages for `rows` (dicts from a values() query); returns the number queued."""
+    channels      = settings.NOTIFICATION_CHANNELS
+    subject, text = TEXTS[kind]
+    rows   = iter(rows)
+    queued = 0
+    while chunk := list(islice(rows, CHUNK)):
+        pending = {}
+        for row in chunk:
+            body = text.format_map(row)
+            for channel, recipient in (('SMS', normalize_mobile(row['mobile'])), ('EMAIL', row['email'])):
+                if channel not in channels or not recipient:
+                    continue
+                key = f'{kind}:{channel}:{source}-{row["id"]}'
+                pending[key] = Notification(
+                    subscriber_id = row['subscriber_id'],
+                    bill_id       = row['id'] if source == 'bill' else row['bill_id'],
+                    notice_id     = row['id'] if source == 'notice' else None,
+                    kind          = kind,
+                    channel       = channel,
+                    recipient     = recipient,
+                    subject       = subject.format_map(row) if channel == 'EMAIL' else '',
+                    body          = body,
+                    dedupe_key    = key,
+                )
+        queued_before = set(Notification.objects.filter(dedupe_key__in=list(pending))
+                            .values_list('dedupe_key', flat=True))
+        new = [n for key, n in pending.items() if key not in queued_before]
+        Notification.objects.bulk_create(new, ignore_conflicts=True)
+        queued += len(new)
+    return queued
+
+
+def queue_bill_ready(billing_month):
+    bills = (Bill.objects.filter(billing_month=billing_month).filter(REACHABLE)
+             .values('id', 'subscriber_id', month=F('billing_month'), amount=F('total_amount_due'),
+                     volume=F('volume_consumed'), due=F('due_date'), **CONTACT)
+             .order_by('id'))
+    return queue('BILL_READY', bills.iterator(chunk_size=CHUNK), 'bill')
+
+
+def queue_due_soon(days=3, today=None):
+    """Reminders for open bills falling due within `days`."""
+    today = today or date.today()
+    bills = (Bill.objects.filter(status__in=['UNPAID', 'PARTIAL'], balance__gt=0,
+                                 due_date__gte=today, due_date__lte=today + timedelta(days=days))
+             .filter(REACHABLE)
+             .values('id', 'subscriber_id', amount=F('balance'), due=F('due_date'), **CONTACT)
+             .order_by('id'))
+    return queue('DUE_SOON', bills.iterator(chunk_size=CHUNK), 'bill')
+
+
+def queue_cutoffs(notices=None, today=None):
+    """Messages for pending disconnection notices (`notices` narrows them) whose cutoff is still ahead."""
+    today   = today or date.today()
+    notices = DisconnectionNotice.objects.all() if notices is None else notices
+    rows    = (notices.filter(status__in=OPEN_NOTICES, cutoff_date__gte=today).filter(REACHABLE)
+               .values('id', 'subscriber_id', 'bill_id', amount=F('amount_overdue'),
+                       due=F('cutoff_date'), **CONTACT)
+               .order_by('id'))
+    return queue('CUTOFF', rows.iterator(chunk_size=CHUNK), 'notice')
+
+
+def schedule_send(run_after=None):
+    """Queue a send_notifications job for `run_after` (now), unless one already waits to run by then."""
+    waiting = Job.objects.filter(command='send_notifications', status='QUEUED')
+    if run_after is not None:
+        waiting = waiting.filter(run_after__lte=run_after)
+    if not waiting.exists():
+        enqueue('send_notifications', run_after=run_after)
+
+
+# ══════════════════════════════════════════════════════════
+#   Backends — send(notification) returns the provider's
+#   reference or raises; open() and close() wrap a batch
+# ══════════════════════════════════════════════════════════
+class PermanentFailure(Exception):
+    """The backend refused the recipient; the message is not retried."""
+
+
+class BaseBackend:
+    def __init__(self, **options):
+        self.options = options
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send(self, notification):
+        raise NotImplementedError
+
+
+class FileBackend(BaseBackend):
+    """Appends each message as a JSON line to <directory>/<channel>-<date>.jsonl."""
+
+    def __init__(self, directory='outbox'):
+        self.directory = Path(directory)
+        self.files     = {}
+
+    def send(self, notification):
+        name = f'{notification.channel.lower()}-{timezone.localdate():%Y%m%d}.jsonl'
+        if name not in self.files:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.files[name] = open(self.directory / name, 'a', encoding='utf-8')
+        fh = self.files[name]
+        fh.write(json.dumps({'id': notification.pk, 'to': notification.recipient,
+                             'subject': notification.subject, 'message': notification.body,
+                             'queued': notification.created_at.isoformat()}) + '\n')
+        fh.flush()
+        return f'{name}:{notification.pk}'
+
+    def close(self):
+        for fh in self.files.values():
+            fh.close()
+        self.files = {}
+
+
+class EmailBackend(BaseBackend):
+    """Through Django's EMAIL_BACKEND, one connection per batch."""
+
+    def __init__(self, from_email=None):
+        self.from_email = from_email or settings.DEFAULT_FROM_EMAIL
+        self.connection = None
+
+    def open(self):
+        self.connection = get_connection()
+        self.connection.open()
+
+    def send(self, notification):
+        message_id = make_msgid(domain=DNS_NAME)
+        message = EmailMessage(notification.subject, notification.body, self.from_email,
+                               [notification.recipient], connection=self.connection,
+                               headers={'Message-ID': message_id})
+        try:
+            message.send()
+        except SMTPRecipientsRefused as e:
+            raise PermanentFailure(f'Address refused: {e.recipients}') from e
+        return message_id
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+class HttpBackend(BaseBackend):
+    """An SMS gateway taking a JSON POST of {to, message, sender}; 4xx is permanent, anything else retried."""
+
+    def __init__(self, url, token='', sender='', timeout=10):
+        self.url     = url
+        self.token   = token
+        self.sender  = sender
+        self.timeout = timeout
+
+    def send(self, notification):
+        body    = json.dumps({'to': notification.recipient, 'message': notification.body,
+                              'sender': self.sender}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={
+            'Content-Type': 'application/json', 'Authorization': f'Bearer {self.token}'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                reply = json.loads(response.read() or b'{}')
+        except urllib.error.HTTPError as e:
+            if 400 <= e.code < 500 and e.code != 429:
+                raise PermanentFailure(f'Gateway refused the message (HTTP {e.code})') from e
+            raise
+        return str(reply.get('id', '')) if isinstance(reply, dict) else ''
+
+
+class Throttle:
+    """At most `rate` sends a second; 0 is no limit."""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1 / rate if rate else 0
+        self.clock    = clock
+        self.sleep    = sleep
+        self.next     = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = self.clock()
+        if now < self.next:
+            self.sleep(self.next - now)
+            now = self.next
+        self.next = now + self.interval
+
+
+# ══════════════════════════════════════════════════════════
+#   Sending — claim a batch, send it through each channel's
+#   backend at its rate, write the statuses back in one go
+# ══════════════════════════════════════════════════════════
+def claim_batch(size):
+    now = timezone.now()
+    ids = list(Notification.objects.filter(status='QUEUED', next_attempt_at__lte=now)
+               .order_by('next_attempt_at', 'id').values_list('id', flat=True)[:size])
+    if not ids:
+        return []
+    Notification.objects.filter(id__in=ids, status='QUEUED').update(status='SENDING', updated_at=now)
+#     another sender may have claimed some of them first
+    return list(Notification.objects.filter(id__in=ids, status='SENDING', updated_at=now)
+                .select_related('bill', 'notice').order_by('id'))
+
+
+def is_moot(notification):
+    """A reminder for a bill paid since, or a cutoff for a notice no longer pending."""
+    if notification.kind == 'DUE_SOON':
+        return notification.bill is None or notification.bill.balance <= 0
+    if notification.kind == 'CUTOFF':
+        return notification.notice is None or notification.notice.status not in OPEN_NOTICES
+    return False
+
+
+def deliver(notification, backend, throttle, now):
+    """
+    Send one message and set its status fields (not saved); returns the
+    outcome. `backend` is the exception raised opening it when the
+    channel could not be opened for this batch.
+    """
+    if is_moot(notification):
+        notification.status = 'CANCELLED'
+        return 'CANCELLED'
+    if backend is None:
+        notification.status, notification.last_error = 'FAILED', 'Channel not configured'
+        return 'FAILED'
+    if isinstance(backend, Exception):
+        notification.attempts += 1
+        return retry_later(notification, backend, now)
+
+    throttle.wait()
+    notification.attempts += 1
+    try:
+        notification.provider_ref = backend.send(notification)[:100]
+    except PermanentFailure as e:
+        notification.status, notification.last_error = 'FAILED', str(e)
+        return 'FAILED'
+    except Exception as e:
+        return retry_later(notification, e, now)
+    notification.status, notification.sent_at, notification.last_error = 'SENT', timezone.now(), ''
+    return 'SENT'
+
+
+def retry_later(notification, error, now):
+    """Requeue after a failed attempt with back-off, or fail it after MAX_ATTEMPTS."""
+    notification.last_error = f'{type(error).__name__}: {error}'
+    if notification.attempts >= MAX_ATTEMPTS:
+        notification.status = 'FAILED'
+        return 'FAILED'
+    notification.status          = 'QUEUED'
+    notification.next_attempt_at = now + timedelta(
+        seconds=RETRY_BACKOFF * 2 ** (notification.attempts - 1))
+    return 'RETRY'
+
+
+def open_backend(channel):
+    config = settings.NOTIFICATION_CHANNELS.get(channel)
+    if not config:
+        return None
+    backend = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    backend.open()
+    return backend
+
+
+def dispatch(batch_size=BATCH, limit=None, progress=None):
+    """Send the due messages, at most `limit`; returns {outcome: count}."""
+    stale = timezone.now() - timedelta(seconds=STALE_AFTER)
+    Notification.objects.filter(status='SENDING', updated_at__lt=stale).update(status='QUEUED')
+
+    counts    = {'SENT': 0, 'RETRY': 0, 'FAILED': 0, 'CANCELLED': 0}
+    total     = Notification.objects.filter(status='QUEUED', next_attempt_at__lte=timezone.now()).count()
+    total     = min(total, limit) if limit is not None else total
+    throttles = {channel: Throttle(config.get('RATE', 0))
+                 for channel, config in settings.NOTIFICATION_CHANNELS.items()}
+    done      = 0
+    retry_at  = None
+    while done < total:
+        batch = claim_batch(min(batch_size, total - done))
+        if not batch:
+            break
+        now      = timezone.now()
+        backends = {}
+        try:
+            for notification in batch:
+                channel = notification.channel
+                if channel not in backends:
+                    try:
+                        backends[channel] = open_backend(channel)
+                    except Exception as e:
+#                         the gateway is down: this channel's messages retry, the others still go
+                        backends[channel] = e
+                outcome = deliver(notification, backends[channel], throttles.get(channel), now)
+                counts[outcome] += 1
+                if outcome == 'RETRY':
+                    retry_at = min(retry_at or notification.next_attempt_at, notification.next_attempt_at)
+        finally:
+            for backend in backends.values():
+                if backend is not None and not isinstance(backend, Exception):
+                    backend.close()
+            for notification in batch:
+                notification.updated_at = now
+#             a send that raised out of deliver leaves its message SENDING, requeued when stale
+            Notification.objects.bulk_update(batch, ['status', 'attempts', 'next_attempt_at', 'last_error',
+                                                     'provider_ref', 'sent_at', 'updated_at'])
+        done += len(batch)
+        if progress:
+            progress(done, total, f'{counts["SENT"]} sent, {counts["RETRY"]} to retry, '
+                                  f'{counts["FAILED"]} failed')
+#     nothing else would come back for the retries
+    if retry_at is not None:
+        schedule_send(run_after=retry_at)
+    return counts
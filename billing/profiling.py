@@ -0,0 +1,195 @@
+"""
+Profiling for the billing management commands.
+
+Commands built on ProfiledCommand accept:
+
+    --phases            print a per-phase time / query breakdown at the end
+    --profile [PREFIX]  --phases plus a cProfile run (PREFIX.pstats and the
+                        top functions by cumulative time) and sampled stacks
+                        in collapsed form (PREFIX.folded) for flamegraph.pl,
+                        speedscope or any flame-graph viewer
+
+Service functions mark their phases with @phased('name') or
+`with phase('name.step'):`. Outside a profiled run a phase costs one
+ContextVar lookup.
+"""
+import contextvars
+import cProfile
+import functools
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+_recorder = contextvars.ContextVar('billing_phase_recorder', default=None)
+_NO_PHASE = nullcontext()
+
+SAMPLE_INTERVAL = 0.002      # seconds between stack samples
+
+
+# ══════════════════════════════════════════════════════════
+#   Phases — inclusive wall time and query count per name
+# ══════════════════════════════════════════════════════════
+class PhaseRecorder:
+    def __init__(self):
+        self.stats   = defaultdict(lambda: [0, 0.0, 0])    # name → [calls, seconds, queries]
+        self.queries = 0
+        self.started = time.perf_counter()
+
+    def count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def report(self):
+        total   = time.perf_counter() - self.started
+        lines   = [f'{"Phase":<36}{"calls":>8}{"total s":>10}{"% run":>8}{"queries":>9}{"q/call":>8}']
+        for name in sorted(self.stats):
+            calls, seconds, queries = self.stats[name]
+            indent = '  ' * name.count('.')
+            lines.append(f'{indent + name:<36}{calls:>8}{seconds:>10.3f}{100 * seconds / total:>7.1f}%'
+                         f'{queries:>9}{queries / calls:>8.1f}')
+        lines.append(f'{"(whole run)":<36}{"":>8}{total:>10.3f}{100:>7.1f}%{self.queries:>9}')
+        return '\n'.join(lines)
+
+
+class _Phase:
+    __slots__ = ('name', 'recorder', 'start', 'queries')
+
+    def __init__(self, name, recorder):
+        self.name, self.recorder = name, recorder
+
+    def __enter__(self):
+        self.queries = self.recorder.queries
+        self.start   = time.perf_counter()
+
+    def __exit__(self, *exc):
+        stats = self.recorder.stats[self.name]
+        stats[0] += 1
+        stats[1] += time.perf_counter() - self.start
+        stats[2] += self.recorder.queries - self.queries
+
+
+def phase(name):
+    recorder = _recorder.get()
+    if recorder is None:
+        return _NO_PHASE
+    return _Phase(name, recorder)
+
+
+def phased(name):
+    """Decorator form of phase() for a whole function."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            recorder = _recorder.get()
+            if recorder is None:
+                return fn(*args, **kwargs)
+            with _Phase(name, recorder):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def recording_phases():
+    recorder = PhaseRecorder()
+    token    = _recorder.set(recorder)
+    try:
+        with connection.execute_wrapper(recorder.count_query):
+            yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+# ══════════════════════════════════════════════════════════
+#   StackSampler — collapsed stacks of one thread, for
+#   flame graphs ("frame;frame;frame count" per line)
+# ══════════════════════════════════════════════════════════
+class StackSampler:
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval  = interval
+        self.stacks    = Counter()
+        self._stop     = threading.Event()
+        self._thread   = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, fh):
+        for stack, count in self.stacks.most_common():
+            fh.write(f'{stack} {count}\n')
+
+
+# ══════════════════════════════════════════════════════════
+#   ProfiledCommand — BaseCommand with --phases / --profile
+# ══════════════════════════════════════════════════════════
+class ProfiledCommand(BaseCommand):
+    def create_parser(self, prog_name, subcommand, **kwargs):
+        parser = super().create_parser(prog_name, subcommand, **kwargs)
+        parser.add_argument('--phases',  action='store_true',
+                            help='Print a per-phase time and query breakdown at the end')
+        parser.add_argument('--profile', nargs='?', const=f'profile-{subcommand}', metavar='PREFIX',
+                            help='Also run under cProfile; writes PREFIX.pstats and PREFIX.folded '
+                                 f'(flame-graph stacks). Default PREFIX: profile-{subcommand}')
+        return parser
+
+    def execute(self, *args, **options):
+        prefix = options.get('profile')
+        if not (prefix or options.get('phases')):
+            return super().execute(*args, **options)
+
+        profiler = sampler = None
+        with recording_phases() as recorder:
+            if prefix:
+                sampler  = StackSampler(threading.get_ident())
+                profiler = cProfile.Profile()
+                sampler.start()
+                profiler.enable()
+            try:
+                output = super().execute(*args, **options)
+            finally:
+                if profiler:
+                    profiler.disable()
+                    sampler.stop()
+
+        self.stdout.write('')
+        self.stdout.write(recorder.report())
+        if profiler:
+            self.write_profile(prefix, profiler, sampler)
+        return output
+
+    def write_profile(self, prefix, profiler, sampler):
+        profiler.dump_stats(f'{prefix}.pstats')
+        with open(f'{prefix}.folded', 'w') as fh:
+            sampler.write(fh)
+
+        top = io.StringIO()
+        pstats.Stats(profiler, stream=top).strip_dirs().sort_stats('cumulative').print_stats(25)
+        self.stdout.write(top.getvalue())
+        self.stdout.write(self.style.SUCCESS(
+            f'Profile written to {prefix}.pstats and {prefix}.folded '
+            f'({sum(sampler.stacks.values())} stack samples).'
+        ))
@@ -0,0 +1,118 @@
+"""
+Monthly billing rollups: one MonthlyBillingSummary row per month ×
+barangay × classification, so the trends report reads a few thousand
+rows for many years instead of grouping the bill and ledger tables.
+
+    refresh_summaries()                  # months touched since the last refresh
+    refresh_months([date(2025, 3, 1)])   # these months, rebuilt
+
+Bill figures (volume, charges, discounts) are counted by billing month.
+Ledger figures (penalties, collections) are counted by entry date.
+Subscribers are grouped by their barangay and classification at refresh
+time.
+
+Refreshes are incremental. Every change that matters posts a ledger
+entry: a new bill, a payment, a penalty or an adjustment. The
+'rollups' HighWaterMark holds the last ledger id summarized, so a
+refresh rebuilds only the months of newer entries, plus the billing
+month of any bill they touch. Entries from the last minute
+(HighWaterMark.SETTLE_SECONDS) wait for the next refresh, so an entry
+still being committed under a lower id is not skipped. run_billing
+rebuilds the month it billed once billing is done; schedule
+refresh_summaries (e.g. nightly) to pick up the day's payments.
+"""
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Subscriber, Bill, Ledger, MonthlyBillingSummary, HighWaterMark
+from .services import month_range
+
+MARK = 'rollups'
+
+
+def month_start(d):
+    return date(d.year, d.month, 1)
+
+
+def dirty_months(after_id, up_to_id):
+    """Months of the ledger entries in (after_id, up_to_id], and the billing months they touch."""
+    entries = Ledger.objects.filter(id__gt=after_id, id__lte=up_to_id)
+    months  = {month_start(d) for d in
+               entries.annotate(month=TruncMonth('entry_date')).values_list('month', flat=True).distinct()}
+    months |= set(entries.filter(bill__isnull=False)
+                  .values_list('bill__billing_month', flat=True).distinct())
+    return {month_start(m) for m in months}
+
+
+def summarize(months):
+    """{(month, barangay, classification): fields} for `months`: one grouped query over the bills, two per month."""
+    rows  = defaultdict(dict)
+    group = ('subscriber__barangay', 'subscriber__classification')
+
+    for row in (Bill.objects.filter(billing_month__in=months)
+                .values('billing_month', *group)
+                .annotate(bills=Count('id'), billed_subscribers=Count('subscriber', distinct=True),
+                          volume=Sum('volume_consumed'), water_charges=Sum('basic_charge'),
+                          discounts=Sum('senior_discount'), other_charges=Sum('other_charges'))
+                .order_by()):
+        key = (month_start(row.pop('billing_month')), row.pop(group[0]), row.pop(group[1]))
+        rows[key].update(row)
+
+    for month in months:
+        start, end = month_range(month.year, month.month)
+        payments   = Q(entry_type='PAYMENT')
+        for row in (Ledger.objects.filter(entry_date__gte=start, entry_date__lt=end,
+                                          entry_type__in=['PAYMENT', 'PENALTY'])
+                    .values(*group)
+                    .annotate(collections=Sum('credit', filter=payments),
+                              payments=Count('id', filter=payments),
+                              paying_subscribers=Count('subscriber', distinct=True, filter=payments),
+                              penalties=Sum('debit', filter=Q(entry_type='PENALTY')))
+                    .order_by()):
+            rows[(month, row.pop(group[0]), row.pop(group[1]))].update(row)
+
+        for row in (Subscriber.objects.filter(connection_date__lt=end)
+                    .exclude(disconnection_date__lt=start)
+                    .values('barangay', 'classification').annotate(connections=Count('id'))
+                    .order_by()):
+            key = (month, row['barangay'], row['classification'])
+#             a barangay with no bills or payments that month gets no row
+            if key in rows:
+                rows[key]['connections'] = row['connections']
+    return rows
+
+
+@transaction.atomic
+def refresh_months(months):
+    """Rebuild the summary rows of `months`; returns the rows written."""
+    months = sorted({month_start(m) for m in months})
+    if not months:
+        return 0
+    summaries = [
+        MonthlyBillingSummary(month=month, barangay=barangay, classification=classification,
+                              **{k: v for k, v in fields.items() if v is not None})
+        for (month, barangay, classification), fields in summarize(months).items()
+    ]
+    MonthlyBillingSummary.objects.filter(month__in=months).delete()
+    MonthlyBillingSummary.objects.bulk_create(summaries, batch_size=1000)
+    return len(summaries)
+
+
+def refresh_summaries(full=False):
+    """Rebuild the months changed since the last refresh (every month with full=True); returns (months, rows)."""
+    with transaction.atomic():
+        mark, _ = HighWaterMark.objects.select_for_update().get_or_create(name=MARK)
+        up_to   = HighWaterMark.settled_ledger_id()
+        if full:
+            MonthlyBillingSummary.objects.all().delete()
+            months = dirty_months(0, up_to)
+        else:
+            months = dirty_months(mark.last_id, up_to)
+        rows = refresh_months(months)
+        mark.last_id = up_to
+        mark.save()
+    return len(months), rows
@@ -0,0 +1,62 @@
+"""
+Scratch databases for the benchmark_db, run_benchmarks and load_test commands.
+
+    result = run_worker('run_benchmarks', ['--repeat', '3'], 'Benchmark run')
+
+The parent command starts `manage.py <command> --worker ...` in a
+subprocess with DATABASE_NAME pointing at a scratch database, so a run
+never touches live data. The worker refuses to start without the
+BENCHMARK_SCRATCH flag the parent sets (require_scratch), and prints its
+results as one JSON line at the end of stdout. Progress goes to stderr.
+
+SQLite profiles get a file in a temporary directory, or `dataset` when
+given so a generated dataset can be kept and reused. The postgres
+profile needs BENCHMARK_POSTGRES_DB to name a scratch database. The
+notice cache and the notification outbox (e-mail included) go to the
+same temporary directory and are deleted with it, so a run never fills
+the live cache or messages real subscribers.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+SCRATCH_FLAG = 'BENCHMARK_SCRATCH'
+
+
+def run_worker(command, args, label, profile=None, dataset=None):
+    """Run `command --worker *args` on a scratch database; returns the JSON it printed."""
+    env = dict(os.environ, **{SCRATCH_FLAG: '1'})
+    if profile is not None:
+        env['DATABASE_PROFILE'] = profile
+    with tempfile.TemporaryDirectory() as tmp:
+        if env.get('DATABASE_PROFILE') == 'postgres':
+            if not env.get('BENCHMARK_POSTGRES_DB'):
+                raise CommandError(f'Set BENCHMARK_POSTGRES_DB to a scratch PostgreSQL '
+                                   f'database to run {command} on the postgres profile.')
+            env['DATABASE_NAME'] = env['BENCHMARK_POSTGRES_DB']
+        else:
+            env['DATABASE_NAME'] = dataset or str(Path(tmp) / f'{command}.sqlite3')
+#         prerendered notices and queued messages stay with the scratch run
+        env['NOTICE_CACHE_DIR']  = str(Path(tmp) / 'notices')
+        env['NOTIFY_OUTBOX_DIR'] = str(Path(tmp) / 'outbox')
+        env['EMAIL_BACKEND']     = 'django.core.mail.backends.filebased.EmailBackend'
+
+        proc = subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), command, '--worker', *args],
+            env=env, capture_output=True, text=True,
+        )
+    if proc.returncode != 0:
+        raise CommandError(f'{label} failed:\n{proc.stderr}')
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def require_scratch():
+    """Raise CommandError unless this process was started by run_worker."""
+    if os.environ.get(SCRATCH_FLAG) != '1':
+        raise CommandError('--worker only runs against a scratch database.')
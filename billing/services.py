@@ -1,7 +1,16 @@
-from decimal import Decimal
-from django.db.models import Sum
+import csv
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from django.db import IntegrityError, transaction
+from django.db.models import Sum, Avg, F, Q, OuterRef, Subquery
 from django.utils import timezone
-from .models import WaterRate, Bill, Ledger, DisconnectionNotice
+from .models import (
+    Subscriber, WaterRate, MeterReading,
+    Bill, Ledger, OtherCharge, DisconnectionNotice
+)
+from .cashiering import ensure_open
+from .profiling import phase, phased
+from .ticker import ticker
  
  
 # ══════════════════════════════════════════════════════════
@@ -21,11 +30,13 @@ def get_running_balance(subscriber):
 #   Args: subscriber object, volume (Decimal in cu.m)
 #   Returns: Decimal charge amount
 # ══════════════════════════════════════════════════════════
+@phased('compute_water_charge')
 def compute_water_charge(subscriber, volume):
-    rate = WaterRate.objects.filter(
-        classification = subscriber.classification,
-        is_active      = True
-    ).first()
+    with phase('compute_water_charge.rate_lookup'):
+        rate = WaterRate.objects.filter(
+            classification = subscriber.classification,
+            is_active      = True
+        ).first()
  
     if rate is None:
         raise ValueError(
@@ -34,6 +45,11 @@ def compute_water_charge(subscriber, volume):
             f'Add a rate in the admin panel under Water Rates.'
         )
  
+    return water_charge(rate, subscriber.is_senior, volume)
+ 
+ 
+def water_charge(rate, is_senior, volume):
+    """(charge, senior discount) for `volume` cu.m at `rate`; no queries."""
     volume = Decimal(str(volume))
  
 #     Below or at minimum volume → apply minimum charge
@@ -46,7 +62,7 @@ def compute_water_charge(subscriber, volume):
  
 #     Senior citizen discount: 20% off basic charge
     discount = Decimal('0.00')
-    if subscriber.is_senior:
+    if is_senior:
         discount = (charge * Decimal('0.20')).quantize(Decimal('0.01'))
         charge   = charge - discount
  
@@ -59,54 +75,58 @@ def compute_water_charge(subscriber, volume):
 #   Args: subscriber, meter_reading, due_date, cutoff_date
 #   Returns: Bill instance
 # ══════════════════════════════════════════════════════════
+@phased('generate_bill')
 def generate_bill(subscriber, meter_reading, due_date, cutoff_date, generated_by='System'):
     volume  = meter_reading.volume_consumed
     basic, discount = compute_water_charge(subscriber, volume)
  
 #     Sum all unpaid/partial/overdue bills as arrears
-    arrears_qs = Bill.objects.filter(
-        subscriber = subscriber,
-        status__in = ['UNPAID', 'PARTIAL', 'OVERDUE'],
-    )
-    arrears = arrears_qs.aggregate(Sum('balance'))['balance__sum'] or Decimal('0')
+    with phase('generate_bill.arrears'):
+        arrears_qs = Bill.objects.filter(
+            subscriber = subscriber,
+            status__in = ['UNPAID', 'PARTIAL', 'OVERDUE'],
+        )
+        arrears = arrears_qs.aggregate(Sum('balance'))['balance__sum'] or Decimal('0')
  
-#     Sum any unpaid other charges (materials, reconnection, etc.)
-    other_charges = subscriber.other_charges.filter(
-        is_paid=False
-    ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
+#     Sum any unpaid other charges not yet on a bill (materials, reconnection, etc.)
+    with phase('generate_bill.other_charges'):
+        pending_charges = subscriber.other_charges.filter(is_paid=False, bill__isnull=True)
+        other_charges = pending_charges.aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
  
     total = basic + arrears + other_charges
  
-    bill = Bill.objects.create(
-        subscriber       = subscriber,
-        meter_reading    = meter_reading,
-        billing_month    = meter_reading.billing_month,
-        due_date         = due_date,
-        cutoff_date      = cutoff_date,
-        volume_consumed  = volume,
-        basic_charge     = basic,
-        senior_discount  = discount,
-        other_charges    = other_charges,
-        arrears          = arrears,
-        total_amount_due = total,
-        balance          = total,
-        generated_by     = generated_by,
-    )
+    with phase('generate_bill.insert'):
+        bill = Bill.objects.create(
+            subscriber       = subscriber,
+            meter_reading    = meter_reading,
+            billing_month    = meter_reading.billing_month,
+            due_date         = due_date,
+            cutoff_date      = cutoff_date,
+            volume_consumed  = volume,
+            basic_charge     = basic,
+            senior_discount  = discount,
+            other_charges    = other_charges,
+            arrears          = arrears,
+            total_amount_due = total,
+            balance          = total,
+            generated_by     = generated_by,
+        )
  
-#     Mark other charges as attached to this bill
-    subscriber.other_charges.filter(is_paid=False).update(bill=bill)
+#         Mark other charges as attached to this bill
+        pending_charges.update(bill=bill)
  
 #     Post billing entry to the ledger
-    balance_before = get_running_balance(subscriber)
-    Ledger.objects.create(
-        subscriber      = subscriber,
-        bill            = bill,
-        entry_date      = bill.billing_month,
-        entry_type      = 'BILLING',
-        description     = f'Water Bill for {bill.billing_month:%B %Y}',
-        debit           = total,
-        running_balance = balance_before + total,
-    )
+    with phase('generate_bill.ledger'):
+        balance_before = get_running_balance(subscriber)
+        Ledger.objects.create(
+            subscriber      = subscriber,
+            bill            = bill,
+            entry_date      = bill.billing_month,
+            entry_type      = 'BILLING',
+            description     = f'Water Bill for {bill.billing_month:%B %Y}',
+            debit           = total,
+            running_balance = balance_before + total,
+        )
  
     return bill
  
@@ -114,40 +134,56 @@ def generate_bill(subscriber, meter_reading, due_date, cutoff_date, generated_by
 # ══════════════════════════════════════════════════════════
 #   FUNCTION 4 — process_payment
 #   Records a cash payment against a bill and posts to ledger
+#   (ValueError once the cashier has closed the day)
 # ══════════════════════════════════════════════════════════
+@phased('process_payment')
+@transaction.atomic
 def process_payment(bill, amount_paid, or_number, received_by, remarks=''):
     amount_paid = Decimal(str(amount_paid)).quantize(Decimal('0.01'))
+    was_overdue = bill.status == 'OVERDUE'
+    entry_date  = timezone.localdate()
+    ensure_open(entry_date, received_by)
  
     bill.amount_paid += amount_paid
-    bill.balance      = bill.total_amount_due - bill.amount_paid
- 
-    if bill.balance <= 0:
-        bill.balance = Decimal('0.00')
-        bill.status  = 'PAID'
-    elif bill.amount_paid > 0:
-        bill.status  = 'PARTIAL'
- 
-    bill.save()
- 
-    Ledger.objects.create(
-        subscriber      = bill.subscriber,
-        bill            = bill,
-        entry_date      = timezone.now().date(),
-        entry_type      = 'PAYMENT',
-        description     = f'Payment received — OR# {or_number}',
-        credit          = amount_paid,
-        running_balance = get_running_balance(bill.subscriber),
-        or_number       = or_number,
-        received_by     = received_by,
-    )
+    bill.balance, bill.status = settled(bill.total_amount_due, bill.amount_paid, bill.status)
+ 
+    with phase('process_payment.bill_update'):
+        bill.save()
+ 
+    with phase('process_payment.ledger'):
+        balance_before = get_running_balance(bill.subscriber)
+        entry = Ledger.objects.create(
+            subscriber      = bill.subscriber,
+            bill            = bill,
+            entry_date      = entry_date,
+            entry_type      = 'PAYMENT',
+            description     = f'Payment received — OR# {or_number}',
+            credit          = amount_paid,
+            running_balance = balance_before - amount_paid,
+            or_number       = or_number,
+            received_by     = received_by,
+        )
  
+#     live dashboard ticker; nothing is pushed if the payment rolls back
+    transaction.on_commit(lambda: ticker.payment_posted(entry, was_overdue))
     return bill
  
  
+def settled(total_amount_due, amount_paid, status):
+    """(balance, status) of a bill once `amount_paid` has been paid towards it in all."""
+    balance = total_amount_due - amount_paid
+    if balance <= 0:
+        return Decimal('0.00'), 'PAID'
+    if amount_paid > 0:
+        return balance, 'PARTIAL'
+    return balance, status
+ 
+ 
 # ══════════════════════════════════════════════════════════
 #   FUNCTION 5 — apply_penalty
 #   Applies a percentage penalty to an overdue bill
 # ══════════════════════════════════════════════════════════
+@phased('apply_penalty')
 def apply_penalty(bill, penalty_rate_pct=Decimal('10.00')):
     if bill.status not in ['UNPAID', 'PARTIAL']:
         return None  # Only apply to unpaid/partial bills
@@ -159,19 +195,23 @@ def apply_penalty(bill, penalty_rate_pct=Decimal('10.00')):
     bill.total_amount_due += penalty
     bill.balance          += penalty
     bill.status            = 'OVERDUE'
-    bill.save()
- 
-    Ledger.objects.create(
-        subscriber      = bill.subscriber,
-        bill            = bill,
-        entry_date      = timezone.now().date(),
-        entry_type      = 'PENALTY',
-        description     = (f'{penalty_rate_pct}% Late Penalty — '
-                           f'{bill.billing_month:%B %Y}'),
-        debit           = penalty,
-        running_balance = get_running_balance(bill.subscriber),
-    )
+    with phase('apply_penalty.bill_update'):
+        bill.save()
+ 
+    with phase('apply_penalty.ledger'):
+        balance_before = get_running_balance(bill.subscriber)
+        Ledger.objects.create(
+            subscriber      = bill.subscriber,
+            bill            = bill,
+            entry_date      = timezone.now().date(),
+            entry_type      = 'PENALTY',
+            description     = (f'{penalty_rate_pct}% Late Penalty — '
+                               f'{bill.billing_month:%B %Y}'),
+            debit           = penalty,
+            running_balance = balance_before + penalty,
+        )
  
+    transaction.on_commit(lambda: ticker.overdue_changed(+1))
     return bill
  
  
@@ -189,3 +229,420 @@ def issue_disconnection_notice(bill, cutoff_date, issued_by):
         status         = 'PENDING',
     )
     return notice
+
+
+# ══════════════════════════════════════════════════════════
+#   FUNCTION 7 — import_meter_readings
+#   Bulk-loads a route sheet of readings for one billing month
+#   Args: rows (iterable of dicts keyed by CSV header),
+#         billing_month (date, first day of month)
+#   Returns: dict with 'created' count and per-row 'errors'
+# ══════════════════════════════════════════════════════════
+READING_IMPORT_CHUNK = 500
+
+
+def import_meter_readings(rows, billing_month, reader_name='', chunk_size=READING_IMPORT_CHUNK):
+    report = {'created': 0, 'errors': [], 'rows': 0}
+    seen   = set()
+    chunk  = []
+
+    for row_no, row in enumerate(rows, start=2):     # row 1 is the CSV header
+        report['rows'] += 1
+        chunk.append((row_no, row))
+        if len(chunk) >= chunk_size:
+            _import_reading_chunk(chunk, billing_month, reader_name, seen, report)
+            chunk = []
+    if chunk:
+        _import_reading_chunk(chunk, billing_month, reader_name, seen, report)
+
+    return report
+
+
+def _field(row, key):
+    """A row value as stripped text; '' when missing. Synced rows carry numbers, CSV rows text."""
+    value = row.get(key)
+    return '' if value is None else str(value).strip()
+
+
+def _import_reading_chunk(chunk, billing_month, reader_name, seen, report):
+    def error(row_no, row, message):
+        report['errors'].append({'row': row_no, 'meter_number': _field(row, 'meter_number'),
+                                 'error': message, 'client_id': _field(row, 'client_id')})
+
+#     One query: subscribers in this chunk + their last reading before this month
+    meters = {_field(row, 'meter_number') for _, row in chunk}
+    last_reading = MeterReading.objects.filter(
+        subscriber     = OuterRef('pk'),
+        billing_month__lt = billing_month,
+    ).order_by('-billing_month')
+    subscribers = {
+        s.meter_number: s for s in Subscriber.objects.filter(
+            meter_number__in=meters
+        ).annotate(
+            last_reading   = Subquery(last_reading.values('current_reading')[:1]),
+            last_estimated = Subquery(last_reading.values('is_estimated')[:1]),
+        )
+    }
+
+#     One query: readings already on file for this month (unique_together key)
+    already_read = set(MeterReading.objects.filter(
+        billing_month     = billing_month,
+        subscriber__in    = [s.pk for s in subscribers.values()],
+    ).values_list('subscriber_id', flat=True))
+
+    to_create = []
+    for row_no, row in chunk:
+        meter = _field(row, 'meter_number')
+        sub   = subscribers.get(meter)
+        if sub is None:
+            error(row_no, row, 'Unknown meter number.')
+            continue
+        if sub.pk in already_read:
+            error(row_no, row, f'A reading already exists for {billing_month:%B %Y}.')
+            continue
+        if sub.pk in seen:
+            error(row_no, row, 'Meter appears more than once in this upload.')
+            continue
+
+        try:
+            current = Decimal(_field(row, 'current_reading'))
+            prev_raw = _field(row, 'previous_reading')
+            if prev_raw:
+                previous = Decimal(prev_raw)
+            else:
+                previous = sub.last_reading if sub.last_reading is not None else Decimal('0')
+            if not (current.is_finite() and previous.is_finite()):
+                raise InvalidOperation
+        except InvalidOperation:
+            error(row_no, row, 'Reading is not a valid number.')
+            continue
+
+        if current < previous and not (sub.last_estimated and previous == sub.last_reading):
+            error(row_no, row,
+                  f'Current reading {current} is less than previous reading {previous}.')
+            continue
+
+        reading_date = _field(row, 'reading_date')
+        try:
+            reading_date = date.fromisoformat(reading_date) if reading_date else timezone.now().date()
+        except ValueError:
+            error(row_no, row, f'Invalid reading date: {reading_date}.')
+            continue
+
+        seen.add(sub.pk)
+        to_create.append((row_no, row, MeterReading(
+            subscriber       = sub,
+            billing_month    = billing_month,
+            reading_date     = reading_date,
+            previous_reading = previous,
+            current_reading  = current,
+            reader_name      = _field(row, 'reader_name') or reader_name.strip(),
+            remarks          = _field(row, 'remarks'),
+            client_id        = _field(row, 'client_id') or None,
+        )))
+
+    readings = [reading for _, _, reading in to_create]
+    try:
+        with transaction.atomic():
+            MeterReading.objects.bulk_create(readings)
+            reconcile_estimated_readings(readings)
+            refresh_latest_readings([r.subscriber_id for r in readings])
+    except IntegrityError:
+#         another upload saved some of these meters since they were checked: go row by row
+        readings = []
+        for row_no, row, reading in to_create:
+            try:
+                with transaction.atomic():
+                    MeterReading.objects.bulk_create([reading])
+            except IntegrityError:
+                error(row_no, row, f'A reading already exists for {billing_month:%B %Y}.')
+            else:
+                readings.append(reading)
+        with transaction.atomic():
+            reconcile_estimated_readings(readings)
+            refresh_latest_readings([r.subscriber_id for r in readings])
+    report['created'] += len(readings)
+
+
+# ══════════════════════════════════════════════════════════
+#   FUNCTION 8 — refresh_latest_readings
+#   Re-points Subscriber.latest_reading in one UPDATE
+#   (used after bulk inserts, which skip MeterReading.save,
+#   and after deletes, which leave the pointer null)
+# ══════════════════════════════════════════════════════════
+def refresh_latest_readings(subscriber_ids=None):
+    latest = MeterReading.objects.filter(
+        subscriber=OuterRef('pk')
+    ).order_by('-billing_month').values('pk')[:1]
+    qs = Subscriber.objects.all()
+    if subscriber_ids is not None:
+        qs = qs.filter(pk__in=subscriber_ids)
+    return qs.update(latest_reading=Subquery(latest))
+
+
+def reading_deleted(sender, instance, **kwargs):
+    """post_delete of a MeterReading: SET_NULL cleared the pointer if it was the latest; re-point it."""
+    refresh_latest_readings([instance.subscriber_id])
+
+
+# ══════════════════════════════════════════════════════════
+#   FUNCTION 9 — build_route_book
+#   Reading sheet rows for one barangay route, in one query:
+#   meter number, previous reading and average consumption
+# ══════════════════════════════════════════════════════════
+ROUTE_BOOK_AVERAGE_MONTHS = 6
+
+
+def months_before(month, months):
+    y, m = divmod(month.year * 12 + month.month - 1 - months, 12)
+    return date(y, m + 1, 1)
+
+
+def month_range(year, month):
+    """First day of the month and first day of the next, for index-friendly range filters."""
+    start = date(year, month, 1)
+    return start, months_before(start, -1)
+
+
+def build_route_book(barangay, billing_month, months=ROUTE_BOOK_AVERAGE_MONTHS):
+    since = months_before(billing_month, months)
+    return Subscriber.objects.filter(
+        barangay = barangay,
+        status   = 'ACTIVE',
+    ).select_related('latest_reading').annotate(
+        avg_consumption = Avg(
+            F('meter_readings__current_reading') - F('meter_readings__previous_reading'),
+            filter = Q(meter_readings__billing_month__gte=since,
+                       meter_readings__billing_month__lt=billing_month),
+        ),
+    ).order_by('account_number')
+
+
+# ══════════════════════════════════════════════════════════
+#   FUNCTION 10 — write_route_book_csv
+#   Writes route book rows in the column layout that
+#   import_meter_readings accepts back once filled in
+# ══════════════════════════════════════════════════════════
+ROUTE_BOOK_HEADER = ['account_number', 'name', 'service_address', 'meter_number',
+                     'meter_size', 'previous_reading', 'previous_month',
+                     'avg_consumption', 'current_reading', 'reading_date', 'remarks']
+
+
+def write_route_book_csv(fh, rows):
+    writer = csv.writer(fh)
+    writer.writerow(ROUTE_BOOK_HEADER)
+    for sub in rows:
+        last = sub.latest_reading
+        writer.writerow([
+            sub.account_number, sub.full_name(), sub.service_address, sub.meter_number,
+            sub.meter_size,
+            last.current_reading if last else '',
+            f'{last.billing_month:%Y-%m}' if last else '',
+            f'{sub.avg_consumption:.2f}' if sub.avg_consumption is not None else '',
+            '', '', '',
+        ])
+
+
+# ══════════════════════════════════════════════════════════
+#   FUNCTION 11 — build_sync_package
+#   Compact route package for offline handheld readers.
+#   Rows are column lists (one header per table) so the JSON
+#   stays small and compresses well. With `since` set, only
+#   subscribers changed or re-read after that time are sent.
+# ══════════════════════════════════════════════════════════
+SYNC_SUBSCRIBER_FIELDS = ['id', 'account_number', 'name', 'meter_number', 'service_address',
+                          'classification', 'status', 'is_senior',
+                          'last_month', 'last_reading']
+SYNC_RATE_FIELDS       = ['classification', 'minimum_charge', 'minimum_volume',
+                          'rate_per_cubic_m']
+
+
+def build_sync_package(barangay, since=None):
+    subscribers = Subscriber.objects.filter(barangay=barangay).select_related('latest_reading')
+    if since is None:
+        subscribers = subscribers.filter(status='ACTIVE')
+    else:
+        subscribers = subscribers.filter(
+            Q(updated_at__gt=since) | Q(latest_reading__created_at__gt=since))
+
+    rows = []
+    for sub in subscribers.order_by('account_number'):
+        last = sub.latest_reading
+        rows.append([
+            sub.pk, sub.account_number, sub.full_name(), sub.meter_number, sub.service_address,
+            sub.classification, sub.status, sub.is_senior,
+            last.billing_month if last else None,
+            last.current_reading if last else None,
+        ])
+
+    rates = WaterRate.objects.filter(is_active=True).order_by('classification', '-effective_date')
+    return {
+        'full':        since is None,
+        'subscribers': {'fields': SYNC_SUBSCRIBER_FIELDS, 'rows': rows},
+        'rates':       {'fields': SYNC_RATE_FIELDS,
+                        'rows': [[getattr(r, f) for f in SYNC_RATE_FIELDS] for r in rates]},
+    }
+
+
+# ══════════════════════════════════════════════════════════
+#   FUNCTION 12 — accept_synced_readings
+#   Stores a device's batch of readings. Each reading carries
+#   a client-generated `client_id`, so re-sending a batch after
+#   a dropped connection never creates duplicates.
+#   Returns: dict with 'accepted' client IDs and 'rejected' rows
+# ══════════════════════════════════════════════════════════
+def accept_synced_readings(readings, reader_name=''):
+    result    = {'accepted': [], 'rejected': []}
+    by_month  = {}
+    batch_ids = set()
+
+#     Devices may send ids as numbers; they are stored (and matched) as text
+    readings = [{**r, 'client_id': _field(r, 'client_id')} for r in readings]
+    ids = [r['client_id'] for r in readings if r['client_id']]
+    already_synced = set(MeterReading.objects.filter(
+        client_id__in=ids).values_list('client_id', flat=True))
+
+    for r in readings:
+        client_id = r['client_id']
+        if not client_id:
+            result['rejected'].append({'client_id': '', 'error': 'Missing client_id.'})
+            continue
+        if client_id in batch_ids:          # repeated within this batch: count once
+            continue
+        batch_ids.add(client_id)
+        if client_id in already_synced:
+            result['accepted'].append(client_id)
+            continue
+        try:
+            billing_month = date.fromisoformat(str(r.get('billing_month'))).replace(day=1)
+        except ValueError:
+            result['rejected'].append({'client_id': client_id, 'error': 'Invalid billing_month.'})
+            continue
+        by_month.setdefault(billing_month, []).append(r)
+
+    for billing_month, rows in sorted(by_month.items()):
+        report   = import_meter_readings(rows, billing_month, reader_name=reader_name)
+        rejected = {e['client_id'] for e in report['errors']}
+        result['rejected'] += [{'client_id': e['client_id'], 'error': e['error']}
+                               for e in report['errors']]
+        result['accepted'] += [r['client_id'] for r in rows if r['client_id'] not in rejected]
+
+    return result
+
+
+# ══════════════════════════════════════════════════════════
+#   FUNCTION 13 — estimate_unread_readings
+#   Creates estimated readings for every ACTIVE subscriber with
+#   no reading this month: previous register + average actual
+#   consumption over the trailing months. One query finds the
+#   unread accounts with their averages, one bulk insert stores
+#   the estimates; run_billing then bills them like any other.
+# ══════════════════════════════════════════════════════════
+ESTIMATE_AVERAGE_MONTHS = 3
+
+
+def estimate_unread_readings(billing_month, months=ESTIMATE_AVERAGE_MONTHS,
+                             reader_name='Estimated'):
+    since = months_before(billing_month, months)
+    last_reading = MeterReading.objects.filter(
+        subscriber        = OuterRef('pk'),
+        billing_month__lt = billing_month,
+    ).order_by('-billing_month').values('current_reading')[:1]
+
+    unread = Subscriber.objects.filter(
+        status = 'ACTIVE',
+    ).exclude(
+        pk__in = MeterReading.objects.filter(
+            billing_month=billing_month).values('subscriber_id'),
+    ).annotate(
+        last_reading    = Subquery(last_reading),
+        avg_consumption = Avg(
+            F('meter_readings__current_reading') - F('meter_readings__previous_reading'),
+            filter = Q(meter_readings__billing_month__gte=since,
+                       meter_readings__billing_month__lt=billing_month,
+                       meter_readings__is_estimated=False),
+        ),
+    ).values_list('pk', 'last_reading', 'avg_consumption')
+
+    to_create, skipped = [], 0
+    for sub_id, last, avg in unread:
+        if last is None:                    # never read: no register to estimate from
+            skipped += 1
+            continue
+        estimate = Decimal(str(avg or 0)).quantize(Decimal('0.01'))
+        to_create.append(MeterReading(
+            subscriber_id    = sub_id,
+            billing_month    = billing_month,
+            reading_date     = timezone.now().date(),
+            previous_reading = last,
+            current_reading  = last + estimate,
+            reader_name      = reader_name,
+            remarks          = f'Estimated: average of last {months} months (meter not read)',
+            is_estimated     = True,
+        ))
+
+    with transaction.atomic():
+        MeterReading.objects.bulk_create(to_create)
+        refresh_latest_readings([r.subscriber_id for r in to_create])
+    return {'estimated': len(to_create), 'skipped': skipped}
+
+
+# ══════════════════════════════════════════════════════════
+#   FUNCTION 14 — reconcile_estimated_readings
+#   Settles over-estimates when the next actual reading comes
+#   in below the estimated register. Under-estimates settle on
+#   their own (the actual reading bills the shortfall); for an
+#   over-estimate this month's consumption becomes zero and the
+#   over-billed charge is credited as a negative OtherCharge,
+#   which generate_bill deducts from the next bill. Only billed
+#   estimates are credited; an estimate never billed still takes
+#   its share of the over-estimate but charged nothing to give back.
+#   Args: newly saved actual MeterReading instances
+# ══════════════════════════════════════════════════════════
+def reconcile_estimated_readings(readings):
+    over = [r for r in readings
+            if not r.is_estimated and r.current_reading < r.previous_reading]
+    if not over:
+        return []
+
+#     One query: the readings before each of these, newest first
+    history = {}
+    for past in MeterReading.objects.filter(
+        subscriber__in = [r.subscriber_id for r in over],
+        billing_month__lt = max(r.billing_month for r in over),
+    ).select_related('subscriber', 'bill').order_by('subscriber_id', '-billing_month'):
+        history.setdefault(past.subscriber_id, []).append(past)
+
+    credits = []
+    for reading in over:
+        remaining = reading.previous_reading - reading.current_reading
+        reading.remarks = (f'{reading.remarks} ' if reading.remarks else '') + \
+            f'[Reconciled {remaining} cu.m over-estimate]'
+        reading.previous_reading = reading.current_reading
+
+        credit = Decimal('0.00')
+        for est in history.get(reading.subscriber_id, []):
+            if est.billing_month >= reading.billing_month:
+                continue
+            if not est.is_estimated or remaining <= 0:
+                break
+            take = min(remaining, est.volume_consumed)
+            if hasattr(est, 'bill'):
+                billed, _ = compute_water_charge(est.subscriber, est.volume_consumed)
+                actual, _ = compute_water_charge(est.subscriber, est.volume_consumed - take)
+                credit   += billed - actual
+            remaining -= take
+
+        if credit > 0:
+            credits.append(OtherCharge(
+                subscriber_id = reading.subscriber_id,
+                charge_type   = 'ESTIMATE_ADJ',
+                description   = f'Credit for over-estimated consumption before {reading.billing_month:%B %Y}',
+                amount        = -credit,
+                applied_by    = 'System',
+            ))
+
+    with transaction.atomic():
+        MeterReading.objects.bulk_update(over, ['previous_reading', 'remarks'])
+        OtherCharge.objects.bulk_create(credits)
+    return credits
@@ -0,0 +1,266 @@
+"""
+Columnar analytics snapshots, written by the export_snapshot command.
+
+Layout under the snapshot directory (hive-style partitions, so
+pyarrow.dataset, DuckDB and Polars read the tree as one table):
+
+    subscribers/part-<stamp>.<ext>                      full copy every run
+    meter_readings/billing_month=YYYY-MM-01/part-<stamp>.<ext>
+    bills/billing_month=YYYY-MM-01/part-<stamp>.<ext>
+    ledger/entry_month=YYYY-MM-01/part-<stamp>.<ext>    one part per run
+    _snapshot.json                                      high-water marks
+
+Runs are incremental. Ledger entries are append-only, so each run adds
+one part per month holding the entries past the last exported id. The
+stored running_balance is left out: update_running_balances and
+verify_ledger --fix rewrite it in place, so an exported copy would go
+stale. Take a running sum of debit - credit per subscriber instead.
+Bills change after insert (payments, penalties), so every month with a
+new bill or one updated since the last run is written again whole and
+replaces that month's older parts. A reading month is written again only when a
+new reading arrives; MeterReading has no updated_at, so a reading
+corrected in place, like a deleted row, reaches the snapshot on the next
+--full run.
+
+Rows are streamed with .iterator() and written BATCH_ROWS at a time, so
+memory stays flat however large the tables are. pyarrow is optional for
+the rest of the app: pip install pyarrow to export or read snapshots.
+"""
+import json
+import shutil
+from pathlib import Path
+
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import Subscriber, MeterReading, Bill, Ledger
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+BATCH_ROWS = 50_000
+MANIFEST   = '_snapshot.json'
+FORMATS    = {'parquet': 'parquet', 'arrow': 'arrow'}      # --format → file extension
+
+#   table: (model, partition column, columns)
+#   Subscriber names and contact details stay out of the analytics copy.
+TABLES = {
+    'subscribers': (Subscriber, None, [
+        'id', 'account_number', 'barangay', 'classification', 'status', 'meter_size',
+        'is_senior', 'monthly_minimum', 'connection_date', 'disconnection_date',
+        'created_at', 'updated_at',
+    ]),
+    'meter_readings': (MeterReading, 'billing_month', [
+        'id', 'subscriber_id', 'billing_month', 'reading_date', 'previous_reading',
+        'current_reading', 'is_estimated', 'created_at',
+    ]),
+    'bills': (Bill, 'billing_month', [
+        'id', 'subscriber_id', 'meter_reading_id', 'billing_month', 'due_date', 'cutoff_date',
+        'volume_consumed', 'basic_charge', 'senior_discount', 'other_charges', 'penalty_amount',
+        'arrears', 'total_amount_due', 'amount_paid', 'balance', 'status',
+        'created_at', 'updated_at',
+    ]),
+    'ledger': (Ledger, 'entry_month', [
+        'id', 'subscriber_id', 'bill_id', 'entry_date', 'entry_type', 'debit', 'credit',
+        'or_number', 'created_at',
+    ]),
+}
+
+
+def arrow_type(field):
+    kind = field.get_internal_type()
+    if kind == 'DecimalField':
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if kind == 'DateField':
+        return pa.date32()
+    if kind == 'DateTimeField':
+        return pa.timestamp('us', tz='UTC')
+    if kind == 'BooleanField':
+        return pa.bool_()
+    if kind in ('AutoField', 'BigAutoField', 'ForeignKey', 'OneToOneField', 'IntegerField'):
+        return pa.int64()
+    return pa.string()
+
+
+def table_schema(name):
+    """Columns stored in the part files; the partition column lives in the directory name."""
+    model, key, columns = TABLES[name]
+    fields = {f.attname: f for f in model._meta.concrete_fields}
+    return pa.schema([pa.field(col, arrow_type(fields[col])) for col in columns if col != key])
+
+
+# ══════════════════════════════════════════════════════════
+#   PartWriter — one part file, written to a temp name and
+#   moved into place on close so readers never see half a file
+# ══════════════════════════════════════════════════════════
+class PartWriter:
+    def __init__(self, directory, schema, fmt, stamp):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.path      = directory / f'part-{stamp}.{FORMATS[fmt]}'
+        self.tmp       = directory / f'.part-{stamp}.tmp'
+        self.rows      = 0
+        if fmt == 'parquet':
+            self.writer = pq.ParquetWriter(self.tmp, schema, compression='zstd')
+        else:
+            self.writer = pa.ipc.new_file(self.tmp, schema,
+                                          options=pa.ipc.IpcWriteOptions(compression='zstd'))
+
+    def write(self, batch):
+        self.writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def close(self, replace=False):
+        """Publish the part; replace=True drops the directory's older parts."""
+        self.writer.close()
+        self.tmp.replace(self.path)
+        if replace:
+            for old in self.directory.glob('part-*'):
+                if old != self.path:
+                    old.unlink()
+
+
+def stream_batches(queryset, schema, partition_of, batch_rows):
+    """(partition key, RecordBatch) pairs; the queryset must be ordered by partition."""
+    columns = schema.names
+    current, rows = None, []
+    for row in queryset.values_list(*columns).iterator(chunk_size=batch_rows):
+        key = partition_of(row)
+        if rows and (key != current or len(rows) >= batch_rows):
+            yield current, pa.RecordBatch.from_pylist([dict(zip(columns, r)) for r in rows], schema)
+            rows = []
+        current = key
+        rows.append(row)
+    if rows:
+        yield current, pa.RecordBatch.from_pylist([dict(zip(columns, r)) for r in rows], schema)
+
+
+# ══════════════════════════════════════════════════════════
+#   Snapshot — one export run against the live database
+# ══════════════════════════════════════════════════════════
+class Snapshot:
+    def __init__(self, root, fmt='parquet', full=False, batch_rows=BATCH_ROWS):
+        self.root       = Path(root)
+        self.fmt        = fmt
+        self.batch_rows = batch_rows
+        self.started    = timezone.now()
+        self.stamp      = f'{self.started:%Y%m%dT%H%M%S%f}'
+        self.manifest   = {} if full else read_manifest(self.root)
+        if self.manifest and self.manifest['format'] != fmt:
+            raise ValueError(f'{self.root} holds a {self.manifest["format"]} snapshot; '
+                             f'export {fmt} into another directory or run a full export')
+        if full:
+            for name in TABLES:
+                shutil.rmtree(self.root / name, ignore_errors=True)
+
+    def run(self):
+        """Export everything changed since the last run; returns rows written per table."""
+        marks = self.manifest.get('tables', {})
+#         fixed at the start, so rows inserted mid-export wait for the next run
+        self.last_ids = {name: TABLES[name][0].objects.aggregate(m=Max('id'))['m'] or 0
+                         for name in ('meter_readings', 'bills', 'ledger')}
+        written = {
+            'subscribers':    self.export_subscribers(),
+            'meter_readings': self.export_months('meter_readings', marks.get('meter_readings', {})),
+            'bills':          self.export_months('bills', marks.get('bills', {})),
+            'ledger':         self.export_ledger(marks.get('ledger', {})),
+        }
+        self.write_manifest()
+        return written
+
+    def export_subscribers(self):
+        schema = table_schema('subscribers')
+        writer = PartWriter(self.root / 'subscribers', schema, self.fmt, self.stamp)
+        for _, batch in stream_batches(Subscriber.objects.order_by('id'), schema,
+                                       lambda row: None, self.batch_rows):
+            writer.write(batch)
+        writer.close(replace=True)
+        return writer.rows
+
+    def export_months(self, name, mark):
+        """Rewrite every billing month holding a new reading or a bill changed since the last run."""
+        model, key, _ = TABLES[name]
+        changed = Q(id__gt=mark.get('last_id', 0))
+        if mark.get('taken_at') and name == 'bills':
+            changed |= Q(updated_at__gte=mark['taken_at'])
+        months = sorted(model.objects.filter(changed).order_by()
+                        .values_list(key, flat=True).distinct())
+        schema = table_schema(name)
+        rows   = 0
+        for month in months:
+            rows += self.write_partitions(
+                name, schema, model.objects.filter(**{key: month}).order_by('id'),
+                lambda row, month=month: month, replace=True)
+        return rows
+
+    def export_ledger(self, mark):
+        """Append the entries added since the last run, one part per entry month."""
+        schema  = table_schema('ledger')
+        date_i  = schema.names.index('entry_date')
+        entries = (Ledger.objects.filter(id__gt=mark.get('last_id', 0), id__lte=self.last_ids['ledger'])
+                   .order_by('entry_date', 'id'))
+        return self.write_partitions('ledger', schema, entries,
+                                     lambda row: row[date_i].replace(day=1), replace=False)
+
+    def write_partitions(self, name, schema, queryset, partition_of, replace):
+        _, key, _ = TABLES[name]
+        writer, current, rows = None, None, 0
+        for month, batch in stream_batches(queryset, schema, partition_of, self.batch_rows):
+            if writer is None or month != current:
+                if writer:
+                    writer.close(replace)
+                writer  = PartWriter(self.root / name / f'{key}={month:%Y-%m-%d}',
+                                     schema, self.fmt, self.stamp)
+                current = month
+            writer.write(batch)
+            rows += batch.num_rows
+        if writer:
+            writer.close(replace)
+        return rows
+
+    def write_manifest(self):
+        self.manifest = {
+            'format':   self.fmt,
+            'taken_at': self.started.isoformat(),
+            'tables':   {name: {'last_id': last_id, 'taken_at': self.started.isoformat()}
+                         for name, last_id in self.last_ids.items()},
+        }
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f'{MANIFEST}.tmp'
+        tmp.write_text(json.dumps(self.manifest, indent=2) + '\n')
+        tmp.replace(self.root / MANIFEST)
+
+
+def read_manifest(root):
+    path = Path(root) / MANIFEST
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+# ══════════════════════════════════════════════════════════
+#   Off-line reads — never touch the live database
+# ══════════════════════════════════════════════════════════
+def open_table(root, name):
+    """
+    A pyarrow Dataset over one snapshot table, memory-mapped. Filter and
+    project before materializing, e.g.
+
+        bills = open_table('snapshots', 'bills')
+        bills.to_table(columns=['subscriber_id', 'balance'],
+                       filter=ds.field('billing_month') >= date(2025, 1, 1))
+    """
+    manifest = read_manifest(root)
+    if not manifest:
+        raise FileNotFoundError(f'No snapshot in {root}; run export_snapshot first')
+    _, key, _ = TABLES[name]
+    return ds.dataset(
+        Path(root) / name,
+        format       = 'ipc' if manifest['format'] == 'arrow' else 'parquet',
+        partitioning = ds.partitioning(pa.schema([(key, pa.date32())]), flavor='hive') if key else None,
+        filesystem   = pyarrow.fs.LocalFileSystem(use_mmap=True),
+        exclude_invalid_files = True,
+    )
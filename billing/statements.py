@@ -0,0 +1,207 @@
+"""
+Statements of account: opening balance, the transactions of a date range,
+closing balance and aging, for one subscriber or for every subscriber.
+
+    for statement in build_statements(date(2025, 1, 1), date(2025, 12, 31)):
+        ...
+
+The batch is two streamed queries, whatever the number of accounts:
+subscribers ordered by id, each annotated with the balance brought
+forward, and ledger entries ordered by subscriber, date and posting
+order (the ledger_sub_date_idx order). The two streams are merged
+like a sort-merge join, so only one subscriber's entries are in memory
+at a time.
+
+Aging spreads the closing balance over the charges that make it up,
+newest first, because payments settle the oldest charges. Each charge
+is aged by its posting date at the end of the range. To date charges
+back to AGING_DAYS, the entry stream starts that many days before the
+range when the range is shorter. Those earlier entries count toward
+aging only and are not listed.
+
+write_statements (the statements command) writes the batch as one CSV or
+printable HTML file per barangay.
+"""
+import csv
+from datetime import timedelta
+from decimal import Decimal
+from functools import cached_property
+from pathlib import Path
+
+from django.db.models import DecimalField, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.template.loader import render_to_string
+from django.utils.text import slugify
+
+from .models import Subscriber, Ledger
+
+ZERO        = Decimal('0.00')
+CHUNK       = 2_000
+AGING_DAYS  = 90
+AGING_BANDS = [(30, 'current'), (60, 'days_31_60'), (90, 'days_61_90'), (None, 'over_90')]
+FORMATS     = ('csv', 'html')
+
+CSV_HEADER  = ['account_number', 'name', 'barangay', 'line', 'date', 'description', 'or_number',
+               'debit', 'credit', 'balance'] + [name for _, name in AGING_BANDS]
+
+
+class Statement:
+    def __init__(self, subscriber, start, end):
+        self.subscriber = subscriber
+        self.start      = start
+        self.end        = end
+        self.opening    = subscriber.opening or ZERO
+        self.entries    = []                     # (entry, balance after it), inside the range
+        self.charges    = []                     # (entry_date, debit), for aging
+        self.closing    = self.opening
+        self.debits     = ZERO
+        self.credits    = ZERO
+
+    def add(self, entry):
+        if entry.debit:
+            self.charges.append((entry.entry_date, entry.debit))
+        if entry.entry_date < self.start:
+            return
+        self.closing += entry.debit - entry.credit
+        self.debits  += entry.debit
+        self.credits += entry.credit
+        self.entries.append((entry, self.closing))
+
+    @cached_property
+    def aging(self):
+        """Closing balance by age of the unpaid charges: {band: amount}."""
+        bands  = {name: ZERO for _, name in AGING_BANDS}
+        unpaid = self.closing
+        for entry_date, debit in reversed(self.charges):
+            if unpaid <= 0:
+                break
+            amount = min(debit, unpaid)
+            unpaid -= amount
+            bands[age_band((self.end - entry_date).days)] += amount
+#         older than the entry stream reaches back
+        if unpaid > 0:
+            bands[AGING_BANDS[-1][1]] += unpaid
+        return bands
+
+    @property
+    def is_empty(self):
+        return not self.entries and not self.opening and not self.closing
+
+
+def age_band(days):
+    for limit, name in AGING_BANDS:
+        if limit is None or days <= limit:
+            return name
+
+
+# ══════════════════════════════════════════════════════════
+#   build_statements — one streaming pass over subscribers
+#   and the ledger, merged on subscriber id
+# ══════════════════════════════════════════════════════════
+def build_statements(start, end, subscribers=None, include_empty=False):
+    """
+    Statements for `start`–`end` (inclusive), one per subscriber in id order.
+    `subscribers` narrows the batch (a Subscriber queryset). Accounts with no
+    balance and no activity in the range are skipped unless include_empty.
+    """
+    entries = Ledger.objects.all()
+    if subscribers is None:
+        subscribers = Subscriber.objects.all()
+    else:
+        entries = entries.filter(subscriber__in=subscribers.values('id'))
+    brought_forward = Coalesce(
+        Sum(F('ledger_entries__debit') - F('ledger_entries__credit'),
+            filter=Q(ledger_entries__entry_date__lt=start)),
+        ZERO, output_field=DecimalField(max_digits=12, decimal_places=2))
+    accounts = (subscribers.annotate(opening=brought_forward)
+                .only('account_number', 'last_name', 'first_name', 'middle_name', 'address', 'barangay')
+                .order_by('id').iterator(chunk_size=CHUNK))
+
+    aging_from = min(start, end - timedelta(days=AGING_DAYS))
+    entries = iter(entries.filter(entry_date__gte=aging_from, entry_date__lte=end)
+                   .only('subscriber_id', 'entry_date', 'entry_type', 'description',
+                         'debit', 'credit', 'or_number')
+                   .order_by('subscriber_id', 'entry_date', 'created_at', 'id')
+                   .iterator(chunk_size=CHUNK))
+    entry = next(entries, None)
+
+    for subscriber in accounts:
+        statement = Statement(subscriber, start, end)
+        while entry is not None and entry.subscriber_id <= subscriber.pk:
+            if entry.subscriber_id == subscriber.pk:
+                statement.add(entry)
+            entry = next(entries, None)
+        if include_empty or not statement.is_empty:
+            yield statement
+
+
+# ══════════════════════════════════════════════════════════
+#   Writing — one file per barangay, opened on its first
+#   statement, so the batch stays one pass in id order
+# ══════════════════════════════════════════════════════════
+class BarangayFiles:
+    def __init__(self, root, fmt, start, end):
+        self.root  = Path(root)
+        self.fmt   = fmt
+        self.start = start
+        self.end   = end
+        self.files = {}                          # barangay → [file, statement count]
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, barangay):
+        return self.root / f'statements-{slugify(barangay)}-{self.start:%Y%m%d}-{self.end:%Y%m%d}.{self.fmt}'
+
+    def write(self, statement):
+        barangay = statement.subscriber.barangay
+        if barangay not in self.files:
+            fh = open(self.path(barangay), 'w', newline='', encoding='utf-8')
+            if self.fmt == 'csv':
+                csv.writer(fh).writerow(CSV_HEADER)
+            else:
+                fh.write(render_to_string('billing/statement_head.html',
+                                          {'start': self.start, 'end': self.end, 'title': barangay}))
+            self.files[barangay] = [fh, 0]
+        fh = self.files[barangay][0]
+        if self.fmt == 'csv':
+            write_statement_csv(fh, statement)
+        else:
+            fh.write(render_to_string('billing/statement_page.html', {'s': statement}))
+        self.files[barangay][1] += 1
+
+    def close(self):
+        """{path: statements written}"""
+        written = {}
+        for barangay, (fh, count) in self.files.items():
+            if self.fmt == 'html':
+                fh.write('</body>\n</html>\n')
+            fh.close()
+            written[self.path(barangay)] = count
+        return written
+
+
+def write_statement_csv(fh, statement):
+    sub    = statement.subscriber
+    writer = csv.writer(fh)
+    who    = [sub.account_number, sub.full_name(), sub.barangay]
+    writer.writerow(who + ['OPENING', f'{statement.start:%Y-%m-%d}', 'Balance brought forward',
+                           '', '', '', statement.opening])
+    for entry, balance in statement.entries:
+        writer.writerow(who + [entry.entry_type, f'{entry.entry_date:%Y-%m-%d}', entry.description,
+                               entry.or_number, entry.debit, entry.credit, balance])
+    writer.writerow(who + ['CLOSING', f'{statement.end:%Y-%m-%d}', 'Balance due',
+                           '', statement.debits, statement.credits, statement.closing]
+                    + list(statement.aging.values()))
+
+
+def write_statements(root, start, end, fmt='csv', subscribers=None, include_empty=False, progress=None):
+    """Write the batch under `root`; returns {path: statements written}."""
+    files = BarangayFiles(root, fmt, start, end)
+    total = (subscribers if subscribers is not None else Subscriber.objects).count() if progress else 0
+    try:
+        for done, statement in enumerate(build_statements(start, end, subscribers, include_empty), 1):
+            files.write(statement)
+            if progress:
+                progress(done, total, f'{done} statements written')
+    finally:
+        written = files.close()
+    return written
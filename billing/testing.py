@@ -0,0 +1,26 @@
+"""
+Test runner for `manage.py test` (settings.TEST_RUNNER).
+
+Tests must not write to the notice cache on disk that the server and the
+run_jobs workers share, so every test run swaps in per-process caches.
+Doing it here covers every test, including ones that bill a month
+through run_billing and pre-render its notices as a side effect.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'notices': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-notices'},
+}
+
+
+class BillingTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.isolated = override_settings(CACHES=TEST_CACHES)
+        self.isolated.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.isolated.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,3 +1,1509 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import io
+import json
+import re
+import subprocess
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import Mock, patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F, Max, QuerySet, Sum
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import (aging, cashiering, jobs, journals, notices, notifications, rollups, scratch, snapshots,
+               statements, views)
+from .anomalies import scan_reading_anomalies
+from .integrity import subscriber_chunks, verify_chunk, fix_chunk
+from .forms import PaymentForm
+from .benchmarks import CASES, BenchmarkContext, run_case, compare
+from .instrumentation import QueryBudgetExceeded, RequestMetricsMiddleware
+from .profiling import phase, recording_phases
+from .ticker import ticker
+from .models import (
+    Subscriber, WaterRate, MeterReading, Bill, Ledger, Job, JobSchedule, ReceivableAgingSnapshot,
+    MonthlyBillingSummary, HighWaterMark, CashierClosing, Notification, DisconnectionNotice, OtherCharge,
+    ReadingFlag
+)
+from .services import (
+    apply_penalty, generate_bill, process_payment, issue_disconnection_notice, get_running_balance,
+    import_meter_readings, reconcile_estimated_readings
+)
+
+
+def make_billing_data():
+    """A few subscribers with two months of bills, a payment and a notice."""
+    WaterRate.objects.create(classification='PRIVATE', minimum_charge=Decimal('150.00'),
+                             rate_per_cubic_m=Decimal('15.50'), effective_date=date(2025, 1, 1))
+    subs = []
+    for i in range(3):
+        sub = Subscriber.objects.create(
+            account_number=f'MHN-2025-{i:04d}', last_name=f'Test{i}', first_name='Sub',
+            address='Somewhere', barangay='Poblacion', meter_number=f'MTR-{i}',
+            service_address='Somewhere', connection_date=date(2024, 1, 1),
+        )
+        for month, (prev, curr) in enumerate([(0, 12), (12, 30)], start=1):
+            reading = MeterReading.objects.create(
+                subscriber=sub, billing_month=date(2025, month, 1),
+                previous_reading=prev, current_reading=curr,
+            )
+            bill = generate_bill(sub, reading, date(2025, month, 15), date(2025, month, 20))
+        subs.append(sub)
+    process_payment(bill, Decimal('100.00'), 'OR-0001', 'Cashier')
+    issue_disconnection_notice(bill, date(2025, 3, 1), 'Cashier')
+    return subs
+
+
+# ══════════════════════════════════════════════════════════
+#   Query plans — key views must reach bills and ledger
+#   entries through an index, never a full table scan
+# ══════════════════════════════════════════════════════════
+class QueryPlanTests(TestCase):
+    HOT_TABLES = {'billing_bill', 'billing_ledger', 'billing_meterreading',
+                  'billing_disconnectionnotice'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subs = make_billing_data()
+        cls.user = User.objects.create_user('cashier', password='pw')
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN is SQLite syntax')
+        self.client.force_login(self.user)
+
+    def full_scans(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        scans = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or not any(t in sql for t in self.HOT_TABLES):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                for row in cursor.fetchall():
+                    m = re.match(r'SCAN (\w+)(?: AS \w+)?$', row[-1])
+                    if m and m.group(1) in self.HOT_TABLES:
+                        scans.append(f'{m.group(1)}: {sql}')
+        return scans
+
+    def assertNoFullScan(self, url):
+        scans = self.full_scans(url)
+        self.assertEqual(scans, [], f'{url} fell back to a full table scan')
+
+    def test_dashboard(self):
+        self.assertNoFullScan('/')
+
+    def test_bill_list_for_month(self):
+        self.assertNoFullScan('/bills/?month=2025-02&status=UNPAID')
+
+    def test_collection_report(self):
+        self.assertNoFullScan('/reports/collection/?month=2025-02')
+
+    def test_subscriber_ledger(self):
+        self.assertNoFullScan(f'/subscribers/{self.subs[0].pk}/ledger/')
+
+    def test_subscriber_detail(self):
+        self.assertNoFullScan(f'/subscribers/{self.subs[0].pk}/')
+
+    def test_month_filter_is_a_range(self):
+        """bill_list must filter on a date range, not strftime() of every row."""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/bills/?month=2025-02')
+        self.assertFalse([q for q in ctx.captured_queries if 'django_date_extract' in q['sql']])
+
+
+# ══════════════════════════════════════════════════════════
+#   Request metrics middleware — Server-Timing, slow log,
+#   and per-view query budgets
+# ══════════════════════════════════════════════════════════
+@override_settings(QUERY_BUDGET_RAISE=True)
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.subs = make_billing_data()
+        cls.bill = Bill.objects.filter(subscriber=cls.subs[0]).first()
+        cls.user = User.objects.create_user('cashier', password='pw')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_key_views_stay_within_query_budget(self):
+        for url in ['/', '/subscribers/', f'/subscribers/{self.subs[0].pk}/',
+                    f'/subscribers/{self.subs[0].pk}/ledger/', '/bills/',
+                    f'/bills/{self.bill.pk}/', f'/bills/{self.bill.pk}/pay/',
+                    '/reports/collection/', '/ledger/']:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_server_timing_header(self):
+        timing = self.client.get('/')['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, app;dur=[\d.]+')
+
+    async def test_async_requests_are_measured_without_a_thread(self):
+        async def view(request):
+            return HttpResponse()
+        self.assertTrue(iscoroutinefunction(RequestMetricsMiddleware(view)))
+        await self.async_client.aforce_login(self.user)
+        timing = (await self.async_client.get('/'))['Server-Timing']
+        self.assertRegex(timing, r'desc="[1-9]\d* queries"')
+
+    @override_settings(QUERY_BUDGETS={'dashboard': 1})
+    def test_over_budget_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get('/')
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_request_logged_with_sql(self):
+        with self.assertLogs('billing.slow_requests', level='WARNING') as logs:
+            self.client.get('/subscribers/')
+        self.assertIn('[subscriber-list]', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+# ══════════════════════════════════════════════════════════
+#   generate_dataset — synthetic data must follow the same
+#   bookkeeping as the service layer
+# ══════════════════════════════════════════════════════════
+class GenerateDatasetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_dataset', subscribers=40, years=2, chunk=15, stdout=io.StringIO())
+
+    def test_ledger_matches_running_balance(self):
+        for sub in Subscriber.objects.all():
+            last = sub.ledger_entries.order_by('entry_date', 'created_at').last()
+            self.assertEqual(get_running_balance(sub), last.running_balance, sub.account_number)
+
+    def test_bills_are_internally_consistent(self):
+        for bill in Bill.objects.all():
+            self.assertEqual(bill.total_amount_due,
+                             bill.basic_charge + bill.arrears + bill.penalty_amount)
+            if bill.status == 'PARTIAL':
+                self.assertEqual(bill.balance, bill.total_amount_due - bill.amount_paid)
+
+    def test_only_payments_close_a_bill(self):
+        for bill in Bill.objects.filter(status='PAID'):
+            self.assertGreaterEqual(bill.amount_paid, bill.total_amount_due, bill.pk)
+            self.assertEqual(bill.balance, 0)
+
+    def test_until_pins_the_history(self):
+        call_command('generate_dataset', subscribers=5, years=1, until='2024-06', replace=True,
+                     stdout=io.StringIO())
+        self.assertEqual(Bill.objects.aggregate(m=Max('billing_month'))['m'], date(2024, 5, 1))
+        self.assertFalse(Ledger.objects.filter(entry_date__gte=date(2024, 6, 1)).exists())
+
+    def test_no_subscriber_can_be_messaged(self):
+        self.assertFalse(Subscriber.objects.exclude(contact_number='').exists())
+        self.assertFalse(Subscriber.objects.exclude(email='').exists())
+
+    def test_same_seed_same_data(self):
+        before = list(Ledger.objects.order_by('id').values_list('debit', 'credit', 'or_number'))
+        call_command('generate_dataset', subscribers=40, years=2, chunk=15, replace=True,
+                     stdout=io.StringIO())
+        after = list(Ledger.objects.order_by('id').values_list('debit', 'credit', 'or_number'))
+        self.assertEqual(before, after)
+
+
+# ══════════════════════════════════════════════════════════
+#   Benchmark cases — every case must run; compare() flags
+#   slowdowns and extra queries
+# ══════════════════════════════════════════════════════════
+class BenchmarkCaseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_billing_data()
+
+    def test_every_case_runs(self):
+        ctx = BenchmarkContext()
+        for name in CASES:
+            with self.subTest(case=name):
+                result = run_case(name, ctx, repeats=1)
+                self.assertGreater(result['queries'], 0)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'dashboard': {'seconds': 0.010, 'queries': 8, 'peak_kib': 90}}
+        self.assertEqual(compare({'dashboard': {'seconds': 0.025, 'queries': 8, 'peak_kib': 95}}, baseline), [])
+        problems = compare({'dashboard': {'seconds': 0.040, 'queries': 9, 'peak_kib': 90}}, baseline)
+        self.assertEqual(len(problems), 2)
+
+    def test_worker_files_stay_in_the_scratch_directory(self):
+        seen = {}
+
+        def worker(args, env, **kwargs):
+            seen.update(env)
+            return subprocess.CompletedProcess(args, 0, stdout='{"ok": 1}\n', stderr='')
+        with patch('billing.scratch.subprocess.run', side_effect=worker):
+            self.assertEqual(scratch.run_worker('run_benchmarks', [], 'Benchmark run'), {'ok': 1})
+        scratch_dir = Path(seen['DATABASE_NAME']).parent
+        for key in ('NOTICE_CACHE_DIR', 'NOTIFY_OUTBOX_DIR'):
+            self.assertEqual(Path(seen[key]).parent, scratch_dir, key)
+        self.assertFalse(scratch_dir.exists())
+
+    def test_workers_refuse_the_live_database(self):
+        for command in ('benchmark_db', 'run_benchmarks', 'load_test'):
+            with self.subTest(command=command), self.assertRaisesMessage(CommandError, 'scratch database'):
+                call_command(command, worker=True)
+
+
+# ══════════════════════════════════════════════════════════
+#   Profiling — --phases breakdown from the service phases
+# ══════════════════════════════════════════════════════════
+class PhaseProfilingTests(TestCase):
+    def test_phase_is_free_outside_a_profiled_run(self):
+        self.assertIs(phase('anything'), phase('anything.else'))   # one shared no-op context
+        with phase('anything'):
+            list(Subscriber.objects.all())
+        with recording_phases() as recorder:
+            with phase('inside'):
+                pass
+        self.assertEqual(list(recorder.stats), ['inside'])
+        self.assertEqual(recorder.queries, 0)
+
+    def test_run_billing_phase_breakdown(self):
+        subs = make_billing_data()
+        MeterReading.objects.create(subscriber=subs[0], billing_month=date(2025, 3, 1),
+                                    previous_reading=30, current_reading=41)
+        out = io.StringIO()
+        call_command('run_billing', billing_month='2025-03-01', phases=True, stdout=out)
+        self.assertIn('generate_bill.arrears', out.getvalue())
+        self.assertRegex(out.getvalue(), r'generate_bill\s+1\s+[\d.]+\s+[\d.]+%\s+\d+')
+
+    def test_nested_phases_count_queries_inclusively(self):
+        with recording_phases() as recorder:
+            with phase('outer'):
+                with phase('outer.inner'):
+                    list(Subscriber.objects.all())
+                list(Bill.objects.all())
+        self.assertEqual(recorder.stats['outer'][2], 2)
+        self.assertEqual(recorder.stats['outer.inner'][2], 1)
+
+
+# ══════════════════════════════════════════════════════════
+#   Integrity verifier — stored balances vs the ledger
+# ══════════════════════════════════════════════════════════
+class IntegrityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.subs = make_billing_data()
+
+    def drift(self):
+        found = [verify_chunk(*bounds) for bounds in subscriber_chunks(2)]
+        return (sum(len(f['ledger']) for f in found), sum(len(f['bills']) for f in found))
+
+    def test_services_leave_no_drift(self):
+        self.assertEqual(self.drift(), (0, 0))
+
+    def test_detects_and_fixes_drift(self):
+        entry = Ledger.objects.filter(subscriber=self.subs[1]).first()
+        Ledger.objects.filter(pk=entry.pk).update(running_balance=Decimal('999.00'))
+        bill = Bill.objects.filter(subscriber=self.subs[2], amount_paid__gt=0).get()
+        Bill.objects.filter(pk=bill.pk).update(amount_paid=Decimal('0.00'))
+        self.assertEqual(self.drift(), (1, 1))
+
+        for bounds in subscriber_chunks(2):
+            fix_chunk(*bounds)
+        self.assertEqual(self.drift(), (0, 0))
+        bill.refresh_from_db()
+        self.assertEqual(bill.amount_paid, Decimal('100.00'))
+        self.assertEqual(bill.status, 'PARTIAL')
+
+    def test_penalty_after_a_part_payment_stays_overdue(self):
+        bill = Bill.objects.filter(subscriber=self.subs[2], amount_paid__gt=0).get()
+        apply_penalty(bill)
+        Bill.objects.filter(pk=bill.pk).update(balance=F('balance') + 1)
+        self.assertEqual(self.drift(), (0, 1))
+
+        for bounds in subscriber_chunks(2):                        # what verify_ledger --fix runs
+            fix_chunk(*bounds)
+        bill.refresh_from_db()
+        self.assertEqual((bill.status, bill.balance), ('OVERDUE', bill.total_amount_due - bill.amount_paid))
+        self.assertEqual(self.drift(), (0, 0))
+        self.assertIsNone(apply_penalty(bill))                  # no second penalty
+
+
+# ══════════════════════════════════════════════════════════
+#   Admin — changelist queries must not grow with the rows
+#   on the page, and counts stop at COUNT_CAP
+# ══════════════════════════════════════════════════════════
+class AdminChangelistTests(TestCase):
+    MODELS = ['subscriber', 'meterreading', 'bill', 'ledger',
+              'othercharge', 'disconnectionnotice', 'readingflag']
+
+    def setUp(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin_user)
+
+    def changelist_queries(self, model, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/admin/billing/{model}/', params or {})
+        self.assertEqual(response.status_code, 200, model)
+        return len(ctx)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        make_billing_data()
+        small = {model: self.changelist_queries(model) for model in self.MODELS}
+        call_command('generate_dataset', subscribers=30, years=1, stdout=io.StringIO())
+        for model in self.MODELS:
+            with self.subTest(model=model):
+                queries = self.changelist_queries(model)
+                self.assertEqual(queries, small[model])
+                self.assertLessEqual(queries, 12)
+
+    def test_date_hierarchy_drilldown(self):
+        make_billing_data()
+        self.changelist_queries('bill', {'billing_month__year': 2025})
+        self.changelist_queries('ledger', {'entry_date__year': 2025, 'entry_date__month': 2})
+
+    def test_ledger_lists_newest_first(self):
+        make_billing_data()
+        response = self.client.get('/admin/billing/ledger/')
+        dates = [e.entry_date for e in response.context['cl'].result_list]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+        self.assertEqual(dates[0], Ledger.objects.latest('entry_date').entry_date)
+
+    def test_count_is_capped(self):
+        from . import admin as billing_admin
+        make_billing_data()
+        paginator = billing_admin.EstimatedCountPaginator(Ledger.objects.order_by('pk'), 2)
+        with patch.object(billing_admin, 'COUNT_CAP', 3):
+            self.assertEqual(paginator.count, 4)
+        self.assertGreater(Ledger.objects.count(), 4)
+
+
+# ══════════════════════════════════════════════════════════
+#   Snapshots — columnar export, incremental runs pick up
+#   new ledger entries and rewrite months with changed bills
+# ══════════════════════════════════════════════════════════
+@skipUnless(snapshots.pa, 'pyarrow is not installed')
+class SnapshotExportTests(TestCase):
+    def setUp(self):
+        self.subs = make_billing_data()
+        tmp       = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+
+    def export(self, **options):
+        call_command('export_snapshot', output_dir=self.root, stdout=io.StringIO(), **options)
+
+    def test_full_export_matches_database(self):
+        self.export()
+        for name, (model, _, _) in snapshots.TABLES.items():
+            self.assertEqual(snapshots.open_table(self.root, name).count_rows(), model.objects.count(), name)
+        bills = snapshots.open_table(self.root, 'bills').to_table(columns=['billing_month', 'balance'])
+        self.assertEqual(sorted(bills.column('billing_month').to_pylist()),
+                         sorted(Bill.objects.values_list('billing_month', flat=True)))
+        self.assertNotIn('running_balance', snapshots.open_table(self.root, 'ledger').schema.names)
+
+    def test_incremental_export(self):
+        self.export()
+        bill = Bill.objects.filter(billing_month=date(2025, 1, 1)).first()
+        process_payment(bill, Decimal('5.00'), 'OR-0002', 'Cashier')
+        self.export()
+
+        ledger = snapshots.open_table(self.root, 'ledger')
+        self.assertEqual(ledger.count_rows(), Ledger.objects.count())
+        row = snapshots.open_table(self.root, 'bills').to_table(
+            filter=snapshots.ds.field('id') == bill.pk).to_pylist()
+        self.assertEqual(row[0]['amount_paid'], Decimal('5.00'))
+        self.assertEqual(len(list(Path(self.root, 'bills', 'billing_month=2025-01-01').glob('part-*'))), 1)
+
+    def test_arrow_format(self):
+        self.export(format='arrow')
+        self.assertEqual(snapshots.open_table(self.root, 'ledger').count_rows(), Ledger.objects.count())
+        with self.assertRaises(CommandError):
+            self.export(format='parquet')
+
+
+# ══════════════════════════════════════════════════════════
+#   Async report views — independent queries run together,
+#   and the views still answer inside a test transaction
+# ══════════════════════════════════════════════════════════
+class AsyncReportViewTests(TestCase):
+    def setUp(self):
+        self.subs = make_billing_data()
+        self.client.force_login(User.objects.create_user('cashier', password='pw'))
+
+    def test_report_views_render(self):
+        for path in ['/', '/reports/collection/?month=2025-02', f'/subscribers/{self.subs[0].pk}/ledger/',
+                     '/ledger/', '/ledger/?entry_type=PAYMENT']:
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 200)
+
+    def test_general_ledger_totals(self):
+        response = self.client.get('/ledger/')
+        totals   = Ledger.objects.aggregate(d=Sum('debit'), c=Sum('credit'))
+        self.assertEqual(response.context['totals']['net_amount'], totals['d'] - totals['c'])
+        self.assertEqual(response.context['total_count'], Ledger.objects.count())
+
+
+class GatherQueriesTests(SimpleTestCase):
+    def test_results_by_name(self):
+        results = async_to_sync(views.gather_queries)(a=lambda: 1, b=lambda: 2, c=lambda: 3)
+        self.assertEqual(results, {'a': 1, 'b': 2, 'c': 3})
+
+
+#   outside a transaction, as in production: the gathered queries must
+#   reach Server-Timing whether they run in turn or on worker connections
+class GatheredQueryCountTests(TransactionTestCase):
+    def setUp(self):
+        self.subs = make_billing_data()
+        self.client.force_login(User.objects.create_user('cashier', password='pw'))
+
+    def query_count(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return int(re.search(r'"(\d+) queries"', response['Server-Timing']).group(1))
+
+    def test_every_query_is_counted(self):
+#         the gathered queries (8 and 4) plus the session, user and view's own
+        for path, expected in [('/', 11), ('/reports/collection/?month=2025-02', 6)]:
+            with self.subTest(path=path):
+                self.assertEqual(self.query_count(path), expected)
+                with patch.object(views, 'SEQUENTIAL_VENDORS', set()):     # worker connections
+                    self.assertEqual(self.query_count(path), expected)
+
+
+# ══════════════════════════════════════════════════════════
+#   Collection ticker — payments reach open streams after
+#   commit; a new stream starts with a snapshot
+# ══════════════════════════════════════════════════════════
+class CollectionTickerTests(TestCase):
+    def setUp(self):
+        self.subs = make_billing_data()
+        ticker.totals = None
+        self.addCleanup(setattr, ticker, 'totals', None)
+
+    def open_bill(self):
+        return Bill.objects.filter(status__in=['UNPAID', 'PARTIAL', 'OVERDUE']).first()
+
+    def test_snapshot_is_loaded_once(self):
+        first = ticker.snapshot()
+        self.assertEqual(Decimal(first['total']), Decimal('100.00'))
+        self.assertEqual(first['cashiers']['Cashier']['count'], 1)
+        with self.assertNumQueries(0):
+            ticker.snapshot()
+
+    async def test_payment_pushed_after_commit(self):
+        await sync_to_async(ticker.snapshot)()
+        queue = ticker.subscribe()
+        self.addCleanup(ticker.unsubscribe, queue)
+
+        def pay():
+            with self.captureOnCommitCallbacks(execute=True):
+                process_payment(self.open_bill(), Decimal('25.00'), 'OR-0009', 'Teller 2')
+        await sync_to_async(pay)()
+
+        event = await asyncio.wait_for(queue.get(), 1)
+        self.assertEqual(event['type'], 'payment')
+        self.assertEqual(Decimal(event['total']), Decimal('125.00'))
+        self.assertEqual(event['cashiers']['Teller 2'], {'count': 1, 'total': '25.00'})
+
+    def test_rolled_back_payment_is_not_counted(self):
+        ticker.snapshot()
+        with self.captureOnCommitCallbacks(execute=False):
+            process_payment(self.open_bill(), Decimal('25.00'), 'OR-0010', 'Teller 2')
+        self.assertEqual(Decimal(ticker.snapshot()['total']), Decimal('100.00'))
+
+    @override_settings(TIME_ZONE='Asia/Manila')
+    def test_manila_business_date_after_utc_midnight(self):
+        early = datetime(2025, 3, 10, 17, 30, tzinfo=dt_timezone.utc)      # 01:30 on the 11th in Manila
+        with patch('django.utils.timezone.now', return_value=early):
+            self.assertEqual(ticker.snapshot()['date'], '2025-03-11')
+            with self.captureOnCommitCallbacks(execute=True):
+                process_payment(self.open_bill(), Decimal('25.00'), 'OR-0011', 'Teller 2')
+            self.assertFalse(ticker.stale())
+            self.assertEqual(ticker.snapshot()['cashiers']['Teller 2'], {'count': 1, 'total': '25.00'})
+
+    async def test_stream_starts_with_snapshot(self):
+        user = await User.objects.acreate_user('supervisor', password='pw')
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get('/dashboard/ticker/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        first = await anext(aiter(response.streaming_content))
+        await response.streaming_content.aclose()
+        self.assertTrue(first.startswith(b'event: snapshot\n'))
+
+
+# ══════════════════════════════════════════════════════════
+#   Background jobs — claiming, progress, retries, cancel,
+#   cron schedules and the Jobs page
+# ══════════════════════════════════════════════════════════
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.subs = make_billing_data()
+        for sub in self.subs:
+            MeterReading.objects.create(subscriber=sub, billing_month=date(2025, 3, 1),
+                                        previous_reading=30, current_reading=41)
+
+    def run_once(self):
+        call_command('run_jobs', once=True, stdout=io.StringIO())
+
+    def test_billing_job_runs_to_completion(self):
+        job = jobs.enqueue('run_billing', {'billing_month': '2025-03-01'})
+        self.run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'SUCCEEDED')
+        self.assertEqual(job.progress, 100)
+        self.assertIn('Done. 3 bills generated.', job.output)
+        self.assertEqual(Bill.objects.filter(billing_month=date(2025, 3, 1)).count(), 3)
+
+    def test_heartbeat_survives_a_locked_database(self):
+        job = jobs.enqueue('verify_ledger')
+        Job.objects.filter(pk=job.pk).update(status='RUNNING', heartbeat_at=timezone.now() - timedelta(hours=1))
+        stop   = Mock(wait=Mock(side_effect=[False, False, True]))      # two beats, then stop
+        update = QuerySet.update
+        calls  = []
+
+        def locked_once(queryset, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return update(queryset, **kwargs)
+        with patch.object(QuerySet, 'update', autospec=True, side_effect=locked_once), \
+                self.assertLogs('billing.jobs', level='WARNING'):
+            jobs._heartbeat(job.pk, stop)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(jobs.requeue_stale(), 0)
+
+    def test_failure_is_retried_then_failed(self):
+        job = jobs.enqueue('verify_ledger')
+        with patch.object(jobs, 'call_command', side_effect=RuntimeError('disk full')):
+            self.run_once()
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('QUEUED', 1))
+            self.assertGreater(job.run_after, timezone.now())
+
+            job.attempts = job.max_attempts - 1
+            job.run_after = timezone.now()
+            job.save()
+            self.run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'FAILED')
+        self.assertIn('disk full', job.error)
+
+    def test_bad_option_fails_without_retry(self):
+        job = jobs.enqueue('verify_ledger', {'no_such_option': 1})
+        self.run_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 1))
+
+    def test_cancel_stops_at_next_progress_report(self):
+        job = jobs.enqueue('verify_ledger')
+        queued = jobs.enqueue('verify_ledger')
+
+        def cancel_midway(*args, **kwargs):
+            self.assertEqual(jobs.cancel(Job.objects.all()), 2)
+            self.assertEqual(Job.objects.get(pk=job.pk).status_label, 'Cancelling')
+            self.assertIsNone(jobs.claim('w2'))              # still holds its command
+            jobs.report_progress(1, 1)
+        with patch.object(jobs, 'call_command', side_effect=cancel_midway):
+            self.run_once()
+        job.refresh_from_db()
+        queued.refresh_from_db()
+        self.assertEqual((job.status, queued.status), ('CANCELLED', 'CANCELLED'))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_cancel_waits_for_commands_without_progress(self):
+        job = jobs.enqueue('verify_ledger')
+        jobs.enqueue('verify_ledger')
+
+        def cancel_midway(*args, **kwargs):
+            if Job.objects.get(pk=job.pk).status == 'RUNNING':
+                jobs.cancel(Job.objects.filter(pk=job.pk))
+                self.assertIsNone(jobs.claim('w2'))
+        with patch.object(jobs, 'call_command', side_effect=cancel_midway):
+            self.run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'SUCCEEDED')           # ran to the end before it could stop
+
+        jobs.enqueue('verify_ledger')
+        with patch.object(jobs, 'call_command', side_effect=RuntimeError('disk full')):
+            failing = jobs.claim('w1')
+            jobs.cancel(Job.objects.filter(pk=failing.pk))
+            self.assertEqual(jobs.run_job(failing), 'CANCELLED')    # not retried
+
+    def test_one_running_job_per_command(self):
+        first = jobs.enqueue('verify_ledger')
+        jobs.enqueue('verify_ledger')
+        other = jobs.enqueue('scan_anomalies')
+        self.assertEqual(jobs.claim('w1'), first)
+        self.assertEqual(jobs.claim('w2'), other)
+        self.assertIsNone(jobs.claim('w3'))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Job.objects.create(command='verify_ledger', status='RUNNING')
+
+    def test_cron_next_run(self):
+        after = timezone.make_aware(datetime(2026, 3, 2, 1, 30))       # a Monday
+        cases = {
+            '30 1 * * *':   datetime(2026, 3, 3, 1, 30),
+            '*/15 * * * *': datetime(2026, 3, 2, 1, 45),
+            '0 8 1 * 0':    datetime(2026, 3, 8, 8, 0),                  # 1st or Sunday
+            '0 0 1 */3 *':  datetime(2026, 4, 1, 0, 0),
+        }
+        for expr, expected in cases.items():
+            with self.subTest(expr=expr):
+                self.assertEqual(timezone.localtime(jobs.next_run(expr, after)).replace(tzinfo=None), expected)
+        for bad in ['* * *', '61 * * * *', '0 0 31 2 *']:
+            with self.subTest(expr=bad), self.assertRaises(ValueError):
+                jobs.next_run(bad, after)
+
+    def test_schedule_queues_one_job_per_slot(self):
+        schedule = JobSchedule.objects.create(name='Nightly check', command='verify_ledger', cron='0 2 * * *')
+        self.assertEqual(jobs.enqueue_due_schedules(), [])
+        schedule.refresh_from_db()
+        self.assertIsNotNone(schedule.next_run_at)
+
+        due = schedule.next_run_at + timedelta(minutes=1)
+        queued = jobs.enqueue_due_schedules(now=due)
+        self.assertEqual([j.schedule_id for j in queued], [schedule.pk])
+        self.assertEqual(jobs.enqueue_due_schedules(now=due), [])
+
+    def test_jobs_page(self):
+        staff = User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.post('/jobs/', {'command': 'run_billing', 'billing_month': '2025-03-01'})
+        job = Job.objects.get()
+        self.assertRedirects(response, f'/jobs/{job.pk}/')
+        self.assertEqual(job.arguments, {'billing_month': '2025-03-01'})
+        self.assertEqual(self.client.get(f'/jobs/{job.pk}/status/').json()['status'], 'QUEUED')
+        self.assertEqual(self.client.get('/jobs/').status_code, 200)
+
+        self.client.force_login(User.objects.create_user('reader', password='pw'))
+        self.assertEqual(self.client.post('/jobs/', {'command': 'run_billing'}).status_code, 403)
+
+
+# ══════════════════════════════════════════════════════════
+#   Billing notices — cached renders and conditional GET
+# ══════════════════════════════════════════════════════════
+@override_settings(QUERY_BUDGET_RAISE=True)
+class BillingNoticeCacheTests(TestCase):
+    def setUp(self):
+        self.subs = make_billing_data()
+        self.bill = Bill.objects.get(subscriber=self.subs[0], billing_month=date(2025, 2, 1))
+        self.url  = f'/bills/{self.bill.pk}/notice/print/'
+        self.client.force_login(User.objects.create_user('cashier', password='pw'))
+
+    def tearDown(self):
+        caches['notices'].clear()
+
+    def test_unchanged_bill_is_not_modified(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertContains(first, self.subs[0].account_number)
+        self.assertIn('private', first['Cache-Control'])
+
+        with patch.object(notices, 'render_notice') as render:
+            again = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+            cached = self.client.get(self.url)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+        self.assertEqual(cached.content, first.content)
+        render.assert_not_called()
+
+    def test_payment_and_notice_change_the_version(self):
+        first = self.client.get(self.url)['ETag']
+        process_payment(self.bill, Decimal('50.00'), 'OR-0002', 'Cashier')
+        paid = self.client.get(self.url, HTTP_IF_NONE_MATCH=first)
+        self.assertEqual(paid.status_code, 200)
+        self.assertNotEqual(paid['ETag'], first)
+
+        issue_disconnection_notice(self.bill, date(2025, 3, 5), 'Cashier')
+        noticed = self.client.get(self.url, HTTP_IF_NONE_MATCH=paid['ETag'])
+        self.assertEqual(noticed.status_code, 200)
+        self.assertContains(noticed, 'SERVICE DISCONNECTION DATE')
+
+        DisconnectionNotice.objects.filter(bill=self.bill).update(reconnection_fee=Decimal('750.00'))
+        edited = self.client.get(self.url, HTTP_IF_NONE_MATCH=noticed['ETag'])
+        self.assertEqual(edited.status_code, 200)
+        self.assertContains(edited, '750.00')
+
+    def test_reading_correction_and_ledger_fix_change_the_version(self):
+        first = self.client.get(self.url)['ETag']
+        MeterReading.objects.filter(pk=self.bill.meter_reading_id).update(is_estimated=True)
+        estimated = self.client.get(self.url, HTTP_IF_NONE_MATCH=first)
+        self.assertEqual(estimated.status_code, 200)
+        self.assertContains(estimated, 'ESTIMATED')
+
+        Bill.objects.filter(pk=self.bill.pk).update(status='PAID')        # drift, updated_at untouched
+        for bounds in subscriber_chunks(10):
+            fix_chunk(*bounds)
+        fixed = self.client.get(self.url, HTTP_IF_NONE_MATCH=estimated['ETag'])
+        self.assertEqual(fixed.status_code, 200)
+
+    def test_billing_run_prerenders_the_month(self):
+        for sub in self.subs:
+            MeterReading.objects.create(subscriber=sub, billing_month=date(2025, 3, 1),
+                                        previous_reading=30, current_reading=41)
+        out = io.StringIO()
+        call_command('run_billing', billing_month='2025-03-01', stdout=out)
+        self.assertIn('3 of 3 billing notices pre-rendered.', out.getvalue())
+
+        bill = Bill.objects.filter(billing_month=date(2025, 3, 1)).first()
+        with patch.object(notices, 'render_notice') as render:
+            response = self.client.get(f'/bills/{bill.pk}/notice/print/')
+        self.assertEqual(response.status_code, 200)
+        render.assert_not_called()
+
+        out = io.StringIO()
+        call_command('prerender_notices', billing_month='2025-03-01', stdout=out)
+        self.assertIn('Done. 0 notices rendered, 3 already cached.', out.getvalue())
+
+    def test_missing_bill_is_404(self):
+        self.assertEqual(self.client.get('/bills/999999/notice/print/').status_code, 404)
+
+
+# ══════════════════════════════════════════════════════════
+#   Statements of account — one streaming pass, per-barangay files
+# ══════════════════════════════════════════════════════════
+class StatementTests(TestCase):
+    def setUp(self):
+        self.subs = make_billing_data()
+        Subscriber.objects.filter(pk=self.subs[2].pk).update(barangay='San Isidro')
+
+    def test_balances_match_the_ledger(self):
+        with self.assertNumQueries(2):
+            found = list(statements.build_statements(date(2025, 2, 1), date.today()))
+        self.assertEqual([s.subscriber.pk for s in found], [s.pk for s in self.subs])
+        for statement in found:
+            sub = statement.subscriber
+            january = Bill.objects.get(subscriber=sub, billing_month=date(2025, 1, 1))
+            self.assertEqual(statement.opening, january.total_amount_due)
+            self.assertEqual(statement.closing, get_running_balance(sub))
+            self.assertEqual(statement.closing, statement.opening + statement.debits - statement.credits)
+            self.assertEqual(sum(statement.aging.values()), statement.closing)
+            self.assertEqual(statement.entries[-1][1], statement.closing)
+
+    def test_aging_puts_the_newest_charges_first(self):
+        statement = next(statements.build_statements(
+            date(2025, 2, 1), date(2025, 3, 15), Subscriber.objects.filter(pk=self.subs[0].pk)))
+        february = Bill.objects.get(subscriber=self.subs[0], billing_month=date(2025, 2, 1))
+        self.assertEqual(statement.aging['days_31_60'], february.total_amount_due)
+        self.assertEqual(statement.aging['over_90'] + statement.aging['days_61_90'],
+                         statement.closing - february.total_amount_due)
+
+    def test_command_writes_one_file_per_barangay(self):
+        with tempfile.TemporaryDirectory() as root:
+            out = io.StringIO()
+            call_command('statements', start='2025-01-01', format='csv', output_dir=root, stdout=out)
+            self.assertIn('Done. 3 statements in 2 files.', out.getvalue())
+            files = sorted(p.name for p in Path(root).iterdir())
+            self.assertEqual(files, [f'statements-poblacion-20250101-{date.today():%Y%m%d}.csv',
+                                     f'statements-san-isidro-20250101-{date.today():%Y%m%d}.csv'])
+            text = (Path(root) / files[1]).read_text()
+            self.assertIn('OR-0001', text)
+            self.assertEqual(text.count('CLOSING'), 1)
+
+            call_command('statements', start='2025-01-01', account=[self.subs[0].account_number],
+                         output_dir=root, stdout=io.StringIO())
+            html = next(Path(root).glob('*.html')).read_text()
+            self.assertEqual(html.count('class="statement"'), 1)
+
+    def test_statement_page(self):
+        self.client.force_login(User.objects.create_user('cashier', password='pw'))
+        response = self.client.get(f'/subscribers/{self.subs[0].pk}/statement/',
+                                   {'start': '2025-01-01', 'end': '2025-12-31'})
+        self.assertContains(response, 'Statement of Account')
+        self.assertContains(response, 'Balance brought forward')
+
+
+# ══════════════════════════════════════════════════════════
+#   Receivables aging — grouped snapshot and the report
+# ══════════════════════════════════════════════════════════
+class AgingTests(TestCase):
+    def setUp(self):
+        self.subs = make_billing_data()
+
+    def test_snapshot_buckets_by_days_past_due(self):
+        self.assertEqual(aging.take_snapshot(date(2025, 3, 20)), 3)
+        for sub in self.subs:
+            row = ReceivableAgingSnapshot.objects.get(subscriber=sub)
+            january  = Bill.objects.get(subscriber=sub, billing_month=date(2025, 1, 1))
+            february = Bill.objects.get(subscriber=sub, billing_month=date(2025, 2, 1))
+            self.assertEqual(row.days_61_90, january.balance)                        # due Jan 15
+            self.assertEqual(row.days_31_60, february.balance - february.arrears)   # due Feb 15
+            self.assertEqual(row.total, row.days_61_90 + row.days_31_60)
+            self.assertEqual((row.current, row.over_120, row.open_bills), (0, 0, 2))
+
+        aging.take_snapshot(date(2025, 3, 20))
+        self.assertEqual(ReceivableAgingSnapshot.objects.count(), 3)
+
+    def test_overpaid_newer_bill_settles_the_oldest_bucket(self):
+        self.assertEqual(aging.settle_oldest([Decimal(10), Decimal(-30), Decimal(5), Decimal(40)]),
+                         [Decimal(10), Decimal(0), Decimal(5), Decimal(10)])
+
+    def test_report_reads_the_snapshot(self):
+        aging.take_snapshot(date(2025, 3, 1))
+        aging.take_snapshot(date(2025, 6, 1))
+        Subscriber.objects.filter(pk=self.subs[0].pk).update(barangay='San Isidro')
+        self.client.force_login(User.objects.create_user('staff', password='pw', is_staff=True))
+
+        response = self.client.get('/reports/delinquent/', {'compare': '2025-03-01'})
+        self.assertEqual(response.context['as_of'], date(2025, 6, 1))
+        self.assertEqual(response.context['totals']['accounts'], 3)
+        self.assertEqual(response.context['previous']['total'], response.context['totals']['total'])
+        self.assertEqual(response.context['totals']['total'],
+                         response.context['totals']['days_91_120'] + response.context['totals']['over_120'])
+
+        march = {'as_of': '2025-03-01'}                  # January bills 45 days past due
+        response = self.client.get('/reports/delinquent/', {**march, 'past_due': 'days_31_60'})
+        self.assertEqual(response.context['totals']['accounts'], 3)
+        response = self.client.get('/reports/delinquent/', {**march, 'past_due': 'days_61_90'})
+        self.assertEqual(response.context['totals']['accounts'], 0)
+
+        response = self.client.post('/reports/delinquent/aging/')
+        self.assertRedirects(response, '/reports/delinquent/')
+        response = self.client.get('/reports/delinquent/', {'barangay': 'San Isidro'})
+        self.assertEqual(response.context['as_of'], date.today())
+        self.assertEqual(response.context['totals']['accounts'], 1)
+        self.assertEqual(response.context['count'], 2)
+
+
+# ══════════════════════════════════════════════════════════
+#   Monthly billing summaries — incremental refresh, trends
+# ══════════════════════════════════════════════════════════
+class MonthlySummaryTests(TestCase):
+    def setUp(self):
+        self.subs  = make_billing_data()
+        self.today = date.today().replace(day=1)
+        self.enterContext(patch.object(HighWaterMark, 'SETTLE_SECONDS', 0))
+
+    def summary(self, month):
+        return MonthlyBillingSummary.objects.filter(month=month).aggregate(
+            water=Sum('water_charges'), bills=Sum('bills'), collections=Sum('collections'),
+            connections=Sum('connections'))
+
+    def test_full_refresh_matches_the_source_tables(self):
+        months, rows = rollups.refresh_summaries(full=True)
+        self.assertEqual(months, 3)                     # January, February, this month's payment
+        february = self.summary(date(2025, 2, 1))
+        self.assertEqual(february['water'], Bill.objects.filter(
+            billing_month=date(2025, 2, 1)).aggregate(s=Sum('basic_charge'))['s'])
+        self.assertEqual((february['bills'], february['connections']), (3, 3))
+        self.assertEqual(self.summary(self.today)['collections'], Decimal('100.00'))
+
+    def test_refresh_only_touches_changed_months(self):
+        rollups.refresh_summaries()
+        self.assertEqual(rollups.refresh_summaries(), (0, 0))
+
+        bill = Bill.objects.get(subscriber=self.subs[0], billing_month=date(2025, 2, 1))
+        process_payment(bill, Decimal('25.00'), 'OR-0002', 'Cashier')
+        with CaptureQueriesContext(connection) as queries:
+            months, _ = rollups.refresh_summaries()
+        self.assertEqual(months, 2)                     # the payment's month and the bill's
+        self.assertEqual(self.summary(self.today)['collections'], Decimal('125.00'))
+        self.assertLess(len(queries), 20)
+
+    def test_refresh_leaves_recent_entries_for_later(self):
+        Ledger.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        bill = Bill.objects.get(subscriber=self.subs[0], billing_month=date(2025, 2, 1))
+        process_payment(bill, Decimal('25.00'), 'OR-0002', 'Cashier')
+        payment = Ledger.objects.latest('id')
+        with patch.object(HighWaterMark, 'SETTLE_SECONDS', 60):
+            self.assertEqual(HighWaterMark.settled_ledger_id(), payment.pk - 1)
+            rollups.refresh_summaries()
+            self.assertEqual(HighWaterMark.objects.get(name=rollups.MARK).last_id, payment.pk - 1)
+            self.assertEqual(HighWaterMark.settled_ledger_id(timezone.now() + timedelta(minutes=2)), payment.pk)
+
+    def test_billing_run_refreshes_and_trends_page(self):
+        rollups.refresh_summaries()
+        for sub in self.subs:
+            MeterReading.objects.create(subscriber=sub, billing_month=date(2025, 3, 1),
+                                        previous_reading=30, current_reading=41)
+        out = io.StringIO()
+        call_command('run_billing', billing_month='2025-03-01', stdout=out)
+        self.assertIn('Billing summaries refreshed for March 2025: ', out.getvalue())
+        self.assertEqual(self.summary(date(2025, 3, 1))['bills'], 3)
+
+        self.client.force_login(User.objects.create_user('manager', password='pw'))
+        response = self.client.get('/reports/trends/', {'months': 60, 'barangay': 'Poblacion'})
+        self.assertEqual(response.status_code, 200)
+        by_month = {r['month']: r for r in response.context['by_month']}
+        self.assertEqual(by_month[date(2025, 3, 1)]['bills'], 3)
+        self.assertEqual(by_month[date(2025, 3, 1)]['efficiency'], 0)           # nothing paid in March
+        self.assertContains(response, 'trend-data')
+
+
+# ══════════════════════════════════════════════════════════
+#   Journal vouchers — balanced per day, incremental by
+#   ledger id, carried arrears left out of revenue
+# ══════════════════════════════════════════════════════════
+class JournalTests(TestCase):
+    def setUp(self):
+        self.subs = make_billing_data()
+        self.root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(patch.object(HighWaterMark, 'SETTLE_SECONDS', 0))
+
+    def test_vouchers_balance_and_leave_out_arrears(self):
+        found = list(journals.vouchers(Ledger.objects.all()))
+        self.assertTrue(found)
+        for _, _, lines in found:
+            self.assertEqual(sum(l[2] for l in lines), sum(l[3] for l in lines))
+
+        revenue = journals.account_for('BILLING')[0]
+        billed  = sum(l[3] for _, _, lines in found for l in lines if l[0] == revenue)
+        new_charges = sum(b.total_amount_due - b.arrears for b in Bill.objects.all())
+        self.assertEqual(billed, new_charges)
+        self.assertEqual(journals.account_for('UNKNOWN'), journals.account_for('OTHER'))
+
+    def test_export_is_incremental(self):
+        path, count, total = journals.export_new(self.root)
+        self.assertTrue(path.exists())
+        self.assertGreater(count, 0)
+        self.assertIsNone(journals.export_new(self.root))
+
+        bill = Bill.objects.get(subscriber=self.subs[0], billing_month=date(2025, 2, 1))
+        process_payment(bill, Decimal('25.00'), 'OR-0002', 'Cashier')
+        path, count, total = journals.export_new(self.root)
+        self.assertEqual((count, total), (1, Decimal('25.00')))
+        number = path.read_text(encoding='utf-8').splitlines()[1].split(',')[0]
+        self.assertTrue(number.endswith(f'-{Ledger.objects.latest("id").pk}'))
+
+    def test_export_waits_for_recent_entries(self):
+        Ledger.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        bill = Bill.objects.get(subscriber=self.subs[0], billing_month=date(2025, 2, 1))
+        process_payment(bill, Decimal('25.00'), 'OR-0002', 'Cashier')
+        with patch.object(HighWaterMark, 'SETTLE_SECONDS', 60):
+            journals.export_new(self.root)
+            self.assertEqual(HighWaterMark.objects.get(name=journals.MARK).last_id,
+                             Ledger.objects.latest('id').pk - 1)
+            self.assertIsNone(journals.export_new(self.root))
+        path, count, total = journals.export_new(self.root)
+        self.assertEqual((count, total), (1, Decimal('25.00')))
+
+    def test_year_export_command_writes_json(self):
+        out = io.StringIO()
+        call_command('journal_export', year=2025, format='json', output_dir=str(self.root), stdout=out)
+        self.assertIn('Done.', out.getvalue())
+        data = json.loads((self.root / 'journal-2025.json').read_text(encoding='utf-8'))
+        self.assertTrue(all(v['voucher'].count('-') == 1 for v in data))
+        self.assertFalse(HighWaterMark.objects.filter(name=journals.MARK).exists())
+
+
+# ══════════════════════════════════════════════════════════
+#   Cashier closing — per-cashier remittance, OR series
+#   gaps and duplicates, closed days refuse payments
+# ══════════════════════════════════════════════════════════
+class CashierClosingTests(TestCase):
+    def setUp(self):
+        self.subs  = make_billing_data()
+        self.bill  = Bill.objects.get(subscriber=self.subs[0], billing_month=date(2025, 2, 1))
+        self.today = timezone.localdate()
+
+    def pay(self, or_number, cashier='Cashier'):
+        return process_payment(self.bill, Decimal('10.00'), or_number, cashier)
+
+    def test_gaps_and_duplicates_in_one_query(self):
+        for or_number in ['OR-0002', 'OR-0005', 'OR-002']:      # 0003–0004 skipped, 0002 written twice
+            self.pay(or_number)
+        for or_number in ['B-99', 'B-100']:                      # numeric order, not string order
+            self.pay(or_number, 'Teller 2')
+
+        with self.assertNumQueries(1):
+            found = cashiering.audit(self.today, self.today)
+        cashier = found['Cashier']
+        self.assertEqual((cashier.payments, cashier.total), (4, Decimal('130.00')))
+        self.assertEqual((cashier.gaps, cashier.duplicates), (2, 1))
+        self.assertEqual((cashier.first_or, cashier.last_or), ('OR-002', 'OR-0005'))
+        self.assertIn('OR-0003 to OR-0004', [i['detail'] for i in cashier.issues if i['kind'] == 'GAP'][0])
+        self.assertEqual((found['Teller 2'].gaps, found['Teller 2'].last_or), (0, 'B-100'))
+
+    def test_or_number_is_unique(self):
+        with self.assertRaises(IntegrityError):
+            self.pay('OR-0001', 'Teller 2')
+        self.assertEqual(Bill.objects.get(pk=self.bill.pk).amount_paid, self.bill.amount_paid - Decimal('10.00'))
+
+        self.client.force_login(User.objects.create_user('cashier', password='pw'))
+        response = self.client.post(f'/bills/{self.bill.pk}/pay/', {
+            'amount_paid': '20.00', 'or_number': 'OR-0001', 'received_by': 'Teller 2'})
+        self.assertContains(response, 'was already issued')
+
+#         a race past the form check: the page shows the bill as stored, not the rolled-back payment
+        with patch.object(PaymentForm, 'clean_or_number', lambda form: form.cleaned_data['or_number']):
+            response = self.client.post(f'/bills/{self.bill.pk}/pay/', {
+                'amount_paid': '20.00', 'or_number': 'OR-0001', 'received_by': 'Teller 2'})
+        self.assertContains(response, 'has just been issued')
+        self.assertEqual(response.context['bill'].amount_paid, Bill.objects.get(pk=self.bill.pk).amount_paid)
+
+    def test_duplicate_receipts_report_and_renumber(self):
+        out = io.StringIO()
+        call_command('duplicate_receipts', stdout=out)
+        self.assertIn('Done. 0 OR numbers used more than once.', out.getvalue())
+
+#         the constraint keeps duplicates out, so stand in for ones posted before it
+        self.pay('OR-0002')
+        self.pay('OR-0003')
+        first, second = Ledger.objects.filter(or_number__in=['OR-0002', 'OR-0003']).order_by('id')
+        self.pay('OR-0002-2')
+        changed = cashiering.renumber_duplicates({'OR-0002': [first, second]})
+        self.assertEqual([e.or_number for e in changed], ['OR-0002-3'])
+        self.assertEqual(Ledger.objects.get(pk=second.pk).or_number, 'OR-0002-3')
+
+    def test_closed_day_refuses_payments(self):
+        self.pay('OR-0002')
+        self.client.force_login(User.objects.create_user('cashier', password='pw'))
+        response = self.client.post('/reports/cashier/', {'cashier': 'Cashier'})
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(User.objects.create_user('supervisor', password='pw', is_staff=True))
+        self.client.post(f'/reports/cashier/?date={self.today:%Y-%m-%d}', {'cashier': 'Cashier'})
+        closing = CashierClosing.objects.get(business_date=self.today, cashier='Cashier')
+        self.assertEqual((closing.payments, closing.total, closing.closed_by),
+                         (2, Decimal('110.00'), 'supervisor'))
+
+        with self.assertRaisesMessage(ValueError, 'already closed'):
+            self.pay('OR-0003')
+        self.pay('B-1', 'Teller 2')                              # other cashiers stay open
+        with self.assertRaises(ValueError):
+            cashiering.close_day(self.today, 'Cashier', 'supervisor')
+
+        response = self.client.get('/reports/cashier/')
+        self.assertContains(response, 'Closed')
+        self.assertEqual([r.cashier for r in response.context['open']], ['Teller 2'])
+
+        out = io.StringIO()
+        call_command('or_audit', stdout=out)
+        self.assertIn('2 cashiers, 0 OR issues', out.getvalue())
+
+
+# ══════════════════════════════════════════════════════════
+#   Notifications — bulk queuing without duplicates, batched
+#   sending with retries, throttling and stale messages
+# ══════════════════════════════════════════════════════════
+class FlakyBackend(notifications.BaseBackend):
+    """Fails the first send to each recipient, then delivers."""
+    failed = set()
+
+    def send(self, notification):
+        if notification.recipient not in self.failed:
+            self.failed.add(notification.recipient)
+            raise ConnectionError('gateway timeout')
+        return f'ok-{notification.pk}'
+
+
+class NotificationTests(TestCase):
+    def setUp(self):
+        self.subs   = make_billing_data()
+        self.outbox = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(NOTIFICATION_CHANNELS={
+            'SMS':   {'BACKEND': 'billing.notifications.FileBackend', 'RATE': 0,
+                      'OPTIONS': {'directory': self.outbox}},
+            'EMAIL': {'BACKEND': 'billing.notifications.EmailBackend', 'RATE': 0},
+        }))
+        Subscriber.objects.filter(pk=self.subs[0].pk).update(contact_number='0917 123 4567',
+                                                             email='sub0@example.com')
+        Subscriber.objects.filter(pk=self.subs[1].pk).update(contact_number='+63 918-765-4321')
+        Subscriber.objects.filter(pk=self.subs[2].pk).update(contact_number='12345')   # not a mobile
+
+    def test_bill_ready_queued_once_and_sent_in_batches(self):
+        self.assertEqual(notifications.queue_bill_ready(date(2025, 2, 1)), 3)
+        self.assertEqual(notifications.queue_bill_ready(date(2025, 2, 1)), 0)
+        self.assertEqual(sorted(Notification.objects.filter(channel='SMS').values_list('recipient', flat=True)),
+                         ['+639171234567', '+639187654321'])
+
+        with self.assertNumQueries(10):                  # stale reset, count; per batch: claim ×3, one update
+            counts = notifications.dispatch(batch_size=2)
+        self.assertEqual(counts['SENT'], 3)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('February 2025', mail.outbox[0].subject)
+        lines = next(self.outbox.glob('sms-*.jsonl')).read_text(encoding='utf-8').splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('P', json.loads(lines[0])['message'])
+        self.assertFalse(Notification.objects.exclude(status='SENT').exists())
+        self.assertFalse(Notification.objects.filter(provider_ref='').exists())
+
+    def test_failed_sends_are_retried_with_backoff(self):
+        with override_settings(NOTIFICATION_CHANNELS={
+                'SMS': {'BACKEND': 'billing.tests.FlakyBackend', 'RATE': 0}}):
+            FlakyBackend.failed = set()
+            notifications.queue_bill_ready(date(2025, 2, 1))
+            self.assertEqual(notifications.dispatch()['RETRY'], 2)
+            retry = Notification.objects.first()
+            self.assertEqual((retry.status, retry.attempts), ('QUEUED', 1))
+            self.assertGreater(retry.next_attempt_at, timezone.now())
+            self.assertEqual(notifications.dispatch()['SENT'], 0)        # not due yet
+
+            Notification.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(notifications.dispatch()['SENT'], 2)
+            self.assertEqual(set(Notification.objects.values_list('attempts', flat=True)), {2})
+
+    def test_retries_are_sent_by_a_follow_up_job(self):
+        with override_settings(NOTIFICATION_CHANNELS={
+                'SMS': {'BACKEND': 'billing.tests.FlakyBackend', 'RATE': 0}}):
+            FlakyBackend.failed = set()
+            notifications.queue_bill_ready(date(2025, 2, 1))
+            jobs.enqueue('send_notifications')
+            call_command('run_jobs', once=True, stdout=io.StringIO())
+            retry_at  = Notification.objects.order_by('next_attempt_at').first().next_attempt_at
+            follow_up = Job.objects.get(command='send_notifications', status='QUEUED')
+            self.assertEqual(follow_up.run_after, retry_at)
+
+            with patch('django.utils.timezone.now', return_value=retry_at + timedelta(seconds=1)):
+                call_command('run_jobs', once=True, stdout=io.StringIO())
+            follow_up.refresh_from_db()
+            self.assertEqual(follow_up.status, 'SUCCEEDED')
+            self.assertEqual(set(Notification.objects.values_list('status', flat=True)), {'SENT'})
+            self.assertFalse(Job.objects.filter(status='QUEUED').exists())
+
+    def test_channel_that_fails_to_open_is_retried(self):
+        notifications.queue_bill_ready(date(2025, 2, 1))
+        with patch.object(notifications.FileBackend, 'open', side_effect=ConnectionError('gateway down')):
+            counts = notifications.dispatch()
+            self.assertEqual((counts['SENT'], counts['RETRY']), (1, 2))          # e-mail still goes
+            self.assertEqual(set(Notification.objects.filter(channel='SMS').values_list(
+                'status', 'attempts', 'last_error')), {('QUEUED', 1, 'ConnectionError: gateway down')})
+
+            Notification.objects.filter(channel='SMS').update(
+                attempts=notifications.MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+            self.assertEqual(notifications.dispatch()['FAILED'], 2)
+        self.assertFalse(Notification.objects.filter(status='SENDING').exists())
+
+    def test_stale_reminders_are_cancelled(self):
+        bill = Bill.objects.get(subscriber=self.subs[1], billing_month=date(2025, 2, 1))
+        self.assertEqual(notifications.queue_due_soon(days=5, today=date(2025, 2, 12)), 3)
+        process_payment(bill, bill.balance, 'OR-0002', 'Cashier')
+        notice = issue_disconnection_notice(bill, date.today() + timedelta(days=5), 'Cashier')
+        self.assertEqual(notifications.queue_cutoffs(), 1)
+        DisconnectionNotice.objects.filter(pk=notice.pk).update(status='CANCELLED')
+
+        counts = notifications.dispatch()
+        self.assertEqual((counts['SENT'], counts['CANCELLED']), (2, 2))     # sub 1's reminder and cutoff
+
+    def test_throttle_spaces_sends(self):
+        clock, slept = [10.0], []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            clock[0] += seconds
+
+        throttle = notifications.Throttle(4, clock=lambda: clock[0], sleep=sleep)
+        for _ in range(3):
+            throttle.wait()
+        clock[0] += 1.0                                  # idle: the next send goes at once
+        throttle.wait()
+        self.assertEqual(slept, [0.25, 0.25])
+
+    def test_run_billing_queues_and_starts_a_send_job(self):
+        for sub in self.subs:
+            MeterReading.objects.create(subscriber=sub, billing_month=date(2025, 3, 1),
+                                        previous_reading=30, current_reading=41)
+        out = io.StringIO()
+        call_command('run_billing', billing_month='2025-03-01', stdout=out)
+        self.assertIn('3 bill-ready messages queued', out.getvalue())
+        self.assertEqual(Job.objects.filter(command='send_notifications', status='QUEUED').count(), 1)
+
+        call_command('queue_notifications', kind=['bills'], billing_month='2025-03-01', stdout=io.StringIO())
+        self.assertEqual(Job.objects.filter(command='send_notifications').count(), 1)
+
+
+# ══════════════════════════════════════════════════════════
+#   Estimate reconciliation — an actual reading below the
+#   estimated register credits what the estimates over-billed
+# ══════════════════════════════════════════════════════════
+class ReconcileEstimateTests(TestCase):
+    def setUp(self):
+        WaterRate.objects.create(classification='PRIVATE', minimum_charge=Decimal('150.00'),
+                                 rate_per_cubic_m=Decimal('15.50'), effective_date=date(2025, 1, 1))
+        self.sub = Subscriber.objects.create(
+            account_number='MHN-2025-0100', last_name='Estimate', first_name='Sub',
+            address='Somewhere', barangay='Poblacion', meter_number='MTR-100',
+            service_address='Somewhere', connection_date=date(2024, 1, 1),
+        )
+        self.add(1, 0, 10)
+
+    def add(self, month, prev, curr, estimated=False, billed=True):
+        reading = MeterReading.objects.create(
+            subscriber=self.sub, billing_month=date(2025, month, 1),
+            previous_reading=prev, current_reading=curr, is_estimated=estimated,
+        )
+        if billed:
+            generate_bill(self.sub, reading, date(2025, month, 15), date(2025, month, 20))
+        return reading
+
+    def reconcile(self, month, prev, curr):
+        reading = self.add(month, prev, curr, billed=False)
+        credits = reconcile_estimated_readings([reading])
+        reading.refresh_from_db()
+        self.assertEqual(reading.previous_reading, reading.current_reading)
+        return reading, sum((-c.amount for c in credits), Decimal('0.00'))
+
+    def test_one_estimated_month(self):
+        self.add(2, 10, 25, estimated=True)                              # billed 15 cu.m: 227.50
+        reading, credit = self.reconcile(3, 25, 20)
+        self.assertEqual(credit, Decimal('77.50'))                       # 10 cu.m was 150.00
+        self.assertIn('[Reconciled 5 cu.m over-estimate]', reading.remarks)
+
+    def test_several_estimated_months(self):
+        self.add(2, 10, 25, estimated=True)
+        self.add(3, 25, 40, estimated=True)
+        _, credit = self.reconcile(4, 40, 22)                           # 18 cu.m over
+        self.assertEqual(credit, Decimal('77.50') + Decimal('46.50'))   # March 15 → 0, February 15 → 12
+
+    def test_unbilled_estimates_are_not_credited(self):
+        self.add(2, 10, 25, estimated=True)
+        self.add(3, 25, 40, estimated=True, billed=False)
+        _, credit = self.reconcile(4, 40, 22)                           # March takes 15 of the 18
+        self.assertEqual(credit, Decimal('46.50'))
+
+        OtherCharge.objects.all().delete()
+        self.sub.meter_readings.filter(billing_month__gte=date(2025, 2, 1)).delete()
+        self.add(2, 10, 25, estimated=True, billed=False)
+        _, credit = self.reconcile(3, 25, 20)
+        self.assertEqual(credit, Decimal('0.00'))
+        self.assertFalse(OtherCharge.objects.exists())
+
+    def test_next_bill_deducts_the_credit(self):
+        self.add(2, 10, 25, estimated=True)
+        reading, _ = self.reconcile(3, 25, 20)
+        bill = generate_bill(self.sub, reading, date(2025, 3, 15), date(2025, 3, 20))
+        self.assertEqual(bill.other_charges, Decimal('-77.50'))
+        self.assertEqual(bill.total_amount_due, bill.basic_charge + bill.arrears - Decimal('77.50'))
+        self.assertEqual(OtherCharge.objects.get(charge_type='ESTIMATE_ADJ').bill, bill)
+
+    def test_reading_is_not_saved_when_reconcile_fails(self):
+        self.add(2, 10, 25, estimated=True)
+        User.objects.create_user('reader', password='pw')
+        self.client.login(username='reader', password='pw')
+        with patch.object(views, 'reconcile_estimated_readings', side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.client.post(f'/readings/{self.sub.pk}/add/', {
+                'subscriber': self.sub.pk, 'billing_month': '2025-03-01', 'reading_date': '2025-03-05',
+                'previous_reading': '25', 'current_reading': '20',
+            })
+        self.assertFalse(self.sub.meter_readings.filter(billing_month=date(2025, 3, 1)).exists())
+
+
+# ══════════════════════════════════════════════════════════
+#   Handheld sync upload — idempotent by client_id, zero
+#   readings kept, malformed rows rejected instead of crashing
+# ══════════════════════════════════════════════════════════
+class SyncUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.subs = make_billing_data()
+        User.objects.create_user('reader', password='pw')
+
+    def upload(self, *readings):
+        auth = 'Basic ' + base64.b64encode(b'reader:pw').decode()
+        response = self.client.post('/api/sync/upload/', json.dumps({'readings': list(readings)}),
+                                    content_type='application/json', HTTP_AUTHORIZATION=auth)
+        return response.status_code, response.json()
+
+    def row(self, client_id, sub, **values):
+        return {'client_id': client_id, 'meter_number': sub.meter_number, 'billing_month': '2025-03-01',
+                'current_reading': '41', **values}
+
+    def test_reupload_is_idempotent(self):
+        rows = [self.row('dev1-1', self.subs[0]), self.row('dev1-2', self.subs[1])]
+        self.assertEqual(self.upload(*rows), (200, {'accepted': ['dev1-1', 'dev1-2'], 'rejected': []}))
+        self.assertEqual(self.upload(*rows), (200, {'accepted': ['dev1-1', 'dev1-2'], 'rejected': []}))
+        self.assertEqual(MeterReading.objects.filter(billing_month=date(2025, 3, 1)).count(), 2)
+
+        _, result = self.upload(self.row(7, self.subs[2]), self.row(7, self.subs[2]))
+        self.assertEqual(result['accepted'], ['7'])
+        _, result = self.upload(self.row(7, self.subs[2]))
+        self.assertEqual(result, {'accepted': ['7'], 'rejected': []})
+
+    def test_zero_readings_are_kept(self):
+        _, result = self.upload(self.row('z1', self.subs[0], current_reading=30),
+                                self.row('z2', self.subs[1], previous_reading=0, current_reading=0))
+        self.assertEqual(result['rejected'], [])
+        unchanged = MeterReading.objects.get(client_id='z1')
+        self.assertEqual((unchanged.previous_reading, unchanged.volume_consumed), (30, 0))
+        reset = MeterReading.objects.get(client_id='z2')
+        self.assertEqual((reset.previous_reading, reset.current_reading), (0, 0))
+
+    def test_malformed_rows_are_rejected(self):
+        Subscriber.objects.filter(pk=self.subs[2].pk).update(meter_number='555')
+        status, result = self.upload(
+            self.row('m1', self.subs[0], current_reading='abc'),
+            self.row('m2', self.subs[1], current_reading='NaN'),
+            {**self.row('m3', self.subs[0]), 'meter_number': 404},
+            {**self.row('m4', self.subs[2]), 'meter_number': 555, 'remarks': 12},
+            self.row('m5', self.subs[0], billing_month='March'),
+            {'meter_number': 'MTR-0', 'current_reading': '41'},
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(result['accepted'], ['m4'])
+        self.assertEqual({r['client_id']: r['error'] for r in result['rejected']}, {
+            'm1': 'Reading is not a valid number.', 'm2': 'Reading is not a valid number.',
+            'm3': 'Unknown meter number.', 'm5': 'Invalid billing_month.', '': 'Missing client_id.',
+        })
+        self.assertEqual(MeterReading.objects.get(client_id='m4').remarks, '12')
+
+        self.assertEqual(self.upload('not a row')[0], 400)
+
+
+# ══════════════════════════════════════════════════════════
+#   Route books — printable/CSV sheets from the latest-reading
+#   pointer, which follows inserts and deletes
+# ══════════════════════════════════════════════════════════
+class RouteBookTests(TestCase):
+    def setUp(self):
+        self.subs = make_billing_data()
+        self.client.force_login(User.objects.create_user('reader', password='pw'))
+
+    def test_page_and_csv(self):
+        response = self.client.get('/readings/route-book/', {'barangay': 'Poblacion', 'month': '2025-03'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['billing_month'], date(2025, 3, 1))
+        self.assertEqual(len(response.context['rows']), 3)
+
+        response = self.client.get('/readings/route-book/',
+                                   {'barangay': 'Poblacion', 'month': '2025-03', 'export': 'csv'})
+        rows = list(csv.reader(io.StringIO(response.content.decode())))
+        self.assertEqual(rows[0][:7], ['account_number', 'name', 'service_address', 'meter_number',
+                                       'meter_size', 'previous_reading', 'previous_month'])
+        self.assertEqual([r[5:8] for r in rows[1:]], [['30.00', '2025-02', '15.00']] * 3)
+
+    def test_bad_month_falls_back_to_this_month(self):
+        for month in ['2025-13', 'March', '2025']:
+            response = self.client.get('/readings/route-book/', {'barangay': 'Poblacion', 'month': month})
+            self.assertEqual(response.status_code, 200, month)
+            self.assertEqual(response.context['billing_month'], date.today().replace(day=1))
+
+    def test_latest_reading_pointer_follows_inserts_and_deletes(self):
+        sub = self.subs[0]
+        february = sub.meter_readings.get(billing_month=date(2025, 2, 1))
+        sub.refresh_from_db()
+        self.assertEqual(sub.latest_reading_id, february.pk)
+
+        MeterReading.objects.create(subscriber=sub, billing_month=date(2024, 12, 1),
+                                    previous_reading=0, current_reading=0)
+        sub.refresh_from_db()
+        self.assertEqual(sub.latest_reading_id, february.pk)            # an older reading leaves it
+
+        february.delete()
+        sub.refresh_from_db()
+        self.assertEqual(sub.latest_reading.billing_month, date(2025, 1, 1))
+
+        MeterReading.objects.filter(subscriber=sub).delete()
+        sub.refresh_from_db()
+        self.assertIsNone(sub.latest_reading_id)
+
+        self.subs[1].delete()
+        self.assertFalse(Subscriber.objects.filter(pk=self.subs[1].pk).exists())
+
+
+# ══════════════════════════════════════════════════════════
+#   Anomaly scan — backwards registers are flagged, settled
+#   over-estimates are not, and flagged readings wait for review
+# ══════════════════════════════════════════════════════════
+class AnomalyScanTests(TestCase):
+    def setUp(self):
+        self.subs  = make_billing_data()
+        self.month = date(2025, 3, 1)
+        swapped, misread, estimated = self.subs
+        MeterReading.objects.create(subscriber=swapped, billing_month=self.month,
+                                    previous_reading=30, current_reading=5)
+        MeterReading.objects.create(subscriber=misread, billing_month=self.month,
+                                    previous_reading=2, current_reading=10)
+#         February was estimated too high; March's actual reading settles it
+        MeterReading.objects.filter(subscriber=estimated, billing_month=date(2025, 2, 1)).update(is_estimated=True)
+        reading = MeterReading.objects.create(subscriber=estimated, billing_month=self.month,
+                                              previous_reading=30, current_reading=25)
+        reconcile_estimated_readings([reading])
+
+    def test_rollover_skips_reconciled_readings(self):
+        summary = scan_reading_anomalies(self.month)
+        self.assertEqual(summary['ROLLOVER'], 2)
+        flagged = set(ReadingFlag.objects.filter(flag_type='ROLLOVER').values_list('subscriber_id', flat=True))
+        self.assertEqual(flagged, {self.subs[0].pk, self.subs[1].pk})
+
+        ReadingFlag.objects.filter(subscriber=self.subs[1]).update(status='CLEARED')
+        out = io.StringIO()
+        call_command('scan_anomalies', billing_month='2025-03-01', stdout=out)
+        self.assertIn('Done. 1 readings flagged for March 2025.', out.getvalue())
+
+    def test_billing_holds_flagged_readings_unless_included(self):
+        scan_reading_anomalies(self.month)
+        out = io.StringIO()
+        call_command('run_billing', billing_month='2025-03-01', no_notify=True, stdout=out)
+        self.assertIn('2 readings held for review', out.getvalue())
+        self.assertEqual(list(Bill.objects.filter(billing_month=self.month).values_list('subscriber_id', flat=True)),
+                         [self.subs[2].pk])
+
+        call_command('run_billing', billing_month='2025-03-01', include_flagged=True, no_notify=True,
+                     stdout=io.StringIO())
+        self.assertEqual(Bill.objects.filter(billing_month=self.month).count(), 3)
+
+
+# ══════════════════════════════════════════════════════════
+#   Reading import — route sheets in chunks; duplicates and
+#   bad rows are reported, a racing upload doesn't fail the batch
+# ══════════════════════════════════════════════════════════
+class ReadingImportTests(TestCase):
+    def setUp(self):
+        self.subs  = make_billing_data()
+        self.month = date(2025, 3, 1)
+        self.client.force_login(User.objects.create_user('reader', password='pw'))
+
+    def upload(self, text):
+        sheet = io.BytesIO(text.encode())
+        sheet.name = 'route.csv'
+        return self.client.post('/readings/import/', {'billing_month': '2025-03-01', 'csv_file': sheet,
+                                                      'reader_name': 'Juan'})
+
+    def test_good_sheet(self):
+        response = self.upload('meter_number,current_reading,reading_date\n'
+                               'MTR-0,41,2025-03-04\nMTR-1,30\nMTR-2,35.5\n')
+        self.assertEqual(response.context['report']['created'], 3)
+        reading = MeterReading.objects.get(subscriber=self.subs[0], billing_month=self.month)
+        self.assertEqual((reading.previous_reading, reading.volume_consumed, reading.reader_name),
+                         (30, 11, 'Juan'))
+        self.assertEqual(reading.reading_date, date(2025, 3, 4))
+        self.subs[2].refresh_from_db()
+        self.assertEqual(self.subs[2].latest_reading.current_reading, Decimal('35.5'))
+
+    def test_duplicates_and_bad_rows_are_reported(self):
+        MeterReading.objects.create(subscriber=self.subs[0], billing_month=self.month,
+                                    previous_reading=30, current_reading=40)
+        report = import_meter_readings(csv.DictReader(io.StringIO(
+            'meter_number,current_reading,reading_date\n'
+            'MTR-0,41,\n'              # already read this month
+            'MTR-1,41,\n'
+            'MTR-1,42,\n'              # twice in the sheet
+            'MTR-2,abc,\n'
+            'MTR-9,41,\n'
+            'MTR-2,20,\n'              # below February's 30
+            'MTR-2,41,March\n'
+        )), self.month, chunk_size=3)
+        self.assertEqual((report['rows'], report['created']), (7, 1))
+        self.assertEqual([(e['row'], e['error'].split()[0]) for e in report['errors']], [
+            (2, 'A'), (4, 'Meter'), (5, 'Reading'), (6, 'Unknown'), (7, 'Current'), (8, 'Invalid')])
+
+    def test_racing_upload_reports_the_conflict(self):
+        MeterReading.objects.create(subscriber=self.subs[1], billing_month=self.month,
+                                    previous_reading=30, current_reading=39)
+        filter = MeterReading.objects.filter
+
+        def checked_before_the_other_upload(*args, **kwargs):
+            if 'subscriber__in' in kwargs:         # the chunk's "already read" check misses it
+                return MeterReading.objects.none()
+            return filter(*args, **kwargs)
+
+        with patch.object(MeterReading.objects, 'filter', side_effect=checked_before_the_other_upload):
+            report = import_meter_readings(
+                [{'meter_number': f'MTR-{i}', 'current_reading': '41'} for i in range(3)], self.month)
+        self.assertEqual(report['created'], 2)
+        self.assertEqual([(e['meter_number'], e['error']) for e in report['errors']],
+                         [('MTR-1', 'A reading already exists for March 2025.')])
+        self.assertEqual(MeterReading.objects.get(subscriber=self.subs[1], billing_month=self.month)
+                         .current_reading, 39)
@@ -0,0 +1,145 @@
+"""
+Live collection ticker for the dashboard (Server-Sent Events).
+
+process_payment and apply_penalty report to the module-level `ticker`
+once their transaction commits. The ticker keeps today's totals in
+memory: collected amount, payment count per cashier, and the number of
+overdue bills. It pushes each change to every open stream, so a stream
+costs one asyncio queue and no polling. A new stream first gets a
+snapshot of the totals. The snapshot is loaded from the database once,
+then served from memory until SNAPSHOT_TTL passes or the date changes.
+"Today" is the local business date (settings.TIME_ZONE), the date
+process_payment stamps on the ledger.
+
+The totals are per process. With several server processes, each one sees
+only its own payments live, and the periodic reload picks up the rest.
+"""
+import asyncio
+import threading
+import time
+from decimal import Decimal
+
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from .models import Bill, Ledger
+
+SNAPSHOT_TTL = 300       # seconds before the snapshot is reloaded from the database
+KEEPALIVE    = 15        # seconds between keep-alive comments on an idle stream
+QUEUE_SIZE   = 100       # events buffered per stream before it is told to resync
+
+
+def load_totals(today):
+    payments = Ledger.objects.filter(entry_type='PAYMENT', entry_date=today)
+    cashiers = {
+        row['received_by'] or '—': {'count': row['count'], 'total': row['total']}
+        for row in payments.values('received_by').annotate(count=Count('id'), total=Sum('credit'))
+                           .order_by('received_by')
+    }
+    return {
+        'date':       today,
+        'total':      sum((c['total'] for c in cashiers.values()), Decimal('0.00')),
+        'count':      sum(c['count'] for c in cashiers.values()),
+        'cashiers':   cashiers,
+        'overdue':    Bill.objects.filter(status='OVERDUE').count(),
+        'last_id':    payments.aggregate(m=Max('id'))['m'] or 0,
+        'loaded_at':  time.monotonic(),
+    }
+
+
+def as_event(totals):
+    return {
+        'date':     totals['date'].isoformat(),
+        'total':    str(totals['total']),
+        'count':    totals['count'],
+        'cashiers': {name: {'count': c['count'], 'total': str(c['total'])}
+                     for name, c in totals['cashiers'].items()},
+        'overdue':  totals['overdue'],
+    }
+
+
+# ══════════════════════════════════════════════════════════
+#   CollectionTicker — today's totals plus the open streams.
+#   Posting code calls it from any thread; each stream's queue
+#   is fed on the event loop that owns it.
+# ══════════════════════════════════════════════════════════
+class CollectionTicker:
+    def __init__(self):
+        self.lock    = threading.Lock()
+        self.totals  = None
+        self.streams = {}                    # queue → its event loop
+
+    def stale(self):
+        totals = self.totals
+        return (totals is None or totals['date'] != timezone.localdate()
+                or time.monotonic() - totals['loaded_at'] > SNAPSHOT_TTL)
+
+    def snapshot(self):
+        """Current totals as an event dict; at most one query batch per SNAPSHOT_TTL."""
+        if self.stale():
+            totals = load_totals(timezone.localdate())
+            with self.lock:
+                self.totals = totals
+        with self.lock:
+            return as_event(self.totals)
+
+    # ── fed by the posting path (after commit) ────────────────
+    def payment_posted(self, entry, was_overdue):
+        with self.lock:
+            totals = self.totals
+            if totals is None or totals['date'] != entry.entry_date or entry.pk <= totals['last_id']:
+                return
+            cashier = totals['cashiers'].setdefault(entry.received_by or '—',
+                                                    {'count': 0, 'total': Decimal('0.00')})
+            cashier['count'] += 1
+            cashier['total'] += entry.credit
+            totals['total']  += entry.credit
+            totals['count']  += 1
+            totals['last_id'] = entry.pk
+            if was_overdue:
+                totals['overdue'] -= 1
+            event = {'type': 'payment', 'amount': str(entry.credit),
+                     'cashier': entry.received_by or '—', 'or_number': entry.or_number,
+                     **as_event(totals)}
+        self.publish(event)
+
+    def overdue_changed(self, delta):
+        with self.lock:
+            if self.totals is None:
+                return
+            self.totals['overdue'] += delta
+            event = {'type': 'overdue', 'overdue': self.totals['overdue']}
+        self.publish(event)
+
+    # ── streams ────────────────────────────────────────────────
+    def subscribe(self):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        with self.lock:
+            self.streams[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self.lock:
+            self.streams.pop(queue, None)
+
+    def publish(self, event):
+        with self.lock:
+            streams = list(self.streams.items())
+        for queue, loop in streams:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:                 # loop already closed
+                self.unsubscribe(queue)
+
+    @staticmethod
+    def _deliver(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+#             a stream this far behind gets one fresh snapshot instead of the backlog
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({'type': 'resync'})
+
+
+ticker = CollectionTicker()
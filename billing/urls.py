@@ -5,6 +5,7 @@ urlpatterns = [
  
 #     ── Dashboard ─────────────────────────────────────────
     path('',                                views.dashboard,              name='dashboard'),
+    path('dashboard/ticker/',               views.collection_ticker,      name='collection-ticker'),
  
 #     ── Subscribers ───────────────────────────────────────
     path('subscribers/',                    views.subscriber_list,        name='subscriber-list'),
@@ -14,9 +15,12 @@ urlpatterns = [
 
     path('subscribers/<int:pk>/edit/',      views.subscriber_edit,        name='subscriber-edit'),
     path('subscribers/<int:pk>/ledger/',    views.subscriber_ledger,      name='subscriber-ledger'),
+    path('subscribers/<int:pk>/statement/', views.subscriber_statement,   name='subscriber-statement'),
  
 #     ── Meter Readings ────────────────────────────────────
     path('readings/<int:subscriber_pk>/add/',  views.reading_create,     name='reading-create'),
+    path('readings/import/',                views.reading_import,         name='reading-import'),
+    path('readings/route-book/',            views.route_book,             name='route-book'),
  
 #     ── Bills ─────────────────────────────────────────────
     path('bills/',                          views.bill_list,              name='bill-list'),
@@ -30,7 +34,20 @@ urlpatterns = [
     path('ledger/',                         views.general_ledger,         name='general-ledger'),
     path('ledger/<int:pk>/adjust/',         views.ledger_adjustment,      name='ledger-adjustment'),
 
+#     ── Handheld Sync API ─────────────────────────────────
+    path('api/sync/download/',              views.sync_download,          name='sync-download'),
+    path('api/sync/upload/',                views.sync_upload,            name='sync-upload'),
+
+#     ── Background Jobs ───────────────────────────────────
+    path('jobs/',                           views.job_list,               name='job-list'),
+    path('jobs/<int:pk>/',                  views.job_detail,             name='job-detail'),
+    path('jobs/<int:pk>/status/',           views.job_status,             name='job-status'),
+    path('jobs/<int:pk>/cancel/',           views.job_cancel,             name='job-cancel'),
+
 #     ── Reports ───────────────────────────────────────────
     path('reports/collection/',             views.collection_report,      name='collection-report'),
+    path('reports/cashier/',                views.cashier_closing,        name='cashier-closing'),
     path('reports/delinquent/',             views.delinquent_report,      name='delinquent-report'),
+    path('reports/delinquent/aging/',       views.aging_snapshot,         name='aging-snapshot'),
+    path('reports/trends/',                 views.trends_report,          name='trends-report'),
 ]
@@ -1,52 +1,180 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
+from django.urls import reverse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.text import slugify
+from django.contrib.auth import authenticate
+from django.core import signing
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET, require_POST
 from django.contrib import messages
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, Q
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Sum, Count, F, Q, OuterRef, Subquery, DecimalField
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from datetime import date
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from datetime import date, datetime
 from decimal import Decimal
+import asyncio
+import base64
+import csv
+import gzip
+import io
+import json
  
 from .models import (
     Subscriber, MeterReading, Bill,
-    Ledger, OtherCharge, DisconnectionNotice
+    Ledger, OtherCharge, DisconnectionNotice, Job, JobSchedule,
+    ReceivableAgingSnapshot, MonthlyBillingSummary, HighWaterMark, CashierClosing
 )
 from .forms import (
     SubscriberForm, MeterReadingForm,
-    PaymentForm, OtherChargeForm, BillingPeriodForm
+    PaymentForm, OtherChargeForm, BillingPeriodForm,
+    ReadingImportForm, JobForm
 )
 from .services import (
     generate_bill, process_payment,
-    apply_penalty, issue_disconnection_notice
+    apply_penalty, issue_disconnection_notice,
+    import_meter_readings, build_route_book, write_route_book_csv,
+    build_sync_package, accept_synced_readings, reconcile_estimated_readings,
+    month_range, months_before
 )
+from . import aging, cashiering, notices, notifications, rollups
+from .instrumentation import current_metrics
+from .jobs import JOB_COMMANDS, cancel, enqueue
+from .statements import build_statements
+from .ticker import ticker, KEEPALIVE
  
  
+# ══════════════════════════════════════════════════════════
+#   Async report views — the dashboard and the ledger and
+#   collection reports are async views whose independent
+#   queries go through gather_queries. On PostgreSQL each
+#   query runs in a worker thread on its own connection, and
+#   the page is rendered once they are all in: the request
+#   waits about as long as its slowest query instead of the
+#   sum. The worker connections report to the request's
+#   metrics, so Server-Timing and the query budgets count
+#   every query.
+#   On SQLite (the shipped profiles, WAL included) the queries
+#   run one after another on the request's connection. WAL
+#   allows the concurrent reads, but they gained nothing: on a
+#   5,000-subscriber, 3-year dataset the collection report and
+#   general ledger took the same time either way, and the
+#   dashboard got slower (18 ms → 32 ms) from opening a tuned
+#   connection per query.
+# ══════════════════════════════════════════════════════════
+SEQUENTIAL_VENDORS = {'sqlite'}
+
+
+def _on_own_connection(query, metrics):
+    def run():
+        try:
+            if metrics is None:
+                return query()
+#             the new connection's set-up statements are not the view's queries
+            connection.ensure_connection()
+            with connection.execute_wrapper(metrics.record_query):
+                return query()
+        finally:
+            close_old_connections()
+    return run
+
+
+async def gather_queries(**queries):
+    """
+    Run zero-argument callables, concurrently outside SQLite; returns {name: result}.
+    Each callable must evaluate its queryset (list(), count(), aggregate()).
+    Inside a transaction (ATOMIC_REQUESTS, tests) they run in turn on the
+    request's connection, since other connections cannot see its writes.
+    """
+    sequential = await sync_to_async(
+        lambda: connection.in_atomic_block or connection.vendor in SEQUENTIAL_VENDORS)()
+    if sequential:
+        return await sync_to_async(lambda: {name: q() for name, q in queries.items()})()
+    metrics = current_metrics()
+    results = await asyncio.gather(*(
+        sync_to_async(_on_own_connection(q, metrics), thread_sensitive=False)() for q in queries.values()
+    ))
+    return dict(zip(queries, results))
+
+
 # ══════════════════════════════════════════════════════════
 #   VIEW 1 — dashboard
 # ══════════════════════════════════════════════════════════
 @login_required
-def dashboard(request):
+async def dashboard(request):
     today = date.today()
-    context = {
-        'total_subscribers':   Subscriber.objects.count(),
-        'active_subscribers':  Subscriber.objects.filter(status='ACTIVE').count(),
-        'unpaid_bills':        Bill.objects.filter(status__in=['UNPAID','PARTIAL','OVERDUE']).count(),
-        'overdue_bills':       Bill.objects.filter(status='OVERDUE').count(),
-        'collection_today':    (Ledger.objects.filter(
-                                   entry_type='PAYMENT',
-                                   entry_date=today
-                               ).aggregate(Sum('credit'))['credit__sum'] or Decimal('0')),
-        'collection_month':    (Ledger.objects.filter(
-                                   entry_type='PAYMENT',
-                                   entry_date__year=today.year,
-                                   entry_date__month=today.month
-                               ).aggregate(Sum('credit'))['credit__sum'] or Decimal('0')),
-        'recent_payments':     Ledger.objects.filter(
-                                   entry_type='PAYMENT'
-                               ).select_related('subscriber').order_by('-entry_date')[:10],
-        'pending_notices':     DisconnectionNotice.objects.filter(
-                                   status__in=['PENDING','DELIVERED']).count(),
-    }
-    return render(request, 'billing/dashboard.html', context)
+    month_start, month_end = month_range(today.year, today.month)
+    payments = Ledger.objects.filter(entry_type='PAYMENT')
+    context = await gather_queries(
+        total_subscribers  = Subscriber.objects.count,
+        active_subscribers = Subscriber.objects.filter(status='ACTIVE').count,
+        unpaid_bills       = Bill.objects.filter(status__in=['UNPAID','PARTIAL','OVERDUE']).count,
+        overdue_bills      = Bill.objects.filter(status='OVERDUE').count,
+        collection_today   = lambda: (payments.filter(
+                                 entry_date=today
+                             ).aggregate(Sum('credit'))['credit__sum'] or Decimal('0')),
+        collection_month   = lambda: (payments.filter(
+                                 entry_date__gte=month_start,
+                                 entry_date__lt=month_end
+                             ).aggregate(Sum('credit'))['credit__sum'] or Decimal('0')),
+        recent_payments    = lambda: list(payments.select_related('subscriber')
+                                          .order_by('-entry_date')[:10]),
+        pending_notices    = DisconnectionNotice.objects.filter(
+                                 status__in=['PENDING','DELIVERED']).count,
+    )
+    return await sync_to_async(render)(request, 'billing/dashboard.html', context)
+ 
+ 
+# ══════════════════════════════════════════════════════════
+#   VIEW 1b — collection ticker (Server-Sent Events)
+#   A snapshot of today's totals, then one event per posted
+#   payment or new overdue bill. Under WSGI a stream would tie
+#   up a worker thread, so there the snapshot is sent alone and
+#   the browser reconnects every KEEPALIVE seconds.
+# ══════════════════════════════════════════════════════════
+def _sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+@login_required
+async def collection_ticker(request):
+    async def live():
+        queue = ticker.subscribe()
+        try:
+            yield _sse('snapshot', await sync_to_async(ticker.snapshot)())
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), KEEPALIVE)
+                except asyncio.TimeoutError:
+                    if ticker.stale():
+                        yield _sse('snapshot', await sync_to_async(ticker.snapshot)())
+                    else:
+                        yield ': keepalive\n\n'
+                    continue
+                if event['type'] == 'resync':
+                    yield _sse('snapshot', await sync_to_async(ticker.snapshot)())
+                else:
+                    yield _sse(event['type'], event)
+        finally:
+            ticker.unsubscribe(queue)
+
+    async def once():
+        yield f'retry: {KEEPALIVE * 1000}\n'
+        yield _sse('snapshot', await sync_to_async(ticker.snapshot)())
+
+    response = StreamingHttpResponse(live() if isinstance(request, ASGIRequest) else once(),
+                                     content_type='text/event-stream')
+    response['Cache-Control']     = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'          # nginx: pass events through unbuffered
+    return response
  
  
 # ══════════════════════════════════════════════════════════
@@ -69,6 +197,17 @@ def subscriber_list(request):
     if cls:  qs = qs.filter(classification=cls)
     if stat: qs = qs.filter(status=stat)
  
+#     Balance and latest bill per row as subqueries, not per-row queries in the template
+    ledger_balance = Ledger.objects.filter(subscriber=OuterRef('pk')).values(
+        'subscriber').annotate(net=Sum('debit') - Sum('credit')).values('net')
+    latest_bill = Bill.objects.filter(subscriber=OuterRef('pk')).order_by(
+        '-billing_month').values('pk')[:1]
+    qs = qs.annotate(
+        balance      = Coalesce(Subquery(ledger_balance), Decimal('0'),
+                                output_field=DecimalField(max_digits=12, decimal_places=2)),
+        last_bill_id = Subquery(latest_bill),
+    )
+ 
     return render(request, 'billing/subscriber_list.html', {
         'subscribers': qs,
         'q': q, 'cls': cls, 'stat': stat,
@@ -114,19 +253,73 @@ def subscriber_edit(request, pk):
  
  
 # ══════════════════════════════════════════════════════════
-#   VIEW 6 — Meter Reading (record field reading)
+#   VIEW 6 — Meter Reading (record field reading / bulk import)
 # ══════════════════════════════════════════════════════════
 @login_required
 def reading_create(request, subscriber_pk):
-    sub  = get_object_or_404(Subscriber, pk=subscriber_pk)
+    sub  = get_object_or_404(Subscriber.objects.select_related('latest_reading'), pk=subscriber_pk)
     form = MeterReadingForm(request.POST or None, initial={'subscriber': sub})
  
     if form.is_valid():
-        reading = form.save()
+        with transaction.atomic():
+            reading  = form.save()
+            credited = reconcile_estimated_readings([reading])
+        if credited:
+            messages.info(request, 'Previous estimate was too high; a credit was added for the next bill.')
         messages.success(request, f'Reading saved: {reading.volume_consumed} cu.m consumed.')
         return redirect('generate-bill', reading_pk=reading.pk)
  
-    return render(request, 'billing/reading_form.html', {'form': form, 'sub': sub})
+    return render(request, 'billing/reading_form.html', {
+        'form': form, 'sub': sub,
+        'recent_readings': sub.meter_readings.all()[:5] if sub.latest_reading_id else [],
+    })
+ 
+ 
+@login_required
+def reading_import(request):
+    form   = ReadingImportForm(request.POST or None, request.FILES or None)
+    report = None
+
+    if form.is_valid():
+        upload = io.TextIOWrapper(form.cleaned_data['csv_file'].file, encoding='utf-8-sig')
+        report = import_meter_readings(
+            csv.DictReader(upload),
+            billing_month = form.cleaned_data['billing_month'],
+            reader_name   = (form.cleaned_data['reader_name']
+                             or request.user.get_full_name() or request.user.username),
+        )
+        if report['created']:
+            messages.success(request, f'{report["created"]} readings imported.')
+        if report['errors']:
+            messages.warning(request, f'{len(report["errors"])} rows were rejected.')
+
+    return render(request, 'billing/reading_import.html', {'form': form, 'report': report})
+
+
+@login_required
+def route_book(request):
+    barangay = request.GET.get('barangay', '')
+    try:
+        billing_month = datetime.strptime(request.GET.get('month', ''), '%Y-%m').date()
+    except ValueError:
+        billing_month = date.today().replace(day=1)
+    month = f'{billing_month:%Y-%m}'
+ 
+    rows = build_route_book(barangay, billing_month) if barangay else Subscriber.objects.none()
+ 
+    if barangay and request.GET.get('export') == 'csv':
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = (
+            f'attachment; filename="route-book-{slugify(barangay)}-{month}.csv"')
+        write_route_book_csv(response, rows)
+        return response
+ 
+    return render(request, 'billing/route_book.html', {
+        'rows': rows, 'barangay': barangay, 'month': month,
+        'billing_month': billing_month,
+        'barangays': Subscriber.objects.order_by('barangay')
+                         .values_list('barangay', flat=True).distinct(),
+    })
  
  
 # ══════════════════════════════════════════════════════════
@@ -169,7 +362,8 @@ def bill_list(request):
  
     if month:
         y, m  = map(int, month.split('-'))
-        qs    = qs.filter(billing_month__year=y, billing_month__month=m)
+        start, end = month_range(y, m)
+        qs    = qs.filter(billing_month__gte=start, billing_month__lt=end)
     if status:
         qs    = qs.filter(status=status)
  
@@ -203,14 +397,24 @@ def record_payment(request, pk):
     form = PaymentForm(request.POST or None)
  
     if form.is_valid():
-        process_payment(
-            bill        = bill,
-            amount_paid = form.cleaned_data['amount_paid'],
-            or_number   = form.cleaned_data['or_number'],
-            received_by = form.cleaned_data['received_by'],
-        )
-        messages.success(request, f'Payment of P{form.cleaned_data["amount_paid"]} recorded.')
-        return redirect('bill-detail', pk=bill.pk)
+        try:
+            process_payment(
+                bill        = bill,
+                amount_paid = form.cleaned_data['amount_paid'],
+                or_number   = form.cleaned_data['or_number'],
+                received_by = form.cleaned_data['received_by'],
+            )
+        except (ValueError, IntegrityError) as e:
+#             process_payment changed the bill in memory before rolling back
+            bill.refresh_from_db()
+            if isinstance(e, IntegrityError):
+#                 another cashier posted the same OR since the form was checked
+                form.add_error('or_number', 'This OR number has just been issued.')
+            else:
+                form.add_error(None, str(e))
+        else:
+            messages.success(request, f'Payment of P{form.cleaned_data["amount_paid"]} recorded.')
+            return redirect('bill-detail', pk=bill.pk)
  
     return render(request, 'billing/payment_form.html', {'form': form, 'bill': bill})
  
@@ -218,14 +422,28 @@ def record_payment(request, pk):
 # ══════════════════════════════════════════════════════════
 #   VIEW 11 — Print Billing Notice (HTML printable page)
 # ══════════════════════════════════════════════════════════
+#   Served from the notice cache (billing/notices.py); a reprint of
+#   an unchanged bill is a 304 Not Modified.
 @login_required
+@require_GET
 def print_billing_notice(request, pk):
-    bill   = get_object_or_404(Bill, pk=pk)
-    notice = bill.disconnection_notices.filter(
-        status__in=['PENDING','DELIVERED']).first()
-    return render(request, 'billing/billing_notice.html', {
-        'bill': bill, 'notice': notice,
-    })
+    state = notices.current_version(pk)
+    if state is None:
+        raise Http404('No such bill')
+    etag, modified = quote_etag(state[0]), int(state[1].timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=modified)
+    if response is None:
+        try:
+            html, version, changed = notices.get_notice(pk, state)
+        except Bill.DoesNotExist:
+            raise Http404('No such bill')
+        etag, modified = quote_etag(version), int(changed.timestamp())
+        response = HttpResponse(html)
+    response['ETag']          = etag
+    response['Last-Modified'] = http_date(modified)
+#     staff-only page: browsers may keep it, shared caches may not, and it is revalidated every time
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
  
  
 # ══════════════════════════════════════════════════════════
@@ -241,6 +459,8 @@ def issue_notice(request, bill_pk):
             cutoff_date = cutoff_date,
             issued_by   = request.user.get_full_name() or request.user.username,
         )
+        if notifications.queue_cutoffs(DisconnectionNotice.objects.filter(pk=notice.pk)):
+            notifications.schedule_send()
         messages.success(request, f'Disconnection notice issued. Cutoff: {notice.cutoff_date}')
         return redirect('print-billing-notice', pk=bill.pk)
     return render(request, 'billing/issue_notice.html', {'bill': bill})
@@ -250,41 +470,59 @@ def issue_notice(request, bill_pk):
 #   VIEW 13 — Subscriber Ledger (Enhanced)
 # ══════════════════════════════════════════════════════════
 @login_required
-def subscriber_ledger(request, pk):
+async def subscriber_ledger(request, pk):
     from django.db.models import Sum, Count
     
-    sub = get_object_or_404(Subscriber, pk=pk)
+    sub = await aget_object_or_404(Subscriber, pk=pk)
     entries = sub.ledger_entries.all().order_by('entry_date', 'created_at')
-    balance = sub.get_running_balance()
-    
-    # Calculate financial summaries
-    totals = entries.aggregate(
-        total_debits=Sum('debit'),
-        total_credits=Sum('credit'),
-        billing_count=Count('id', filter=Q(entry_type='BILLING')),
-        payment_count=Count('id', filter=Q(entry_type='PAYMENT')),
-        penalty_count=Count('id', filter=Q(entry_type='PENALTY')),
-    )
-    
-    # Calculate totals by entry type
-    entry_summaries = entries.values('entry_type').annotate(
-        type_debits=Sum('debit'),
-        type_credits=Sum('credit'),
-        type_count=Count('id')
-    )
     
     # Recent activity (last 6 months)
     from datetime import datetime, timedelta
     six_months_ago = datetime.now().date() - timedelta(days=180)
-    recent_entries = entries.filter(entry_date__gte=six_months_ago)
     
-    return render(request, 'billing/ledger.html', {
-        'sub': sub,
-        'entries': entries,
-        'balance': balance,
-        'totals': totals,
-        'entry_summaries': entry_summaries,
-        'recent_entries': recent_entries,
+    context = await gather_queries(
+        entries = lambda: list(entries),
+        balance = sub.get_running_balance,
+        # Calculate financial summaries
+        totals = lambda: entries.aggregate(
+            total_debits=Sum('debit'),
+            total_credits=Sum('credit'),
+            billing_count=Count('id', filter=Q(entry_type='BILLING')),
+            payment_count=Count('id', filter=Q(entry_type='PAYMENT')),
+            penalty_count=Count('id', filter=Q(entry_type='PENALTY')),
+        ),
+        # Calculate totals by entry type
+        entry_summaries = lambda: list(entries.values('entry_type').annotate(
+            type_debits=Sum('debit'),
+            type_credits=Sum('credit'),
+            type_count=Count('id')
+        )),
+        recent_entries = lambda: list(entries.filter(entry_date__gte=six_months_ago)),
+    )
+    
+    return await sync_to_async(render)(request, 'billing/ledger.html', {'sub': sub, **context})
+ 
+ 
+# ══════════════════════════════════════════════════════════
+#   VIEW 13b — Statement of Account (printable, any date range;
+#   the statements command writes the same pages in batch)
+# ══════════════════════════════════════════════════════════
+@login_required
+@require_GET
+def subscriber_statement(request, pk):
+    sub   = get_object_or_404(Subscriber, pk=pk)
+    today = date.today()
+    try:
+        start = date.fromisoformat(request.GET.get('start', ''))
+    except ValueError:
+        start = date(today.year, 1, 1)
+    try:
+        end = date.fromisoformat(request.GET.get('end', ''))
+    except ValueError:
+        end = today
+    found = list(build_statements(start, end, Subscriber.objects.filter(pk=pk), include_empty=True))
+    return render(request, 'billing/statement.html', {
+        'sub': sub, 'start': start, 'end': end, 'statements': found,
     })
  
  
@@ -292,48 +530,131 @@ def subscriber_ledger(request, pk):
 #   VIEW 14 — Collection Report
 # ══════════════════════════════════════════════════════════
 @login_required
-def collection_report(request):
+async def collection_report(request):
     today  = date.today()
     month  = request.GET.get('month', today.strftime('%Y-%m'))
     y, m   = map(int, month.split('-'))
+    start, end = month_range(y, m)
  
     payments = Ledger.objects.filter(
         entry_type       = 'PAYMENT',
-        entry_date__year = y,
-        entry_date__month= m,
+        entry_date__gte  = start,
+        entry_date__lt   = end,
     ).select_related('subscriber').order_by('entry_date')
  
-    summary = payments.aggregate(
-        total = Sum('credit'),
-        count = Count('id'),
-    )
- 
-    by_day = payments.values('entry_date').annotate(
-        daily_total = Sum('credit'),
-        daily_count = Count('id'),
-    ).order_by('entry_date')
- 
-    by_class = payments.values('subscriber__classification').annotate(
-        class_total = Sum('credit'),
-        class_count = Count('id'),
+    context = await gather_queries(
+        payments = lambda: list(payments),
+        summary  = lambda: payments.aggregate(
+            total = Sum('credit'),
+            count = Count('id'),
+        ),
+        by_day   = lambda: list(payments.values('entry_date').annotate(
+            daily_total = Sum('credit'),
+            daily_count = Count('id'),
+        ).order_by('entry_date')),
+        by_class = lambda: list(payments.values('subscriber__classification').annotate(
+            class_total = Sum('credit'),
+            class_count = Count('id'),
+        ).order_by('subscriber__classification')),
     )
  
-    return render(request, 'billing/collection_report.html', {
-        'payments': payments,
-        'summary':  summary,
-        'by_day':   by_day,
-        'by_class': by_class,
+    return await sync_to_async(render)(request, 'billing/collection_report.html', {
+        **context,
         'month':    month,
     })
  
  
 # ══════════════════════════════════════════════════════════
-#   VIEW 15 — Delinquent Accounts Report
+#   VIEW 14b — Cashier Closing (end-of-day remittance per
+#   cashier, OR gaps and duplicates; staff close the day)
+# ══════════════════════════════════════════════════════════
+@login_required
+def cashier_closing(request):
+    try:
+        day = date.fromisoformat(request.GET.get('date', ''))
+    except ValueError:
+        day = timezone.localdate()
+
+    if request.method == 'POST':
+        if not request.user.is_staff:
+            raise PermissionDenied
+        cashier = request.POST.get('cashier', '')
+        try:
+            closing = cashiering.close_day(day, cashier, request.user.get_username(),
+                                           request.POST.get('remarks', '').strip())
+        except ValueError as e:
+            messages.error(request, str(e))
+        else:
+            messages.success(request, f'{cashier} closed for {day:%b %d, %Y}: '
+                                      f'{closing.payments} payments, ₱{closing.total:,.2f}.')
+        return redirect(f'{reverse("cashier-closing")}?date={day:%Y-%m-%d}')
+
+    remittances = list(cashiering.cashier_day(day).values())
+    return render(request, 'billing/cashier_closing.html', {
+        'day':         day,
+        'is_today':    day == timezone.localdate(),
+        'remittances': remittances,
+        'payments':    sum(r.payments for r in remittances),
+        'total':       sum((r.total for r in remittances), Decimal('0.00')),
+        'open':        [r for r in remittances if r.closing is None],
+        'issues':      [(r.cashier, issue) for r in remittances for issue in r.issues],
+    })
+
+
+# ══════════════════════════════════════════════════════════
+#   VIEW 15 — Delinquent Accounts Report (receivables aging)
 # ══════════════════════════════════════════════════════════
 @login_required
 def delinquent_report(request):
+    """
+    Aging by subscriber, barangay and classification from the latest
+    ReceivableAgingSnapshot (or ?as_of=), optionally against an earlier
+    one (?compare=), above the list of open bills.
+    """
+    dates = aging.latest_dates()
+
+    def snapshot_date(name, default):
+        try:
+            chosen = date.fromisoformat(request.GET.get(name, ''))
+        except ValueError:
+            return default
+        return chosen if chosen in dates else default
+
+    as_of     = snapshot_date('as_of', dates[0] if dates else None)
+    compare   = snapshot_date('compare', None)
+    barangay  = request.GET.get('barangay', '')
+    classification = request.GET.get('classification', '')
+    past_due  = request.GET.get('past_due', '')
+
+    filters = Q()
+    bill_filters = Q()
+    if barangay:
+        filters &= Q(barangay=barangay)
+        bill_filters &= Q(subscriber__barangay=barangay)
+    if classification:
+        filters &= Q(classification=classification)
+        bill_filters &= Q(subscriber__classification=classification)
+    if past_due in aging.BUCKET_FIELDS:
+#         a balance in this bucket or any older one
+        older = aging.BUCKET_FIELDS[aging.BUCKET_FIELDS.index(past_due):]
+        q = Q()
+        for field in older:
+            q |= Q(**{f'{field}__gt': 0})
+        filters &= q
+
+    rows     = ReceivableAgingSnapshot.objects.filter(filters)
+    current  = rows.filter(as_of=as_of)
+    totals   = aging.bucket_totals(current)
+    accounts = Paginator(current.select_related('subscriber').order_by('-total', 'subscriber_id'), 50)
+
+    def rollup(column):
+        return current.values(name=F(column)).annotate(
+            **{field: Sum(field) for field in aging.BUCKET_FIELDS},
+            total_sum=Sum('total'), accounts=Count('id'),
+        ).order_by(column)
+
     overdue = Bill.objects.filter(
-        status__in=['UNPAID','PARTIAL','OVERDUE']
+        bill_filters, status__in=['UNPAID','PARTIAL','OVERDUE']
     ).select_related('subscriber').order_by('-balance')
  
     total_overdue = overdue.aggregate(Sum('balance'))['balance__sum'] or Decimal('0')
@@ -342,6 +663,86 @@ def delinquent_report(request):
         'bills':         overdue,
         'total_overdue': total_overdue,
         'count':         overdue.count(),
+        'dates':         dates,
+        'as_of':         as_of,
+        'compare':       compare,
+        'totals':        totals,
+        'over_90':       totals['days_91_120'] + totals['over_120'],
+        'previous':      aging.bucket_totals(rows.filter(as_of=compare)) if compare else None,
+        'rollups':       [('Barangay', 'barangay', rollup('barangay')),
+                          ('Classification', 'classification', rollup('classification'))],
+        'accounts':      accounts.get_page(request.GET.get('page')),
+        'barangays':     Subscriber.objects.order_by('barangay').values_list('barangay', flat=True).distinct(),
+        'classifications': Subscriber.CLASSIFICATION_CHOICES,
+        'buckets':       aging.BUCKETS,
+        'filters':       {'barangay': barangay, 'classification': classification, 'past_due': past_due},
+    })
+
+
+@login_required
+@require_POST
+def aging_snapshot(request):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    stored = aging.take_snapshot()
+    messages.success(request, f'Aging recomputed: {stored} accounts with an open balance.')
+    return redirect('delinquent-report')
+
+
+# ══════════════════════════════════════════════════════════
+#   VIEW 15b — Billing Trends (from the monthly summaries,
+#   refreshed by run_billing and refresh_summaries)
+# ══════════════════════════════════════════════════════════
+TREND_MONTHS = [12, 24, 36, 60]
+
+
+def with_efficiency(row):
+    row['billed']     = (row['water_charges'] or 0) + (row['other_charges'] or 0)
+    row['efficiency'] = (100 * (row['collections'] or 0) / row['billed']) if row['billed'] else None
+    return row
+
+
+@login_required
+@require_GET
+def trends_report(request):
+    barangay       = request.GET.get('barangay', '')
+    classification = request.GET.get('classification', '')
+    try:
+        months = int(request.GET.get('months', 24))
+    except ValueError:
+        months = 24
+    months = months if months in TREND_MONTHS else 24
+
+    today   = date.today()
+    since   = months_before(date(today.year, today.month, 1), months - 1)
+    rows    = MonthlyBillingSummary.objects.filter(month__gte=since)
+    if barangay:
+        rows = rows.filter(barangay=barangay)
+    if classification:
+        rows = rows.filter(classification=classification)
+    sums = {field: Sum(field) for field in
+            ['volume', 'water_charges', 'discounts', 'other_charges', 'penalties', 'collections',
+             'bills', 'payments', 'connections', 'billed_subscribers']}
+
+    by_month    = [with_efficiency(r) for r in rows.values('month').annotate(**sums).order_by('month')]
+    by_barangay = [with_efficiency(r) for r in rows.values('barangay').annotate(**sums).order_by('barangay')]
+    chart = {
+        'labels':      [f'{r["month"]:%b %Y}' for r in by_month],
+        'volume':      [float(r['volume'] or 0) for r in by_month],
+        'billed':      [float(r['billed']) for r in by_month],
+        'collections': [float(r['collections'] or 0) for r in by_month],
+    }
+    return render(request, 'billing/trends_report.html', {
+        'by_month':        by_month,
+        'by_barangay':     by_barangay,
+        'chart':           chart,
+        'months':          months,
+        'month_choices':   TREND_MONTHS,
+        'since':           since,
+        'refreshed':       HighWaterMark.objects.filter(name=rollups.MARK).first(),
+        'barangays':       Subscriber.objects.order_by('barangay').values_list('barangay', flat=True).distinct(),
+        'classifications': Subscriber.CLASSIFICATION_CHOICES,
+        'filters':         {'barangay': barangay, 'classification': classification},
     })
 
 
@@ -349,7 +750,7 @@ def delinquent_report(request):
 #   VIEW 16 — General Ledger (All Transactions)
 # ══════════════════════════════════════════════════════════
 @login_required
-def general_ledger(request):
+async def general_ledger(request):
     # Filter parameters
     date_from = request.GET.get('date_from', '')
     date_to = request.GET.get('date_to', '')
@@ -376,30 +777,30 @@ def general_ledger(request):
     # Order by date and time
     entries = entries.order_by('-entry_date', '-created_at')
     
-    # Calculate totals
-    totals = entries.aggregate(
-        total_debits=Sum('debit'),
-        total_credits=Sum('credit'),
-        net_amount=Sum('debit') - Sum('credit') if entries.exists() else Decimal('0')
+    context = await gather_queries(
+        entries = lambda: list(entries[:100]),  # Limit to 100 for performance
+        # Calculate totals
+        totals = lambda: entries.aggregate(
+            total_debits=Sum('debit'),
+            total_credits=Sum('credit'),
+            net_amount=Sum('debit') - Sum('credit'),
+        ),
+        # Summary by entry type
+        type_summary = lambda: list(entries.values('entry_type').annotate(
+            type_debits=Sum('debit'),
+            type_credits=Sum('credit'),
+            type_count=Count('id')
+        ).order_by('entry_type')),
+        total_count = entries.count,
     )
     
-    # Summary by entry type
-    type_summary = entries.values('entry_type').annotate(
-        type_debits=Sum('debit'),
-        type_credits=Sum('credit'),
-        type_count=Count('id')
-    ).order_by('entry_type')
-    
-    return render(request, 'billing/general_ledger.html', {
-        'entries': entries[:100],  # Limit to 100 for performance
-        'totals': totals,
-        'type_summary': type_summary,
+    return await sync_to_async(render)(request, 'billing/general_ledger.html', {
+        **context,
         'date_from': date_from,
         'date_to': date_to,
         'entry_type': entry_type,
         'subscriber_search': subscriber_search,
         'entry_type_choices': Ledger.ENTRY_TYPE_CHOICES,
-        'total_count': entries.count(),
     })
 
 
@@ -451,4 +852,135 @@ def update_running_balances(subscriber):
         running_balance += (entry.debit - entry.credit)
         if entry.running_balance != running_balance:
             entry.running_balance = running_balance
-            entry.save(update_fields=['running_balance'])
\ No newline at end of file
+            entry.save(update_fields=['running_balance'])
+
+# ══════════════════════════════════════════════════════════
+#   VIEWS 18–19 — Handheld Sync API (offline meter readers)
+#   Devices authenticate with HTTP Basic auth on every call,
+#   so the endpoints carry no session and need no CSRF token.
+# ══════════════════════════════════════════════════════════
+SYNC_TOKEN_SALT = 'billing.sync'
+ 
+ 
+def _api_user(request):
+    auth = request.META.get('HTTP_AUTHORIZATION', '')
+    if not auth.startswith('Basic '):
+        return None
+    try:
+        username, _, password = base64.b64decode(auth[6:]).decode('utf-8').partition(':')
+    except (ValueError, UnicodeDecodeError):
+        return None
+    user = authenticate(request, username=username, password=password)
+    return user if user is not None and user.is_active else None
+ 
+ 
+def _api_unauthorized():
+    response = JsonResponse({'error': 'Authentication required.'}, status=401)
+    response['WWW-Authenticate'] = 'Basic realm="billing-sync"'
+    return response
+ 
+ 
+@gzip_page
+@require_GET
+def sync_download(request):
+    if _api_user(request) is None:
+        return _api_unauthorized()
+ 
+    barangay = request.GET.get('barangay', '')
+    if not barangay:
+        return JsonResponse({'error': 'barangay is required.'}, status=400)
+ 
+    since = None
+    token = request.GET.get('token', '')
+    if token:
+        try:
+            since = datetime.fromisoformat(signing.loads(token, salt=SYNC_TOKEN_SALT))
+        except (signing.BadSignature, ValueError):
+            since = None            # unknown token → send a full package
+ 
+#     Stamp the token before reading so changes made mid-request are re-sent next time
+    package = {'token': signing.dumps(timezone.now().isoformat(), salt=SYNC_TOKEN_SALT)}
+    package.update(build_sync_package(barangay, since))
+    return JsonResponse(package, json_dumps_params={'separators': (',', ':')})
+ 
+ 
+@csrf_exempt
+@require_POST
+def sync_upload(request):
+    user = _api_user(request)
+    if user is None:
+        return _api_unauthorized()
+ 
+    body = request.body
+    if request.META.get('HTTP_CONTENT_ENCODING', '') == 'gzip':
+        try:
+            body = gzip.decompress(body)
+        except OSError:
+            return JsonResponse({'error': 'Malformed gzip body.'}, status=400)
+    try:
+        readings = json.loads(body).get('readings')
+    except (ValueError, AttributeError):
+        readings = None
+    if not isinstance(readings, list) or not all(isinstance(r, dict) for r in readings):
+        return JsonResponse({'error': 'Expected {"readings": [...]}.'}, status=400)
+ 
+    result = accept_synced_readings(
+        readings, reader_name=user.get_full_name() or user.username)
+    return JsonResponse(result, json_dumps_params={'separators': (',', ':')})
+
+
+# ══════════════════════════════════════════════════════════
+#   VIEWS 20–23 — Background Jobs (run by manage.py run_jobs)
+# ══════════════════════════════════════════════════════════
+@login_required
+def job_list(request):
+    if request.method == 'POST':
+        if not request.user.is_staff:
+            raise PermissionDenied
+        form = JobForm(request.POST)
+        if form.is_valid():
+            job = enqueue(form.cleaned_data['command'], form.arguments(), user=request.user)
+            messages.success(request, f'{JOB_COMMANDS[job.command]} queued as job #{job.pk}.')
+            return redirect('job-detail', pk=job.pk)
+    else:
+        form = JobForm()
+ 
+    jobs = Job.objects.select_related('requested_by', 'schedule').defer('output', 'error')[:50]
+    return render(request, 'billing/job_list.html', {
+        'form':      form,
+        'jobs':      jobs,
+        'schedules': JobSchedule.objects.filter(is_active=True),
+    })
+ 
+ 
+@login_required
+def job_detail(request, pk):
+    job = get_object_or_404(Job.objects.select_related('requested_by', 'schedule'), pk=pk)
+    return render(request, 'billing/job_detail.html', {'job': job})
+ 
+ 
+@login_required
+@require_GET
+def job_status(request, pk):
+    """Polled by the job page while the job is queued or running."""
+    job = get_object_or_404(Job, pk=pk)
+    return JsonResponse({
+        'status':        job.status,
+        'status_label':  job.status_label,
+        'progress':      job.progress,
+        'progress_note': job.progress_note,
+        'attempts':      job.attempts,
+        'output':        job.output,
+        'error':         job.error,
+        'finished':      job.is_finished,
+    })
+ 
+ 
+@login_required
+@require_POST
+def job_cancel(request, pk):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    if cancel(Job.objects.filter(pk=pk)):
+        messages.warning(request, f'Job #{pk} cancelled; a running job stops at its next progress report.')
+    return redirect('job-detail', pk=pk)
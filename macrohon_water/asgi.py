@@ -3,6 +3,14 @@ ASGI config for macrohon_water project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with any ASGI server, e.g. ``uvicorn macrohon_water.asgi:application``.
+The dashboard and the ledger / collection reports are async views. On
+PostgreSQL their independent queries run concurrently; on SQLite they run
+in turn (billing/views.py). Their queries, like every ORM call, still run
+in a worker thread. The ticker stream is the view that gains most: under
+ASGI an open stream waits on the event loop instead of holding a thread.
+They still work under WSGI, one event loop per request.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .database import database_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,6 +48,7 @@ INSTALLED_APPS = [
 ]
  
 MIDDLEWARE = [
+    'billing.instrumentation.RequestMetricsMiddleware',   # Server-Timing, slow log, query budgets
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,7 +61,7 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'macrohon_water.urls'
  
 TEMPLATES = [{
-    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'BACKEND': 'billing.instrumentation.InstrumentedTemplates',  # DjangoTemplates + render timing
     'DIRS': [BASE_DIR / 'templates'],  # project-level templates folder
     'APP_DIRS': True,
     'OPTIONS': { 'context_processors': [
@@ -69,15 +73,77 @@ TEMPLATES = [{
 }]
  
 # ────────────────────────────────────────────────────────────────
-# DATABASE — SQLite for development (simpler setup)
+# DATABASE — chosen by the DATABASE_PROFILE environment variable
+#   sqlite (default, WAL-tuned) | sqlite-default | postgres
+#   see macrohon_water/database.py for the per-profile settings
+# ────────────────────────────────────────────────────────────────
+DATABASES = database_settings(BASE_DIR)
+ 
+# ────────────────────────────────────────────────────────────────
+# CACHES — printed billing notices are cached on disk so the server
+#   processes and the run_jobs workers that pre-render them share one
+#   copy (billing/notices.py). NOTICE_CACHE_DIR moves it. Test runs
+#   use per-process caches instead (billing/testing.py).
+# ────────────────────────────────────────────────────────────────
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'notices': {
+        'BACKEND':  'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('NOTICE_CACHE_DIR', BASE_DIR / 'cache' / 'notices'),
+        'OPTIONS':  {'MAX_ENTRIES': 100_000},
+    },
+}
+TEST_RUNNER = 'billing.testing.BillingTestRunner'
+ 
+# ────────────────────────────────────────────────────────────────
+# JOURNAL VOUCHERS — accounts the journal_export command posts to
+#   (billing/journals.py). Every ledger entry type is posted against
+#   the receivable account; set the codes to match the municipal books.
 # ────────────────────────────────────────────────────────────────
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+JOURNAL_RECEIVABLE = ('1-03-01-010', 'Accounts Receivable - Water Subscribers')
+JOURNAL_ACCOUNTS   = {        # Ledger.entry_type → (code, name); OTHER is the fallback
+    'BILLING':      ('4-02-02-040', 'Waterworks System Fees'),
+    'PAYMENT':      ('1-01-01-010', 'Cash - Collecting Officers'),
+    'PENALTY':      ('4-02-02-990', 'Fines and Penalties - Service Income'),
+    'RECONNECTION': ('4-02-01-990', 'Other Service Income - Reconnection Fees'),
+    'MATERIAL':     ('4-02-01-990', 'Other Service Income - Materials and Labor'),
+    'DISCOUNT':     ('5-02-99-990', 'Discounts Granted'),
+    'ADJUSTMENT':   ('5-02-99-990', 'Ledger Adjustments'),
+    'OTHER':        ('4-06-01-010', 'Miscellaneous Income'),
 }
  
+# ────────────────────────────────────────────────────────────────
+# NOTIFICATIONS — SMS and e-mail to subscribers (billing/notifications.py).
+#   One entry per channel: BACKEND, RATE (messages a second; 0 = no
+#   limit) and OPTIONS for the backend. Leave a channel out to stop
+#   queuing it. The file backend stands in for an SMS gateway;
+#   billing.notifications.HttpBackend posts to one (OPTIONS url, token).
+# ────────────────────────────────────────────────────────────────
+NOTIFY_OUTBOX_DIR = os.environ.get('NOTIFY_OUTBOX_DIR', BASE_DIR / 'outbox')
+NOTIFICATION_CHANNELS = {
+    'SMS': {
+        'BACKEND': 'billing.notifications.FileBackend',
+        'RATE':    5,
+        'OPTIONS': {'directory': NOTIFY_OUTBOX_DIR},
+    },
+    'EMAIL': {
+        'BACKEND': 'billing.notifications.EmailBackend',
+        'RATE':    10,
+    },
+}
+
+#   e-mail goes to files in the outbox until EMAIL_BACKEND is set to SMTP
+#   (django.core.mail.backends.smtp.EmailBackend; a local debugging server
+#   is python -m aiosmtpd -n -l localhost:1025)
+EMAIL_BACKEND      = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.filebased.EmailBackend')
+EMAIL_FILE_PATH    = Path(NOTIFY_OUTBOX_DIR) / 'email'
+EMAIL_HOST         = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT         = int(os.environ.get('EMAIL_PORT', '1025'))
+EMAIL_HOST_USER    = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS      = os.environ.get('EMAIL_USE_TLS') == '1'
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'Macrohon Water Billing <billing@localhost>')
+ 
 # Locale — use Philippine timezone
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE     = 'Asia/Manila'
@@ -101,3 +167,40 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Login / logout redirect
 LOGIN_REDIRECT_URL  = '/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
+ 
+# ────────────────────────────────────────────────────────────────
+# REQUEST METRICS — see billing/instrumentation.py
+# ────────────────────────────────────────────────────────────────
+SLOW_REQUEST_MS      = int(os.environ.get('SLOW_REQUEST_MS', 500))
+QUERY_BUDGET_DEFAULT = 50
+QUERY_BUDGETS = {            # URL name → max SQL queries per request
+    'dashboard':          12,
+    'subscriber-list':     6,
+    'subscriber-detail':  20,
+    'subscriber-ledger':  12,
+    'bill-list':          10,
+    'bill-detail':        10,
+    'print-billing-notice': 6,
+    'record-payment':     12,
+    'collection-report':  10,
+    'cashier-closing':     8,
+    'general-ledger':     10,
+}
+QUERY_BUDGET_RAISE = os.environ.get('QUERY_BUDGET_RAISE') == '1'   # tests turn this on
+ 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'slow_requests': {
+            'class':       'logging.handlers.RotatingFileHandler',
+            'filename':    BASE_DIR / 'slow_requests.log',
+            'maxBytes':    5 * 1024 * 1024,
+            'backupCount': 3,
+            'delay':       True,
+        },
+    },
+    'loggers': {
+        'billing.slow_requests': {'handlers': ['slow_requests'], 'level': 'WARNING'},
+    },
+}